@@ -0,0 +1,125 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AgentPoolExhausted(Exception):
+    """Raised when no pooled agent becomes available before the checkout timeout."""
+
+
+class RecipeAgentPool:
+    """
+    A fixed-size pool of warmed RecipeRAGAgent instances shared across requests.
+
+    Building a RecipeRAGAgent compiles the LangGraph, creates the web search agent
+    and embeds the schema knowledge base, which costs more than a typical search.
+    The pool builds up to `size` agents once (at startup via warm_up(), or lazily
+    on first checkout) and hands each one to a single request at a time, so the
+    per-agent query state is never shared between concurrent requests.
+
+    Example:
+        >>> pool = RecipeAgentPool(size=2)
+        >>> pool.warm_up()
+        >>> with pool.checkout() as agent:
+        ...     recipes = agent.query("chicken, rice", num_recipes=3)
+    """
+
+    def __init__(self, size: int = 2, factory=None, checkout_timeout: float = 120.0):
+        if size < 1:
+            raise ValueError("Agent pool size must be at least 1.")
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self._factory = factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+        self.warmup_seconds = None
+        self.build_seconds = []
+
+    def _build_agent(self):
+        factory = self._factory
+        if factory is None:
+            from app.agent.recipe_agent import RecipeRAGAgent
+            factory = RecipeRAGAgent
+        start = time.perf_counter()
+        agent = factory()
+        self.build_seconds.append(time.perf_counter() - start)
+        return agent
+
+    def _reserve_slot(self) -> bool:
+        with self._lock:
+            if self._created >= self.size:
+                return False
+            self._created += 1
+            return True
+
+    def _release_slot(self):
+        with self._lock:
+            self._created -= 1
+
+    def warm_up(self):
+        """Builds agents until the pool is full and records the total warm-up time."""
+        start = time.perf_counter()
+        while self._reserve_slot():
+            try:
+                agent = self._build_agent()
+            except Exception:
+                self._release_slot()
+                raise
+            self._idle.put(agent)
+        self.warmup_seconds = time.perf_counter() - start
+        return self.warmup_seconds
+
+    @contextmanager
+    def checkout(self, timeout: float = None):
+        """
+        Yields an agent for exclusive use and returns it to the pool afterwards.
+
+        If every agent is busy and the pool is not yet full a new agent is built,
+        otherwise the caller waits up to `timeout` seconds for one to be returned.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        try:
+            agent = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve_slot():
+                try:
+                    agent = self._build_agent()
+                except Exception:
+                    self._release_slot()
+                    raise
+            else:
+                with self._lock:
+                    self._waits += 1
+                try:
+                    agent = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise AgentPoolExhausted(f"No recipe agent became available within {timeout} seconds.")
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield agent
+        finally:
+            self._idle.put(agent)
+
+    def stats(self) -> dict:
+        """Returns pool size, utilisation and warm-up timing metrics."""
+        with self._lock:
+            created = self._created
+            checkouts = self._checkouts
+            waits = self._waits
+        available = self._idle.qsize()
+        build_seconds = self.build_seconds
+        return {
+            "size": self.size,
+            "created": created,
+            "available": available,
+            "in_use": created - available,
+            "checkouts": checkouts,
+            "waits": waits,
+            "warmup_seconds": self.warmup_seconds,
+            "avg_build_seconds": sum(build_seconds) / len(build_seconds) if build_seconds else None,
+        }
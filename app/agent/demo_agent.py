@@ -4,7 +4,7 @@ from langchain_core.documents import Document
 from langgraph.graph import START, END
 
 from rag_agent import RAGAgent, AgentInfo
-from utils import get_completion
+from utils import get_completion, async_get_completion
 
 prd_artifacts = ["artifacts/day1_prd.md"]
 tech_artifacts = ["artifacts/schema.sql", "artifacts/adr_001_database_choice.md"]
@@ -24,8 +24,8 @@ class ProjectMgrAgentState(TypedDict):
     researcher: str
     agent: AgentInfo
 
-def pm_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
-    prompt = f"""
+def pm_prompt(state: ProjectMgrAgentState) -> str:
+    return f"""
     Acting as a Project Manager, Determine who should answer the question based on the instructions provided and the question below.
 
     Instructions:
@@ -37,10 +37,22 @@ def pm_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
     Question:
     {state['question']}
     """
+
+def _async_client(agent: AgentInfo):
+    # async_get_completion also accepts the sync client, running it on a worker thread
+    return getattr(agent, "async_client", None) or agent.client
+
+def pm_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
     agent = state["agent"]
-    researcher = get_completion(prompt, agent.client, agent.model_name, agent.api_provider).strip().lower()
+    # Routing is a classification, so run it deterministically (and cacheable)
+    researcher = get_completion(pm_prompt(state), agent.client, agent.model_name, agent.api_provider, temperature=0).strip().lower()
     return {**state, "researcher": researcher}
 
+async def apm_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
+    agent = state["agent"]
+    researcher = await async_get_completion(pm_prompt(state), _async_client(agent), agent.model_name, agent.api_provider, temperature=0)
+    return {**state, "researcher": researcher.strip().lower()}
+
 def pm_router(state: ProjectMgrAgentState):
     if "software" in state.get("researcher", "").lower():
         return "tech_professional"
@@ -63,9 +75,9 @@ def tech_retrieve_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
     docs = retrieve_docs(retriever, state["question"])
     return {**state, "documents": docs}
 
-def ask_the_docs(agentInfo, role:str, question:str, documents:List[Document]) -> str:
+def ask_the_docs_prompt(role:str, question:str, documents:List[Document]) -> str:
     context = "\n\n".join(doc.page_content for doc in documents)
-    prompt = f"""
+    return f"""
     Acting as a Senior {role}, answer the following question using only the provided documents.
     If the documents do not have enough information, please say so before responding.
     Provide your answer only with no additional text.
@@ -78,6 +90,9 @@ def ask_the_docs(agentInfo, role:str, question:str, documents:List[Document]) ->
 
     Answer:
     """
+
+def ask_the_docs(agentInfo, role:str, question:str, documents:List[Document]) -> str:
+    prompt = ask_the_docs_prompt(role, question, documents)
     # response = client.chat.completions.create(
     #     model=model_name,
     #     messages=[{"role": "user", "content": prompt}],
@@ -90,25 +105,39 @@ def research_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
     doc_info = ask_the_docs(state['agent'], state['researcher'], state['question'], state['documents'])
     return {**state, "answer": doc_info}
 
-def synthesize_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
-    prompt = f"""
+async def aresearch_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
+    agent = state['agent']
+    prompt = ask_the_docs_prompt(state['researcher'], state['question'], state['documents'])
+    doc_info = await async_get_completion(prompt, _async_client(agent), agent.model_name, agent.api_provider)
+    return {**state, "answer": doc_info}
+
+def synthesize_prompt(state: ProjectMgrAgentState) -> str:
+    return f"""
     Acting as a professional Copywriter, take the following response from a {state["researcher"]} and rephrase it in a clear and engaging format.
     Please ensure that the final output is concise and retains the original meaning and contains no additional commentary.
 
     Response: {state["answer"]}
     """
+
+def synthesize_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
+    agent = state["agent"]
+    copywritten_answer = get_completion(synthesize_prompt(state), agent.client, agent.model_name, agent.api_provider)
+    return {**state, "answer": copywritten_answer}
+
+async def asynthesize_node(state: ProjectMgrAgentState) -> ProjectMgrAgentState:
     agent = state["agent"]
-    copywritten_answer = get_completion(prompt, agent.client, agent.model_name, agent.api_provider)
+    copywritten_answer = await async_get_completion(synthesize_prompt(state), _async_client(agent), agent.model_name, agent.api_provider)
     return {**state, "answer": copywritten_answer}
 
-def create_pm_agent():
+def create_pm_agent(use_async=False):
+    """Compiles the PM graph; with use_async=True the LLM nodes are coroutines and it must be run with ainvoke()."""
     agent_graph = StateGraph(ProjectMgrAgentState)
-    agent_graph.add_node("PROJECT_MANAGER", pm_node)
+    agent_graph.add_node("PROJECT_MANAGER", apm_node if use_async else pm_node)
     agent_graph.add_node("PRD_RETRIEVER", prd_retrieve_node)
     # agent_graph.add_node("PRD_RESEARCHER", prd_research_node)
     agent_graph.add_node("TECH_RETRIEVER", tech_retrieve_node)
-    agent_graph.add_node("RESEARCHER", research_node)
-    agent_graph.add_node("SYNTHESIZER", synthesize_node)
+    agent_graph.add_node("RESEARCHER", aresearch_node if use_async else research_node)
+    agent_graph.add_node("SYNTHESIZER", asynthesize_node if use_async else synthesize_node)
 
     agent_graph.add_edge(START, "PROJECT_MANAGER")
     agent_graph.add_conditional_edges("PROJECT_MANAGER", pm_router, {"tech_professional":"TECH_RETRIEVER", "product_professional":"PRD_RETRIEVER", "end":END})
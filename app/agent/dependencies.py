@@ -0,0 +1,86 @@
+import importlib.util
+import threading
+from typing import Dict, List, Optional
+
+# Libraries each agent feature needs, by import name
+AGENT_FEATURES = {
+    "graph": ["langgraph", "langchain_core"],
+    "knowledge_base": ["langchain", "langchain_community", "langchain_openai", "langchain_text_splitters", "faiss"],
+    "web_search": ["langchain", "langchain_community", "langchain_openai"],
+    # Only needed for knowledge keys on the "local" embedding backend
+    "local_embeddings": ["sentence_transformers", "torch"],
+}
+# Everything the recipe RAG search uses
+RAG_SEARCH_FEATURES = ("graph", "knowledge_base", "web_search")
+
+# pip distribution names that differ from the import name
+PIP_PACKAGES = {
+    "faiss": "faiss-cpu",
+    "langchain_core": "langchain-core",
+    "langchain_community": "langchain-community",
+    "langchain_openai": "langchain-openai",
+    "langchain_text_splitters": "langchain-text-splitters",
+    "sentence_transformers": "sentence-transformers",
+}
+
+
+class AgentDependencyError(RuntimeError):
+    """Raised when an agent feature is used but a library it needs is not installed."""
+
+    def __init__(self, feature: str, missing: List[str]):
+        self.feature = feature
+        self.missing = missing
+        packages = " ".join(PIP_PACKAGES.get(module, module) for module in missing)
+        super().__init__(
+            f"The '{feature}' agent feature is unavailable because {', '.join(missing)} "
+            f"{'is' if len(missing) == 1 else 'are'} not installed. Install with: pip install {packages}"
+        )
+
+
+_probe: Optional[Dict[str, bool]] = None
+_probe_lock = threading.Lock()
+
+
+def probe_agent_dependencies(refresh: bool = False) -> Dict[str, bool]:
+    """
+    Checks once per process which agent libraries are installed.
+
+    Uses importlib.util.find_spec, so nothing is imported (the agent stack stays
+    unloaded until first use) and nothing is ever installed. The result is cached;
+    pass refresh=True after installing packages into a running process.
+
+    Example:
+        >>> probe_agent_dependencies()
+        {'faiss': True, 'langchain': True, ...}
+    """
+    global _probe
+    with _probe_lock:
+        if _probe is None or refresh:
+            modules = sorted({module for required in AGENT_FEATURES.values() for module in required})
+            _probe = {module: _is_installed(module) for module in modules}
+        return dict(_probe)
+
+
+def _is_installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def missing_dependencies(feature: str) -> List[str]:
+    available = probe_agent_dependencies()
+    return [module for module in AGENT_FEATURES[feature] if not available.get(module, False)]
+
+
+def agent_features() -> Dict[str, bool]:
+    """Maps each agent feature to whether all of its libraries are installed."""
+    return {feature: not missing_dependencies(feature) for feature in AGENT_FEATURES}
+
+
+def require_agent_features(*features: str):
+    """Raises AgentDependencyError for the first of `features` that cannot be used."""
+    for feature in features:
+        missing = missing_dependencies(feature)
+        if missing:
+            raise AgentDependencyError(feature, missing)
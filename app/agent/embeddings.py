@@ -0,0 +1,170 @@
+import hashlib
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.agent.dependencies import require_agent_features
+from app.agent.sqlite_cache import SQLiteCache
+
+# Backend used for knowledge keys that don't name one: "openai" or "local"
+KB_EMBEDDING_BACKEND = os.getenv("KB_EMBEDDING_BACKEND", "openai")
+EMBEDDING_BACKENDS = ("openai", "local")
+
+# Local sentence-transformers model, run on the CPU
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))  # 0 keeps torch's default
+LOCAL_EMBEDDING_PRECISION = os.getenv("LOCAL_EMBEDDING_PRECISION", "float32")
+LOCAL_EMBEDDING_PRECISIONS = ("float32", "float16", "int8")
+
+# On-disk cache of chunk vectors, keyed by embedding model and chunk text hash
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") == "1"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("artifacts", ".embedding_cache.sqlite3"))
+
+
+def embedding_fingerprint(embedding) -> str:
+    """Identifies the embedding model so vectors from another model (or precision) are never reused."""
+    embedding = getattr(embedding, "underlying", None) or embedding
+    model = getattr(embedding, "model", None) or getattr(embedding, "model_name", None) or ""
+    size = getattr(embedding, "size", None) or getattr(embedding, "dimensions", None) or ""
+    fingerprint = f"{type(embedding).__name__}:{model}:{size}"
+    precision = getattr(embedding, "precision", None)
+    return f"{fingerprint}:{precision}" if precision else fingerprint
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Embeds on the local CPU with a sentence-transformers model, so knowledge bases
+    build offline and without per-chunk network calls.
+
+    The model is loaded on first use; sentence-transformers and torch are only
+    imported then. Texts are encoded `batch_size` at a time on `num_threads` torch
+    threads. precision="float16" halves the weights; "int8" applies dynamic int8
+    quantization to the Linear layers, which is usually the fastest on CPU at a
+    small cost in retrieval quality. Vectors are L2-normalized, so FAISS's L2
+    distance ranks like cosine similarity.
+
+    Pass `model` to use an already loaded model (or a stand-in with an `encode` method).
+
+    Example:
+        >>> embedding = LocalEmbeddings(precision="int8", num_threads=4)
+        >>> create_knowledge_base(["artifacts/schema.sql"], embedding=embedding)
+    """
+
+    # Concurrent encode calls would only compete for the same CPU cores
+    max_concurrency = 1
+
+    def __init__(self, model_name: str = LOCAL_EMBEDDING_MODEL, batch_size: int = LOCAL_EMBEDDING_BATCH_SIZE,
+                 num_threads: int = LOCAL_EMBEDDING_THREADS, precision: str = LOCAL_EMBEDDING_PRECISION,
+                 device: str = "cpu", model=None):
+        if precision not in LOCAL_EMBEDDING_PRECISIONS:
+            raise ValueError(f"precision must be one of {', '.join(LOCAL_EMBEDDING_PRECISIONS)}, got {precision!r}")
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.precision = precision
+        self.device = device
+        self._model = model
+        self._lock = threading.Lock()
+
+    def _load_model(self):
+        with self._lock:
+            if self._model is None:
+                require_agent_features("local_embeddings")
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                model = SentenceTransformer(self.model_name, device=self.device)
+                if self.precision == "float16":
+                    model = model.half()
+                elif self.precision == "int8":
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self._model = model
+            return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self._load_model().encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+                                            normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with a SQLiteCache of chunk vectors keyed by
+    sha256(model fingerprint + chunk text), so an edited artifact only re-embeds the
+    chunks that actually changed and identical chunks are never embedded twice.
+
+    Queries are passed through uncached. Other attributes (model name, size) are
+    read from the wrapped model, so index cache keys stay the same with or without
+    this wrapper.
+
+    Example:
+        >>> embedding = CachedEmbeddings(LocalEmbeddings(), "artifacts/.embedding_cache.sqlite3")
+    """
+
+    def __init__(self, underlying: Embeddings, path: str = EMBEDDING_CACHE_PATH):
+        self.underlying = underlying
+        self.path = path
+        self.namespace = embedding_fingerprint(underlying)
+        self.max_concurrency = getattr(underlying, "max_concurrency", None)
+        self._stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        # Vectors never go stale for a given model and text, so nothing expires or is evicted
+        self._store = SQLiteCache(path, "embedding_cache")
+
+    def __getattr__(self, name):
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.namespace}|{text}".encode("utf-8")).hexdigest()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = {key: np.frombuffer(vector, dtype=np.float32).tolist() for key, vector in self._store.get_many(keys).items()}
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        with self._stats_lock:
+            self._stats["hits"] += len(texts) - len(missing)
+            self._stats["misses"] += len(missing)
+        if missing:
+            vectors = dict(zip(missing, self.underlying.embed_documents(list(missing.values()))))
+            self._store.put_many({key: np.asarray(vector, dtype=np.float32).tobytes() for key, vector in vectors.items()})
+            found.update(vectors)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+def create_embedding(backend: Optional[str] = None, cache: Optional[bool] = None) -> Embeddings:
+    """
+    Returns the embedding model for a knowledge base: "openai" (OpenAIEmbeddings) or
+    "local" (LocalEmbeddings configured from the LOCAL_EMBEDDING_* settings). Defaults
+    to KB_EMBEDDING_BACKEND, and wraps the model in CachedEmbeddings unless EMBEDDING_CACHE=0.
+    """
+    backend = backend or KB_EMBEDDING_BACKEND
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        embedding = OpenAIEmbeddings()
+    elif backend == "local":
+        embedding = LocalEmbeddings()
+    else:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {', '.join(EMBEDDING_BACKENDS)}")
+    if EMBEDDING_CACHE if cache is None else cache:
+        embedding = CachedEmbeddings(embedding)
+    return embedding
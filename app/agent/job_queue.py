@@ -0,0 +1,167 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is already at its depth limit."""
+
+
+class RagJob:
+    """
+    A single background RAG search.
+
+    Progress is recorded as an append-only list of (event, data) tuples so that
+    pollers and Server-Sent Events subscribers can resume from any cursor.
+    Events are 'status' (data is the new status), 'recipe' (data is one extracted
+    recipe), 'completed' (data is the final job dict) and 'failed' (data is the error).
+    """
+
+    TERMINAL_STATUSES = ("completed", "failed")
+
+    def __init__(self, params: dict):
+        self.job_id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.results = []
+        self.extraction_path = None
+        self.error = None
+        self.exception = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = [("status", "queued")]
+        self.future = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in self.TERMINAL_STATUSES
+
+    def publish(self, event: str, data):
+        with self._lock:
+            if event == "recipe":
+                self.results.append(data)
+            self.events.append((event, data))
+
+    def events_since(self, cursor: int) -> list:
+        with self._lock:
+            return self.events[cursor:]
+
+    def _start(self):
+        self.started_at = time.time()
+        self.status = "running"
+        self.publish("status", "running")
+
+    def _complete(self, results: list, extraction_path: str = None):
+        with self._lock:
+            self.results = list(results)
+            self.extraction_path = extraction_path
+            self.finished_at = time.time()
+            self.status = "completed"
+        self.publish("completed", self.to_dict())
+
+    def _fail(self, exc: Exception):
+        self.exception = exc
+        self.error = str(exc)
+        self.finished_at = time.time()
+        self.status = "failed"
+        self.publish("failed", self.error)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "results": list(self.results),
+            "extraction_path": self.extraction_path,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class RagJobQueue:
+    """
+    Runs RAG searches on a bounded worker pool so request handlers never block on them.
+
+    `runner(job, **params)` performs the search, may call job.publish("recipe", ...)
+    as results become available and returns a dict with 'recipe_list' and optionally
+    'extraction_path'. At most `max_workers` jobs run at once and at most `max_queue`
+    more wait; further submissions raise QueueFullError. Finished jobs are kept for
+    polling until `max_finished` newer ones have completed.
+
+    Example:
+        >>> jobs = RagJobQueue(run_search, max_workers=2, max_queue=20)
+        >>> job = jobs.submit(ingredients="chicken, rice", num_recipes=3)
+        >>> jobs.get(job.job_id).status
+        'queued'
+    """
+
+    def __init__(self, runner, max_workers: int = 2, max_queue: int = 20, max_finished: int = 200):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self._runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-job")
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def submit(self, **params) -> RagJob:
+        job = RagJob(params)
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise QueueFullError(f"RAG job queue is full ({self.max_queue} jobs waiting).")
+            self._pending += 1
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: RagJob):
+        job._start()
+        try:
+            outcome = self._runner(job, **job.params) or {}
+            job._complete(outcome.get("recipe_list", []), outcome.get("extraction_path"))
+        except Exception as e:
+            job._fail(e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                if job.status == "completed":
+                    self._completed += 1
+                else:
+                    self._failed += 1
+        return job
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> RagJob:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": min(pending, self.max_workers),
+                "queued": max(0, pending - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
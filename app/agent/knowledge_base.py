@@ -1,44 +1,264 @@
 import sys
 import os
+import hashlib
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
 
-from app.agent.utils import setup_llm_client
+from app.agent.utils import setup_llm_client, get_completion, stream_completion
+from app.agent.embeddings import create_embedding, embedding_fingerprint
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
 project_root = "."
 
+# Splitter settings are part of the index cache key, changing them re-embeds everything
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# On-disk FAISS index cache: one directory per (artifact path, splitter, embedding) holding
+# the entry for the artifact's latest content; older entries are removed when it changes
+KB_CACHE_DIR = os.getenv("KB_CACHE_DIR", os.path.join("artifacts", ".kb_cache"))
+kb_cache_stats = {"hits": 0, "misses": 0, "pruned": 0}
+_kb_cache_stats_lock = threading.Lock()
+_KB_CACHE_FILES = ("index.faiss", "index.pkl")
+
+# Chunks are embedded in batches of this size, with up to KB_EMBED_WORKERS batches in flight
+KB_EMBED_BATCH_SIZE = int(os.getenv("KB_EMBED_BATCH_SIZE", "256"))
+KB_EMBED_WORKERS = int(os.getenv("KB_EMBED_WORKERS", "4"))
+
 def init_knowledge():
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     if project_root not in sys.path:
         sys.path.insert(0, project_root)
 
-def create_knowledge_base(file_paths):
-    """Loads documents from given paths and creates a FAISS vector store.""" 
-    all_docs = []
-    for path in file_paths:
-        full_path = os.path.join(project_root, path)
-        if os.path.exists(full_path):
-            loader = TextLoader(full_path)
-            docs = loader.load()
-            for doc in docs:
-                doc.metadata={"source": path} # Add source metadata
-            all_docs.extend(docs)
-        else:
-            print(f"Warning: Artifact not found at {full_path}")
-
-    if not all_docs:
-        print("No documents found to create knowledge base.")
+def _count_kb_cache(event: str, n: int = 1):
+    with _kb_cache_stats_lock:
+        kb_cache_stats[event] += n
+
+def _source_cache_dir(cache_dir: str, path: str, embedding) -> str:
+    """Groups the cache entries of one artifact under one embedding model and splitter."""
+    key = f"{path}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{embedding_fingerprint(embedding)}"
+    return os.path.join(cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+
+def _file_cache_key(path: str, content: bytes, embedding) -> str:
+    digest = hashlib.sha256()
+    digest.update(content)
+    digest.update(f"|{path}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{embedding_fingerprint(embedding)}".encode("utf-8"))
+    return digest.hexdigest()
+
+def _split_artifact(path: str, content: bytes) -> List[Document]:
+    doc = Document(page_content=content.decode("utf-8"), metadata={"source": path}) # Add source metadata
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return text_splitter.split_documents([doc])
+
+def _read_artifact(path: str) -> Optional[bytes]:
+    full_path = os.path.join(project_root, path)
+    if not os.path.exists(full_path):
+        print(f"Warning: Artifact not found at {full_path}")
+        return None
+    with open(full_path, "rb") as f:
+        return f.read()
+
+def _load_cached_chunks(cache_path: str, embedding) -> Optional[List[Tuple[Document, List[float]]]]:
+    """
+    Returns the (chunk, vector) pairs of a cached artifact index, or None on a miss.
+    The vectors are read back from the FAISS index so cached chunks can be merged
+    into any number of knowledge bases without calling the embedding model.
+    """
+    if not all(os.path.exists(os.path.join(cache_path, name)) for name in _KB_CACHE_FILES):
+        return None
+    try:
+        # The cache directory is written only by this process, so its pickled docstore is trusted
+        store = FAISS.load_local(cache_path, embedding, allow_dangerous_deserialization=True)
+    except (OSError, RuntimeError, EOFError) as e:
+        # Pruned by another worker while we were reading it; rebuild instead
+        print(f"Warning: ignoring unreadable knowledge base cache entry {cache_path}: {e}")
         return None
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    return [(store.docstore.search(store.index_to_docstore_id[i]), vectors[i].tolist()) for i in range(store.index.ntotal)]
+
+def _save_cached_chunks(cache_path: str, chunks: List[Tuple[Document, List[float]]], embedding):
+    """
+    Writes an artifact's index to a temporary sibling and renames it into place, so
+    readers only ever see complete entries, then removes the artifact's older entries.
+    """
+    source_dir = os.path.dirname(cache_path)
+    os.makedirs(source_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.tmp-{uuid.uuid4().hex}"
+    try:
+        _index_from_chunks(chunks, embedding).save_local(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # Another worker stored the same entry first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(cache_path):
+            raise
+    for name in os.listdir(source_dir):
+        entry = os.path.join(source_dir, name)
+        if entry != cache_path and ".tmp-" not in name:
+            shutil.rmtree(entry, ignore_errors=True)
+            _count_kb_cache("pruned")
+
+def _chunk_ids(chunks: List[Tuple[Document, List[float]]]) -> List[str]:
+    """Stable docstore ids, "<source>#<n>", so a source's chunks can be found and replaced."""
+    counts = {}
+    ids = []
+    for doc, _ in chunks:
+        source = doc.metadata.get("source")
+        counts[source] = counts.get(source, -1) + 1
+        ids.append(f"{source}#{counts[source]}")
+    return ids
+
+def _index_from_chunks(chunks: List[Tuple[Document, List[float]]], embedding) -> FAISS:
+    return FAISS.from_embeddings([(doc.page_content, vector) for doc, vector in chunks], embedding,
+                                 metadatas=[doc.metadata for doc, _ in chunks], ids=_chunk_ids(chunks))
+
+def embed_texts(texts: List[str], embedding, batch_size: int = KB_EMBED_BATCH_SIZE,
+                max_workers: int = KB_EMBED_WORKERS) -> List[List[float]]:
+    """
+    Embeds `texts` with one model call per unique text, in batches of `batch_size`
+    sent `max_workers` at a time (or the model's own `max_concurrency`, e.g. 1 for a
+    local CPU model). Returns one vector per input text, in order.
+    """
+    max_workers = getattr(embedding, "max_concurrency", None) or max_workers
+    unique = list(dict.fromkeys(texts))
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    if len(batches) > 1 and max_workers > 1:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+            results = list(pool.map(embedding.embed_documents, batches))
+    else:
+        results = [embedding.embed_documents(batch) for batch in batches]
+    vectors = {text: vector for batch, batch_vectors in zip(batches, results) for text, vector in zip(batch, batch_vectors)}
+    return [vectors[text] for text in texts]
+
+def load_artifact_chunks(file_paths: List[str], embedding, cache_dir=KB_CACHE_DIR, batch_size: int = KB_EMBED_BATCH_SIZE,
+                         max_workers: int = KB_EMBED_WORKERS) -> Dict[str, List[Tuple[Document, List[float]]]]:
+    """
+    Returns the (chunk, vector) pairs of each artifact, keyed by path. Cached
+    artifacts are read back from `cache_dir`; the rest are split and embedded
+    together (see `embed_texts`) and then cached. Missing or empty files are left out.
+    """
+    chunks = {}
+    pending = {}
+    for path in dict.fromkeys(file_paths):
+        content = _read_artifact(path)
+        if content is None:
+            continue
+        cache_path = None
+        if cache_dir:
+            cache_path = os.path.join(_source_cache_dir(cache_dir, path, embedding), _file_cache_key(path, content, embedding))
+        cached = _load_cached_chunks(cache_path, embedding) if cache_path else None
+        if cached is not None:
+            _count_kb_cache("hits")
+            chunks[path] = cached
+            continue
+        _count_kb_cache("misses")
+        splits = _split_artifact(path, content)
+        if splits:
+            pending[path] = (splits, cache_path)
+
+    texts = [doc.page_content for splits, _ in pending.values() for doc in splits]
+    if texts:
+        print(f"Embedding {len(set(texts))} unique document splits from {len(pending)} artifacts...")
+    vectors = iter(embed_texts(texts, embedding, batch_size=batch_size, max_workers=max_workers))
+    for path, (splits, cache_path) in pending.items():
+        chunks[path] = [(doc, next(vectors)) for doc in splits]
+        if cache_path:
+            _save_cached_chunks(cache_path, chunks[path], embedding)
+    return chunks
+
+def create_knowledge_bases(knowledge_base: List[Tuple], embedding=None, cache_dir=KB_CACHE_DIR,
+                           batch_size: int = KB_EMBED_BATCH_SIZE, max_workers: int = KB_EMBED_WORKERS) -> Dict[str, object]:
+    """
+    Builds one retriever per (key, file_paths) entry in a single embedding pass.
+
+    Artifacts listed under several keys are read and split once, and identical
+    chunks are embedded once, in concurrent batches (see `embed_texts`). Each key
+    then gets its own FAISS index assembled from the shared vectors. Artifacts are
+    still cached individually under `cache_dir` (see `create_knowledge_base`), so
+    unchanged files are never re-embedded. Keys with no documents map to None.
+
+    An entry may name its embedding backend as a third element, either "openai",
+    "local" (see embeddings.create_embedding) or an Embeddings instance; other keys
+    use `embedding`, or the KB_EMBEDDING_BACKEND model when that is None. Keys are
+    only built from vectors of their own model.
+
+    Example:
+        >>> retrievers = create_knowledge_bases([("prd", ["artifacts/prd_recipies.md", "artifacts/schema.sql"]),
+        ...                                      ("tech", ["artifacts/schema.sql"], "local")])
+        >>> retrievers["tech"].invoke("What columns does recipes have?")
+    """
+    backends = {}
+
+    def resolve(backend):
+        if backend is not None and not isinstance(backend, str):
+            return backend
+        if backend is None and embedding is not None:
+            return embedding
+        if backend not in backends:
+            backends[backend] = create_embedding(backend)
+        return backends[backend]
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splits = text_splitter.split_documents(all_docs)
-    
-    print(f"Creating vector store from {len(splits)} document splits...")
-    vectorstore = FAISS.from_documents(documents=splits, embedding=OpenAIEmbeddings())
-    return vectorstore.as_retriever()
+    entries = [(entry[0], entry[1], resolve(entry[2] if len(entry) > 2 else None)) for entry in knowledge_base]
+    chunks = {}
+    for key_embedding in {id(e): e for _, _, e in entries}.values():
+        paths = list(dict.fromkeys(path for _, file_paths, e in entries if e is key_embedding for path in file_paths))
+        chunks[id(key_embedding)] = load_artifact_chunks(paths, key_embedding, cache_dir=cache_dir,
+                                                         batch_size=batch_size, max_workers=max_workers)
+
+    retrievers = {}
+    for key, file_paths, key_embedding in entries:
+        key_chunks = [chunk for path in dict.fromkeys(file_paths) for chunk in chunks[id(key_embedding)].get(path, [])]
+        if not key_chunks:
+            print(f"No documents found to create knowledge base '{key}'.")
+            retrievers[key] = None
+            continue
+        retrievers[key] = _index_from_chunks(key_chunks, key_embedding).as_retriever()
+
+    print(f"Knowledge base ready ({kb_cache_stats['hits']} cached / {kb_cache_stats['misses']} embedded artifacts so far).")
+    return retrievers
+
+def create_knowledge_base(file_paths, embedding=None, cache_dir=KB_CACHE_DIR):
+    """
+    Loads documents from given paths and creates a FAISS vector store.
+
+    Each artifact is indexed separately and persisted under `cache_dir`, keyed by its
+    content hash plus the splitter and embedding settings. Unchanged artifacts are
+    reloaded from disk and only new or modified files are re-embedded. Pass
+    cache_dir=None to always rebuild in memory.
+    """
+    return create_knowledge_bases([(None, file_paths)], embedding=embedding, cache_dir=cache_dir)[None]
+
+def update_index(store: Optional[FAISS], chunks_by_source: Dict[str, List[Tuple[Document, List[float]]]],
+                 embedding=None) -> Optional[FAISS]:
+    """
+    Returns a copy of `store` in which the chunks of every source in `chunks_by_source`
+    are replaced by the given (chunk, vector) pairs; an empty list removes the source.
+
+    `store` itself is never modified, so retrievers built on it keep answering from a
+    consistent snapshot while the copy is updated with FAISS delete/add_embeddings.
+    With store=None a new index is built over `embedding`, or None if there are no chunks.
+    """
+    fresh = [chunk for chunks in chunks_by_source.values() for chunk in chunks]
+    if store is None:
+        return _index_from_chunks(fresh, embedding) if fresh else None
+    # The serialized docstore was produced by this process, so it is trusted
+    updated = FAISS.deserialize_from_bytes(store.serialize_to_bytes(), store.embeddings,
+                                           allow_dangerous_deserialization=True)
+    stale = [doc_id for doc_id in updated.index_to_docstore_id.values()
+             if updated.docstore.search(doc_id).metadata.get("source") in chunks_by_source]
+    if stale:
+        updated.delete(stale)
+    if fresh:
+        updated.add_embeddings([(doc.page_content, vector) for doc, vector in fresh],
+                               metadatas=[doc.metadata for doc, _ in fresh], ids=_chunk_ids(fresh))
+    return updated
 
 #only supports openai for now
 
@@ -46,13 +266,86 @@ from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from app.agent.search_cache import CachedSearchTool, default_search_cache
+
+# "agent" lets the LLM drive the search tool turn by turn; "prefetch" runs a fixed set of
+# query variants concurrently and answers with a single completion over the merged results
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "agent")
+RAG_SEARCH_QUERIES = int(os.getenv("RAG_SEARCH_QUERIES", "3"))
+RAG_SEARCH_TIMEOUT = float(os.getenv("RAG_SEARCH_TIMEOUT", "10"))
+
+def build_search_queries(ingredients, num_queries: int = 3) -> List[str]:
+    """
+    Derives deterministic web search queries from an ingredient list.
+
+    The first query uses every ingredient, the second the first three, and the rest
+    leave one ingredient out at a time so recipes that skip an item are found too.
+    """
+    if isinstance(ingredients, str):
+        ingredients = ingredients.split(",")
+    items = [item.strip() for item in ingredients if item and item.strip()]
+    if not items:
+        return []
+    candidates = [f"best recipes with {', '.join(items)}", f"{' '.join(items[:3])} recipe"]
+    if len(items) > 2:
+        candidates += [f"recipe with {', '.join(items[:i] + items[i + 1:])}" for i in range(len(items) - 1, -1, -1)]
+    queries = []
+    for query in candidates:
+        if query not in queries:
+            queries.append(query)
+    return queries[:num_queries]
+
+def normalize_url(url: str) -> str:
+    """Canonical form used to dedupe search results: lowercase host, no fragment or trailing slash."""
+    parts = urlsplit((url or "").strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), parts.query, ""))
+
 class ExtendedKnowledgeAgent:
-    def __init__(self, role:str, model:str, num_results:int=5):
+    """
+    Answers questions with web search results.
+
+    In "agent" mode a tool-calling AgentExecutor decides what to search. In
+    "prefetch" mode `query` derives query variants from the ingredients, runs them
+    concurrently against `search_tool` (dropping any still running after
+    `search_timeout` seconds), dedupes the results by URL and makes one completion
+    call over the merged context. `search_tool` can be any object with an
+    `invoke(query)` method returning a list of {"url", "content"} dicts, so a stub
+    can stand in for Tavily offline.
+
+    The default Tavily tool is wrapped in a CachedSearchTool backed by the shared
+    on-disk search cache (disable with SEARCH_CACHE=0); pass `search_cache` to cache
+    an injected tool as well.
+
+    Example:
+        >>> agent = ExtendedKnowledgeAgent(role="You are a chef.", model="gpt-4.1", search_mode="prefetch")
+        >>> agent.query("Find 3 recipes as JSON", ingredients="chicken, rice, broccoli")
+    """
+
+    def __init__(self, role:str, model:str, num_results:int=5, search_mode:str=None, search_tool=None,
+                 num_queries:int=RAG_SEARCH_QUERIES, search_timeout:float=RAG_SEARCH_TIMEOUT, search_cache=None):
         client, model_name, api_provider = setup_llm_client(model_name=model)
+        self.role = role
+        self.client = client
+        self.model_name = model_name or model
+        self.api_provider = api_provider
+        self.num_results = num_results
+        self.search_mode = search_mode or RAG_SEARCH_MODE
+        self.num_queries = num_queries
+        self.search_timeout = search_timeout
+        self.last_search = None
+        # 1. Instantiate the Tavily search tool, answering repeated queries from the search cache
+        if search_tool is None:
+            search_tool = TavilySearchResults(max_results=num_results)
+            search_cache = search_cache or default_search_cache()
+        if search_cache is not None:
+            search_tool = CachedSearchTool.wrap(search_tool, search_cache, num_results)
+        self.search_tool = search_tool
+        self.agent_executor = None
+        if self.search_mode == "prefetch":
+            return
+
         llm = ChatOpenAI(model=model_name)
-        # 1. Instantiate the Tavily search tool
-        search_tool = TavilySearchResults(max_results=num_results)
-        tools = [search_tool]
+        tools = [self.search_tool]
 
         # Create the prompt template
         prompt = ChatPromptTemplate.from_messages([
@@ -67,11 +360,80 @@ class ExtendedKnowledgeAgent:
         # 4. Create the AgentExecutor
         self.agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
 
-    def query(self, question: str):
+    def prefetch_search(self, queries: List[str]) -> List[dict]:
+        """Runs `queries` concurrently and returns their results deduped by URL, in query order."""
+        started = time.time()
+        executor = ThreadPoolExecutor(max_workers=max(1, len(queries)), thread_name_prefix="web-search")
+        futures = [executor.submit(self.search_tool.invoke, query) for query in queries]
+        done, not_done = wait(futures, timeout=self.search_timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        results, seen, total = [], set(), 0
+        for query, future in zip(queries, futures):
+            if future not in done:
+                print(f"Warning: web search timed out after {self.search_timeout}s: {query}")
+                continue
+            try:
+                hits = future.result()
+            except Exception as e:
+                print(f"Warning: web search failed for '{query}': {e}")
+                continue
+            if not isinstance(hits, list):  # Tavily returns an error string instead of raising
+                continue
+            for hit in hits:
+                if not isinstance(hit, dict):
+                    continue
+                total += 1
+                key = normalize_url(hit.get("url", "")) or hit.get("content", "")
+                if key and key not in seen:
+                    seen.add(key)
+                    results.append(hit)
+        self.last_search = {
+            "queries": list(queries),
+            "results": total,
+            "unique_results": len(results),
+            "timed_out": len(not_done),
+            "seconds": round(time.time() - started, 3),
+        }
+        return results
+
+    def prefetch_query(self, question: str, ingredients=None, on_token=None) -> str:
+        queries = build_search_queries(ingredients, self.num_queries) if ingredients else [question.strip()]
+        results = self.prefetch_search(queries)
+        context = "\n\n".join(
+            f"[{i}] {hit.get('title') or hit.get('url', '')}\n{hit.get('url', '')}\n{hit.get('content', '')}"
+            for i, hit in enumerate(results, 1)
+        )
+        prompt = f"""{self.role}
+
+Use the web search results below to answer. Prefer recipes that appear in them.
+
+Web search results:
+{context or "(no results)"}
+
+{question}"""
+        if on_token is None:
+            return get_completion(prompt, self.client, self.model_name, self.api_provider, raise_errors=True)
+        deltas = []
+        for delta in stream_completion(prompt, self.client, self.model_name, self.api_provider, raise_errors=True):
+            deltas.append(delta)
+            on_token(delta)
+        return "".join(deltas)
+
+    def query(self, question: str, ingredients=None, on_token=None):
+        """
+        Answers `question`. `on_token`, if given, receives the answer text as it is
+        generated (token by token in prefetch mode, all at once in agent mode).
+        """
+        if self.search_mode == "prefetch":
+            return self.prefetch_query(question, ingredients, on_token)
         # 5. Invoke the agent with a question
         result = self.agent_executor.invoke({"input": question})
         print(result)
-        return result.get('output', result)
+        output = result.get('output', result)
+        if on_token is not None and isinstance(output, str):
+            on_token(output)
+        return output
 
 # python -m app.agent.knowledge_base 
 if __name__ == "__main__":
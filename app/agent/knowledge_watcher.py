@@ -0,0 +1,84 @@
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Seconds between polls of the watched knowledge sources
+KB_WATCH_INTERVAL = float(os.getenv("KB_WATCH_INTERVAL", "5"))
+
+
+class KnowledgeWatcher:
+    """
+    Polls the knowledge sources of an AgentInfo under `directory` and re-indexes the
+    ones that change, on a background thread.
+
+    A file counts as changed when its mtime or size differs from the last poll; a
+    deleted file is removed from every key that lists it, and re-indexed if it comes
+    back. Only paths already registered as sources are watched, so new files are picked
+    up after `AgentInfo.add_knowledge_source(key, path)`. Refreshes swap in updated
+    retrievers (see `AgentInfo.refresh_knowledge`), so queries are never blocked.
+
+    Example:
+        >>> watcher = KnowledgeWatcher(agent.agentInfo, "artifacts", interval=2).start()
+        >>> watcher.stop()
+    """
+
+    def __init__(self, agent_info, directory: str = "artifacts", interval: float = KB_WATCH_INTERVAL):
+        self.agent_info = agent_info
+        self.directory = os.path.abspath(directory)
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"polls": 0, "refreshes": 0, "errors": 0}
+
+    def _watched_paths(self) -> List[str]:
+        sources = {path for paths in list(self.agent_info.knowledge_sources.values()) for path in paths}
+        return sorted(path for path in sources
+                      if os.path.commonpath([self.directory, os.path.abspath(path)]) == self.directory)
+
+    def _scan(self) -> Dict[str, Optional[Tuple[int, int]]]:
+        snapshot = {}
+        for path in self._watched_paths():
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                snapshot[path] = None
+        return snapshot
+
+    def poll(self) -> List[str]:
+        """Checks the watched files once and refreshes the changed ones; returns their paths."""
+        snapshot = self._scan()
+        changed = [path for path, signature in snapshot.items() if self._snapshot.get(path) != signature]
+        self._stats["polls"] += 1
+        if changed:
+            self.agent_info.refresh_knowledge(changed)
+            self._stats["refreshes"] += 1
+        # Only recorded after a successful refresh, so a failed one is retried on the next poll
+        self._snapshot = snapshot
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                changed = self.poll()
+                if changed:
+                    print(f"Knowledge refreshed for: {', '.join(changed)}")
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"Warning: knowledge refresh failed, retrying on the next poll: {e}")
+
+    def start(self) -> "KnowledgeWatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="knowledge-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {**self._stats, "watched": len(self._snapshot), "running": bool(self._thread and self._thread.is_alive())}
@@ -1,61 +1,135 @@
 import sys
 import os
+import threading
 
 from langgraph.graph import StateGraph
 from langchain_core.documents import Document
 
 
+from app.agent.dependencies import require_agent_features
 from app.agent.knowledge_base import *
-from app.agent.utils import setup_llm_client
-
-# Add the project's root directory to the Python path
-def install_if_missing(package):
-    import importlib
-    try:
-        importlib.import_module(package)
-    except ImportError:
-        print(f"{package} not found, installing...")
-        import subprocess
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", package])
+from app.agent.knowledge_watcher import KnowledgeWatcher, KB_WATCH_INTERVAL
+from app.agent.utils import setup_llm_client, setup_async_llm_client
 
 class AgentInfo:
-    def __init__(self, client, model_name, api_provider):
+    def __init__(self, client, model_name, api_provider, embedding=None):
         self.client = client
         self.model_name = model_name
         self.api_provider = api_provider
         self.knowledge_store = {}
-
-    def add_knowledge(self, key, artifacts: str):
-        knowledge = create_knowledge_base(artifacts)
-        self.knowledge_store[key] = knowledge
+        # Source paths and embedding model of each knowledge key, used to route incremental refreshes
+        self.knowledge_sources = {}
+        self.knowledge_embeddings = {}
+        self.embedding = embedding
+        self._embeddings = {}
+        self._knowledge_lock = threading.Lock()
+
+    @property
+    def async_client(self):
+        # Looked up on each use: async clients belong to the running event loop
+        return setup_async_llm_client(self.model_name)[0] if self.model_name else None
+
+    def _knowledge_embedding(self, backend=None):
+        # An Embeddings instance is used as is; backend names share one model per agent
+        if backend is not None and not isinstance(backend, str):
+            return backend
+        if backend is None and self.embedding is not None:
+            return self.embedding
+        if backend not in self._embeddings:
+            self._embeddings[backend] = create_embedding(backend)
+        return self._embeddings[backend]
+
+    def add_knowledge(self, key, artifacts: str, backend=None):
+        self.add_knowledge_bases([(key, artifacts, backend)])
+
+    def add_knowledge_bases(self, knowledge_base):
+        # One embedding pass for all keys; artifacts shared between keys are embedded once
+        entries = [(entry[0], entry[1], self._knowledge_embedding(entry[2] if len(entry) > 2 else None))
+                   for entry in knowledge_base]
+        retrievers = create_knowledge_bases(entries)
+        with self._knowledge_lock:
+            for key, artifacts, embedding in entries:
+                self.knowledge_sources[key] = list(dict.fromkeys(artifacts))
+                self.knowledge_embeddings[key] = embedding
+            self.knowledge_store.update(retrievers)
 
     def get_knowledge(self, key):
         return self.knowledge_store.get(key)
 
+    def add_knowledge_source(self, key, path: str):
+        """Indexes one more artifact under `key` without rebuilding the rest of its index."""
+        with self._knowledge_lock:
+            sources = self.knowledge_sources.setdefault(key, [])
+            self.knowledge_embeddings.setdefault(key, self._knowledge_embedding())
+            if path not in sources:
+                sources.append(path)
+            self._refresh_sources([path], keys=[key])
+
+    def update_knowledge_source(self, path: str):
+        """Re-reads `path` for every key that lists it; a deleted file is dropped from the index."""
+        self.refresh_knowledge([path])
+
+    def remove_knowledge_source(self, path: str, keys=None):
+        """Stops indexing `path` under `keys` (default: every key) and drops its chunks."""
+        with self._knowledge_lock:
+            keys = [key for key in (keys or list(self.knowledge_sources)) if path in self.knowledge_sources.get(key, [])]
+            for key in keys:
+                self.knowledge_sources[key].remove(path)
+                self._swap_knowledge(key, {path: []})
+
+    def refresh_knowledge(self, paths):
+        """Re-indexes the given source paths in every key that lists them."""
+        with self._knowledge_lock:
+            self._refresh_sources(paths)
+
+    def _refresh_sources(self, paths, keys=None):
+        # Only the changed files are re-embedded, once per embedding model; missing files
+        # come back with no chunks and are removed
+        loaded = {}
+        for key, sources in self.knowledge_sources.items():
+            if keys is not None and key not in keys:
+                continue
+            changed = [path for path in paths if path in sources]
+            if not changed:
+                continue
+            embedding = self.knowledge_embeddings[key]
+            if id(embedding) not in loaded:
+                loaded[id(embedding)] = load_artifact_chunks(list(paths), embedding)
+            self._swap_knowledge(key, {path: loaded[id(embedding)].get(path, []) for path in changed})
+
+    def _swap_knowledge(self, key, chunks_by_source):
+        # update_index works on a copy, so queries holding the old retriever see a consistent
+        # index until this single assignment publishes the new one
+        current = self.knowledge_store.get(key)
+        store = update_index(current.vectorstore if current else None, chunks_by_source, self.knowledge_embeddings[key])
+        self.knowledge_store[key] = store.as_retriever() if store else None
+
 
 
 class RAGAgent:
-    def __init__(self, knowledge_base, agent, model_name="gpt-4.1"):
-        # Robust project root detection: always points to workspace root
-        # This assumes this file is in <workspace>/app/agent.py
-        install_if_missing('langgraph')
-        install_if_missing('langchain')
-        install_if_missing('langchain_community')
-        install_if_missing('langchain_openai')
-        install_if_missing('faiss-cpu')
-        install_if_missing('pypdf')
-        install_if_missing('langchain')
-        install_if_missing('tavily')
+    def __init__(self, knowledge_base, agent, model_name="gpt-4.1", async_agent=None):
+        # Fails with the pip command to run instead of installing packages mid-request
+        require_agent_features("graph", "knowledge_base")
 
         client, model_name, api_provider = setup_llm_client(model_name=model_name)
         self.agentInfo = AgentInfo(client, model_name, api_provider)
 
         # TODO: Update this based on project needs
 
-        for i in range(len(knowledge_base)):
-            self.agentInfo.add_knowledge(knowledge_base[i][0], knowledge_base[i][1])
+        self.agentInfo.add_knowledge_bases(knowledge_base)
+        self.knowledge_watcher = None
+        if os.getenv("KB_WATCH", "0") == "1":
+            self.watch_knowledge()
 
         self.graph = agent
+        # A graph with async nodes can only be run with ainvoke; sync graphs support both
+        self.async_graph = async_agent or agent
+
+    def watch_knowledge(self, directory="artifacts", interval=None):
+        """Starts re-indexing this agent's artifacts under `directory` when they change on disk."""
+        if self.knowledge_watcher is None:
+            self.knowledge_watcher = KnowledgeWatcher(self.agentInfo, directory, interval or KB_WATCH_INTERVAL)
+        return self.knowledge_watcher.start()
 
     def query(self, question, key="answer"):
         
@@ -72,6 +146,20 @@ class RAGAgent:
         else:
             return ""
 
+    async def aquery(self, question, key="answer"):
+        result = await self.async_graph.ainvoke({"question": question, "documents": [], "answer": "", "agent": self.agentInfo})
+        if (result and result[key]):
+            return result[key]
+        else:
+            return ""
+
+    async def adict_query(self, query_dict: any, key="answer"):
+        result = await self.async_graph.ainvoke(query_dict)
+        if (result and result[key]):
+            return result[key]
+        else:
+            return ""
+
 
 if __name__ == "__main__":
     from demo_agent import create_pm_agent, get_pm_knowledge
@@ -2,12 +2,19 @@ from typing import TypedDict, List, Any
 from langgraph.graph import StateGraph
 from langchain_core.documents import Document
 from langgraph.graph import START, END
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 import json
+import os
+import re
 
-from app.agent.utils import get_completion, setup_llm_client
+from app.agent.utils import get_completion, async_get_completion, setup_llm_client, clean_llm_output
 from app.agent.rag_agent import AgentInfo, RAGAgent
 from app.agent.knowledge_base import ExtendedKnowledgeAgent, init_knowledge
 
+# Upper bound on concurrent per-index extraction calls, however many recipes are requested
+EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", "5"))
+
 schema_artifacts = ["artifacts/schema.sql", "artifacts/seed_data.sql"]
 
 base_knowledge = [
@@ -25,6 +32,9 @@ class RecipeAgentState(TypedDict):
     code_files: List[Any]
     answer: str
     recipe_list: List[dict]
+    extraction_path: str
+    on_recipe: Any  # optional callback invoked with each recipe as it is extracted
+    on_token: Any  # optional callback invoked with each piece of the cook agent's answer as it streams
 
 def load_cook_agent_node(state: RecipeAgentState) -> RecipeAgentState:
     # role_prompt = f"""You are a professional chef that suggests recipes based on web search results and a provided list of ingredients.
@@ -54,13 +64,17 @@ def fetch_recipes_node(state: RecipeAgentState) -> RecipeAgentState:
 
         Ingredients:{ingredients}
     """
-    json_output_str = cook_agent.query(question)
+    json_output_str = cook_agent.query(question, ingredients=ingredients, on_token=state.get("on_token"))
     if '```' in json_output_str:
         answer = json_output_str.split('```')[1].lstrip('json').strip()
     else:
         answer = json_output_str
     return {**state, "answer": answer}
 
+async def afetch_recipes_node(state: RecipeAgentState) -> RecipeAgentState:
+    # The cook agent's web search and tool loop are synchronous; keep them off the event loop
+    return await asyncio.to_thread(fetch_recipes_node, state)
+
 def load_code_files_node(state: RecipeAgentState) -> RecipeAgentState:
     agentInfo = state["coding_agent"]
     retriever = agentInfo.get_knowledge("code_schema")
@@ -71,16 +85,87 @@ def load_code_files_node(state: RecipeAgentState) -> RecipeAgentState:
         print("No code schema knowledge base found.")
         return {**state, "code_files": []}
 
+def repair_json(text: str) -> str:
+    """
+    Applies tolerant fixes for the JSON mistakes LLMs commonly make: code fences,
+    surrounding prose, smart quotes and trailing commas.
+    """
+    text = clean_llm_output(text or "", language='json')
+    starts = [i for i in (text.find('['), text.find('{')) if i != -1]
+    if starts:
+        text = text[min(starts):]
+    closing = max(text.rfind(']'), text.rfind('}'))
+    if closing != -1:
+        text = text[:closing + 1]
+    text = text.replace('\u201c', '"').replace('\u201d', '"').replace('\u2018', "'").replace('\u2019', "'")
+    return re.sub(r',\s*([}\]])', r'\1', text)
+
+def _decode_objects(text: str) -> List[dict]:
+    """Decodes the complete objects of a (possibly truncated) JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    objects = []
+    if not text.startswith('['):
+        return objects
+    pos = 1
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            break
+        try:
+            obj, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        objects.append(obj)
+    return objects
+
+def parse_recipe_array(answer: str) -> List[dict]:
+    """
+    Parses the cook agent's answer into a list of recipe dicts without calling an LLM.
+
+    Returns an empty list when the answer cannot be recovered locally.
+    """
+    parsed = None
+    for candidate in (clean_llm_output(answer or "", language='json'), repair_json(answer)):
+        try:
+            parsed = json.loads(candidate)
+            break
+        except json.JSONDecodeError:
+            continue
+    if parsed is None:
+        parsed = _decode_objects(repair_json(answer))
+    if isinstance(parsed, dict):
+        parsed = parsed.get("recipes", [parsed])
+    if not isinstance(parsed, list):
+        return []
+    return [recipe for recipe in parsed if isinstance(recipe, dict) and recipe.get("title")]
+
+def extract_all_recipes(agentInfo: AgentInfo, recipe_str: str, num_recipes: int) -> List[dict]:
+    answer = get_completion(_extract_all_prompt(recipe_str, num_recipes), agentInfo.client, agentInfo.model_name, agentInfo.api_provider, temperature=0, raise_errors=True)
+    return parse_recipe_array(answer)
+
 def extract_single_recipe(agentInfo: AgentInfo, recipe_str: str, index) -> dict:
     # # schema = agentInfo.get_knowledge("code_schema")
-    prompt = f"""Acting as a Senior Software Developer, extract the JSON Object at index {index} from the below JSON Array.
+    answer = get_completion(_extract_single_prompt(recipe_str, index), agentInfo.client, agentInfo.model_name, agentInfo.api_provider, temperature=0, raise_errors=True)
+    return _parse_single_recipe(answer)
+
+def _extract_all_prompt(recipe_str: str, num_recipes: int) -> str:
+    return f"""Acting as a Senior Software Developer, extract the first {num_recipes} JSON Objects from the below text.
+    Output only a valid JSON array containing those objects with no additional text.
+
+    Text: {recipe_str}
+    """
+
+def _extract_single_prompt(recipe_str: str, index) -> str:
+    return f"""Acting as a Senior Software Developer, extract the JSON Object at index {index} from the below JSON Array.
     Output only the valid JSON object as with no additional text.
 
     JSON Array: {recipe_str}
     """
-    answer = get_completion(prompt, agentInfo.client, agentInfo.model_name, agentInfo.api_provider)
+
+def _parse_single_recipe(answer: str):
     try:
-        recipe = json.loads(answer)
+        recipe = json.loads(clean_llm_output(answer, language='json'))
         if isinstance(recipe, dict):
             return recipe
         else:
@@ -89,30 +174,92 @@ def extract_single_recipe(agentInfo: AgentInfo, recipe_str: str, index) -> dict:
     except:
         return None
 
-        
+def _async_client(agentInfo: AgentInfo):
+    # Falls back to the sync client, which async_get_completion runs on a worker thread
+    return getattr(agentInfo, "async_client", None) or agentInfo.client
+
+async def aextract_all_recipes(agentInfo: AgentInfo, recipe_str: str, num_recipes: int) -> List[dict]:
+    answer = await async_get_completion(_extract_all_prompt(recipe_str, num_recipes), _async_client(agentInfo),
+                                        agentInfo.model_name, agentInfo.api_provider, temperature=0, raise_errors=True)
+    return parse_recipe_array(answer)
 
+async def aextract_single_recipe(agentInfo: AgentInfo, recipe_str: str, index) -> dict:
+    answer = await async_get_completion(_extract_single_prompt(recipe_str, index), _async_client(agentInfo),
+                                        agentInfo.model_name, agentInfo.api_provider, temperature=0, raise_errors=True)
+    return _parse_single_recipe(answer)
+
+def _publish_recipe(state: RecipeAgentState, recipe: dict, position: int):
+    print(f"Extracted recipe {position}: {recipe}")
+    on_recipe = state.get("on_recipe")
+    if on_recipe:
+        on_recipe(recipe)
+
+def _finish_extraction(state: RecipeAgentState, recipe_list: List[dict], extraction_path: str,
+                       published: bool = False) -> RecipeAgentState:
+    if not recipe_list:
+        extraction_path = "failed"
+
+    if not published:
+        for i, recipe in enumerate(recipe_list):
+            _publish_recipe(state, recipe, i + 1)
+    print(f"Recipe extraction path: {extraction_path}")
+    return {**state, "recipe_list": recipe_list, "extraction_path": extraction_path}
 
 def extract_recipes_node(state: RecipeAgentState) -> RecipeAgentState:
     answer = state.get("answer", "")
-    num_recipes = state.get("num_recipes", 3)
+    num_recipes = state.get("num_recipes") or 3
     agentInfo = state.get("coding_agent", {})
-    recipe_list = []
 
-    # Attempt to parse the answer as JSON after verifying with llm
-    for i in range (0, num_recipes):
-        recipe = extract_single_recipe(agentInfo, answer, i)
-        if recipe:
-            print(f"Extracted recipe {i+1}: {recipe}")
-            recipe_list.append(recipe)
+    # Cheapest first: parse locally, then one batched LLM call, then concurrent per-index calls
+    extraction_path = "local"
+    recipe_list = parse_recipe_array(answer)[:num_recipes]
+    if not recipe_list:
+        extraction_path = "batched"
+        recipe_list = extract_all_recipes(agentInfo, answer, num_recipes)[:num_recipes]
+    if not recipe_list:
+        # Each recipe is published as soon as its call returns; the list keeps index order
+        recipes = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(num_recipes, EXTRACT_MAX_WORKERS))) as executor:
+            futures = {executor.submit(extract_single_recipe, agentInfo, answer, i): i for i in range(num_recipes)}
+            for future in as_completed(futures):
+                recipe = future.result()
+                if recipe:
+                    recipes[futures[future]] = recipe
+                    _publish_recipe(state, recipe, len(recipes))
+        return _finish_extraction(state, [recipes[i] for i in sorted(recipes)], "per_index", published=True)
+    return _finish_extraction(state, recipe_list, extraction_path)
 
-    return {**state, "recipe_list": recipe_list}
+async def aextract_recipes_node(state: RecipeAgentState) -> RecipeAgentState:
+    """Async extract_recipes_node: the per-index fallback awaits its calls together instead of using threads."""
+    answer = state.get("answer", "")
+    num_recipes = state.get("num_recipes") or 3
+    agentInfo = state.get("coding_agent", {})
+
+    extraction_path = "local"
+    recipe_list = parse_recipe_array(answer)[:num_recipes]
+    if not recipe_list:
+        extraction_path = "batched"
+        recipe_list = (await aextract_all_recipes(agentInfo, answer, num_recipes))[:num_recipes]
+    if not recipe_list:
+        async def extract(i):
+            return i, await aextract_single_recipe(agentInfo, answer, i)
 
-def create_recipe_agent():
+        recipes = {}
+        for next_done in asyncio.as_completed([extract(i) for i in range(num_recipes)]):
+            i, recipe = await next_done
+            if recipe:
+                recipes[i] = recipe
+                _publish_recipe(state, recipe, len(recipes))
+        return _finish_extraction(state, [recipes[i] for i in sorted(recipes)], "per_index", published=True)
+    return _finish_extraction(state, recipe_list, extraction_path)
+
+def create_recipe_agent(use_async=False):
+    """Compiles the recipe graph; with use_async=True its nodes are coroutines and it must be run with ainvoke()."""
     agent_graph = StateGraph(RecipeAgentState)
     # agent_graph.add_node("FETCH_RECIPES", load_cook_agent_node)
-    agent_graph.add_node("FETCH_RECIPES", fetch_recipes_node)
+    agent_graph.add_node("FETCH_RECIPES", afetch_recipes_node if use_async else fetch_recipes_node)
     # agent_graph.add_node("LOAD_CODE_FILES", load_code_files_node)
-    agent_graph.add_node("EXTRACT_RECIPES", extract_recipes_node)
+    agent_graph.add_node("EXTRACT_RECIPES", aextract_recipes_node if use_async else extract_recipes_node)
 
 
     agent_graph.add_edge(START, "FETCH_RECIPES",)
@@ -128,7 +275,8 @@ class RecipeRAGAgent:
     def __init__(self, model_name="gpt-4.1"):
         ingredients = "apples, banannas, mangos"
 
-        self.agent = RAGAgent(get_recipe_knowledge(), create_recipe_agent(), model_name = "gpt-4.1")
+        self.agent = RAGAgent(get_recipe_knowledge(), create_recipe_agent(), model_name = "gpt-4.1",
+                              async_agent=create_recipe_agent(use_async=True))
         num_recipes = 3
 
         role_prompt = f"""You are a professional chef that suggests recipes based on web search results and a provided list of ingredients.
@@ -143,13 +291,45 @@ class RecipeRAGAgent:
             num_recipes=num_recipes,
             code_files=[],
             answer="",
-            recipe_list=[]
+            recipe_list=[],
+            extraction_path="",
+            on_recipe=None,
+            on_token=None
         )
-    def query(self, ingredients:str, num_recipes:int=3) -> List[dict]:
-        recipe_state = self.initial_recipe_state
+
+    def _initial_state(self, ingredients:str, num_recipes:int, on_recipe, on_token) -> RecipeAgentState:
+        # Copy the template state so a pooled agent never carries results between queries
+        recipe_state = RecipeAgentState(**self.initial_recipe_state)
         recipe_state["ingredients"] = ingredients
         recipe_state["num_recipes"] = num_recipes
-        return self.agent.dict_query(recipe_state, key="recipe_list")
+        recipe_state["on_recipe"] = on_recipe
+        recipe_state["on_token"] = on_token
+        return recipe_state
+
+    @staticmethod
+    def _search_result(result) -> dict:
+        result = result or {}
+        return {
+            "recipe_list": result.get("recipe_list") or [],
+            "extraction_path": result.get("extraction_path", ""),
+        }
+
+    def search(self, ingredients:str, num_recipes:int=3, on_recipe=None, on_token=None) -> dict:
+        """
+        Runs the recipe graph and returns the recipes plus the extraction path that produced them.
+        `on_recipe`, if given, is called with each recipe as soon as it is extracted, and
+        `on_token` with each piece of the raw recipe answer while it is generated.
+        """
+        recipe_state = self._initial_state(ingredients, num_recipes, on_recipe, on_token)
+        return self._search_result(self.agent.graph.invoke(recipe_state))
+
+    async def asearch(self, ingredients:str, num_recipes:int=3, on_recipe=None, on_token=None) -> dict:
+        """Async search(): runs the async recipe graph, awaiting extraction calls on the shared async client."""
+        recipe_state = self._initial_state(ingredients, num_recipes, on_recipe, on_token)
+        return self._search_result(await self.agent.async_graph.ainvoke(recipe_state))
+
+    def query(self, ingredients:str, num_recipes:int=3) -> List[dict]:
+        return self.search(ingredients, num_recipes)["recipe_list"]
 
 
 
@@ -0,0 +1,170 @@
+import copy
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+
+@functools.lru_cache(maxsize=65536)
+def canonical_ingredient_name(name: str) -> str:
+    """
+    Normalizes one ingredient name so spelling variants compare equal.
+
+    Lowercases, drops punctuation, collapses whitespace and singularizes the last
+    word with a few simple English rules ("Tomatoes" -> "tomato", "Eggs" -> "egg").
+    Memoized, since bulk imports see the same ingredient names over and over.
+    """
+    words = re.sub(r"[^a-z0-9 ]+", " ", (name or "").lower()).split()
+    if not words:
+        return ""
+    last = words[-1]
+    if last.endswith("ies") and len(last) > 4:
+        last = last[:-3] + "y"
+    elif last.endswith("oes") and len(last) > 4:
+        last = last[:-2]
+    elif last.endswith("s") and not last.endswith(("ss", "us", "is")) and len(last) > 3:
+        last = last[:-1]
+    words[-1] = last
+    return " ".join(words)
+
+
+def canonicalize_ingredients(ingredients: str) -> Tuple[str, ...]:
+    """Turns a free-form ingredient list ("Rice,  chicken;broccoli") into a sorted, de-duplicated tuple."""
+    names = (canonical_ingredient_name(part) for part in re.split(r"[,;\n]", ingredients or ""))
+    return tuple(sorted({name for name in names if name}))
+
+
+class RecipeSearchCache:
+    """
+    An LRU + TTL cache of RAG recipe searches keyed by the canonical ingredient set
+    and the number of recipes requested.
+
+    Lookups try, in order:
+        1. an exact match on the canonical key,
+        2. when an `embedding` is given, the most similar cached ingredient set with
+           the same num_recipes whose cosine similarity is at least `similarity_threshold`
+           (an embedding error is logged and skips this tier),
+        3. when a `backing_store(key, num_recipes)` callable is given, previously
+           persisted recipes (results from it are cached like fresh searches).
+
+    Example:
+        >>> cache = RecipeSearchCache(max_entries=128, ttl_seconds=600)
+        >>> cache.put("chicken, rice", 3, recipes)
+        >>> cache.get("Rice , CHICKEN", 3) == recipes
+        True
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600, embedding=None,
+                 similarity_threshold: float = 0.95, backing_store=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embedding = embedding
+        self.similarity_threshold = similarity_threshold
+        self.backing_store = backing_store
+        self._entries = OrderedDict()  # key -> (expires_at, recipes, vector)
+        # Query vectors from missed lookups, so the put that follows the search doesn't embed again
+        self._query_vectors = OrderedDict()  # canonical ingredients -> vector
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "semantic_hits": 0, "store_hits": 0, "misses": 0, "evictions": 0,
+                       "embedding_errors": 0}
+
+    @staticmethod
+    def make_key(ingredients: str, num_recipes: int) -> tuple:
+        return canonicalize_ingredients(ingredients), num_recipes
+
+    def _embed(self, key: tuple):
+        """Returns the normalized vector of the key's ingredient set, or None if the embedding call fails."""
+        with self._lock:
+            vector = self._query_vectors.pop(key[0], None)
+        if vector is not None:
+            return vector
+        import numpy as np
+        try:
+            vector = np.asarray(self.embedding.embed_query(", ".join(key[0])), dtype="float32")
+        except Exception as e:
+            print(f"Warning: RAG cache embedding failed, skipping the similarity tier: {e}")
+            with self._lock:
+                self._stats["embedding_errors"] += 1
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remember_query_vector(self, key: tuple, vector):
+        with self._lock:
+            self._query_vectors[key[0]] = vector
+            self._query_vectors.move_to_end(key[0])
+            while len(self._query_vectors) > max(self.max_entries, 1):
+                self._query_vectors.popitem(last=False)
+
+    def _semantic_lookup(self, key: tuple, now: float) -> Optional[List[dict]]:
+        vector = self._embed(key)
+        if vector is None:
+            return None
+        best_score, best_recipes = -1.0, None
+        with self._lock:
+            candidates = [(k, entry) for k, entry in self._entries.items()
+                          if k[1] == key[1] and entry[0] > now and entry[2] is not None]
+        for cached_key, (_, recipes, cached_vector) in candidates:
+            score = float(vector @ cached_vector)
+            if score > best_score:
+                best_score, best_recipes = score, recipes
+        if best_recipes is not None and best_score >= self.similarity_threshold:
+            return best_recipes
+        self._remember_query_vector(key, vector)
+        return None
+
+    def get(self, ingredients: str, num_recipes: int) -> Optional[List[dict]]:
+        key = self.make_key(ingredients, num_recipes)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+            if entry:
+                del self._entries[key]
+
+        if self.embedding is not None and key[0]:
+            recipes = self._semantic_lookup(key, now)
+            if recipes is not None:
+                with self._lock:
+                    self._stats["semantic_hits"] += 1
+                return copy.deepcopy(recipes)
+
+        if self.backing_store is not None:
+            recipes = self.backing_store(key[0], num_recipes)
+            if recipes:
+                with self._lock:
+                    self._stats["store_hits"] += 1
+                self.put(ingredients, num_recipes, recipes)
+                return copy.deepcopy(recipes)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, ingredients: str, num_recipes: int, recipes: List[dict]):
+        key = self.make_key(ingredients, num_recipes)
+        vector = self._embed(key) if self.embedding is not None and key[0] else None
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, copy.deepcopy(recipes), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._query_vectors.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["semantic_hits"] + stats["store_hits"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else None
+        return stats
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import threading
+from typing import Any, List, Optional
+
+from app.agent.sqlite_cache import SQLiteCache
+
+# Persistent web search cache shared by every ExtendedKnowledgeAgent in the process
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join("artifacts", ".search_cache.sqlite3"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+
+def normalize_search_query(query: str) -> str:
+    """Lowercases and collapses whitespace so trivially different spellings share a cache entry."""
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+class SearchResultCache:
+    """
+    A SQLite-backed TTL + LRU cache of web search results keyed by the normalized
+    query and max_results, stored as JSON in a SQLiteCache.
+
+    Entries older than `ttl_seconds` are treated as misses and removed; once more
+    than `max_entries` are stored, the least recently read ones are evicted.
+    Use path=":memory:" for a cache that lives only as long as the object.
+
+    Example:
+        >>> cache = SearchResultCache("artifacts/.search_cache.sqlite3", ttl_seconds=3600)
+        >>> cache.put("Chicken  Rice recipe", 5, [{"url": "https://example.com", "content": "..."}])
+        >>> cache.get("chicken rice recipe", 5)
+        [{'url': 'https://example.com', 'content': '...'}]
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl_seconds: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._store = SQLiteCache(path, "search_cache", ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        return f"{max_results}|{normalize_search_query(query)}"
+
+    def get(self, query: str, max_results: int) -> Optional[List[Any]]:
+        results = self._store.get(self.make_key(query, max_results))
+        return json.loads(results) if results is not None else None
+
+    def put(self, query: str, max_results: int, results: List[Any]):
+        self._store.put(self.make_key(query, max_results), json.dumps(results))
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self) -> dict:
+        stats = self._store.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+
+def _define_cached_search_tool():
+    # LangChain is only needed once an agent wraps a tool, not to read cache stats
+    from langchain_core.tools import BaseTool
+
+    class CachedSearchTool(BaseTool):
+        """
+        Wraps a search tool so repeated queries are answered from a SearchResultCache.
+
+        It keeps the wrapped tool's name, description and argument schema, so it can be
+        handed to a tool-calling agent in its place. Only list results are cached; error
+        strings from the search API are passed through and retried next time.
+        """
+
+        tool: Any
+        cache: Any
+        max_results: int = 5
+
+        @classmethod
+        def wrap(cls, tool, cache: SearchResultCache, max_results: int) -> "CachedSearchTool":
+            return cls(
+                name=getattr(tool, "name", "web_search"),
+                description=getattr(tool, "description", "Searches the web and returns result URLs and content."),
+                args_schema=getattr(tool, "args_schema", None),
+                tool=tool,
+                cache=cache,
+                max_results=max_results,
+            )
+
+        def _run(self, query: str, run_manager=None, **kwargs):
+            cached = self.cache.get(query, self.max_results)
+            if cached is not None:
+                return cached
+            results = self.tool.invoke(query)
+            if isinstance(results, list):
+                self.cache.put(query, self.max_results, results)
+            return results
+
+    return CachedSearchTool
+
+
+_tool_class_lock = threading.Lock()
+
+
+def __getattr__(name):
+    if name == "CachedSearchTool":
+        with _tool_class_lock:
+            if name not in globals():
+                globals()[name] = _define_cached_search_tool()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_search_cache() -> Optional[SearchResultCache]:
+    """Returns the process-wide cache at SEARCH_CACHE_PATH, or None when SEARCH_CACHE=0."""
+    global _default_cache
+    if os.getenv("SEARCH_CACHE", "1") != "1":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SearchResultCache()
+        return _default_cache
+
+
+def search_cache_stats() -> Optional[dict]:
+    """Stats of the process-wide cache, or None if no agent has used it yet."""
+    return _default_cache.stats() if _default_cache is not None else None
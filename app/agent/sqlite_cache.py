@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+_COLUMNS = ["key", "value", "created_at", "accessed_at"]
+
+
+class SQLiteCache:
+    """
+    A thread-safe SQLite key-value store with optional TTL expiry and LRU eviction,
+    shared by the search, completion and embedding caches.
+
+    Values are stored as given (str or bytes); callers own the key scheme and the
+    serialization. Entries older than `ttl_seconds` count as misses and are removed;
+    once more than `max_entries` are stored, the least recently read ones are evicted.
+    None disables either limit. Use path=":memory:" for a store that lives only as
+    long as the object. A table left by an older layout is dropped and recreated.
+
+    Example:
+        >>> store = SQLiteCache("artifacts/.search_cache.sqlite3", "search_cache", ttl_seconds=3600, max_entries=5000)
+        >>> store.put("5|chicken rice", '[{"url": "https://example.com"}]')
+        >>> store.get("5|chicken rice")
+        '[{"url": "https://example.com"}]'
+    """
+
+    def __init__(self, path: str, table: str, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name {table!r}")
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if columns and columns != _COLUMNS:
+                self._conn.execute(f"DROP TABLE {table}")
+            self._conn.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_accessed_at ON {table} (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Returns the live entries among `keys`, marking them as recently read."""
+        keys = list(dict.fromkeys(keys))
+        found, expired = {}, []
+        now = time.time()
+        with self._lock, self._conn:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({', '.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self.ttl_seconds is not None and created_at + self.ttl_seconds <= now:
+                        expired.append(key)
+                    else:
+                        found[key] = value
+            if expired:
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in expired])
+            # Read times only matter for choosing what to evict
+            if found and self.max_entries is not None:
+                self._conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(keys) - len(found)
+            self._stats["expired"] += len(expired)
+        return found
+
+    def put(self, key: str, value: Any):
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, Any]):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items.items()],
+            )
+            if self.max_entries is not None:
+                excess = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        f"DELETE FROM {self.table} WHERE key IN "
+                        f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)", (excess,)
+                    )
+                    self._stats["evictions"] += excess
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return stats
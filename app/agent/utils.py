@@ -4,69 +4,126 @@
 #              and simplifies common tasks like artifact management.
 # -----------------------------------------------------------------
 import os
-import requests
-from PIL import Image
+import importlib
 from io import BytesIO
 import re
 import base64
 import mimetypes
+import hashlib
+import threading
 import time # For loading indicator
+import weakref
 
-# --- Dynamic Library Installation ---
-try:
-    from dotenv import load_dotenv
-    from IPython.display import display, Markdown, Image as IPyImage
-    from plantuml import PlantUML
-except ImportError:
-    # Provide safe fallbacks so the module can be imported even when optional deps are missing.
-    print("Warning: Optional core dependencies not found. Some features will be degraded.")
-    print("To enable full functionality run: pip install python-dotenv ipython plantuml")
-
-    # noop load_dotenv fallback
-    def load_dotenv(*args, **kwargs):
-        print("Warning: python-dotenv not installed; .env will not be loaded.")
-
-    # minimal IPython.display fallbacks
-    def display(*args, **kwargs):
+# --- Lazy Library Loading ---
+# Importing this module must stay cheap: the web app imports it for metrics and
+# settings, so HTTP, imaging and notebook libraries are only loaded when used.
+
+class _LazyModule:
+    """Stands in for a module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+requests = _LazyModule("requests")
+Image = _LazyModule("PIL.Image")
+
+_optional_deps = {}
+_optional_deps_lock = threading.Lock()
+
+def _optional(name):
+    """
+    Returns an optional core dependency, importing it on first use.
+
+    Missing libraries are replaced with safe fallbacks so the helpers keep working
+    with degraded features, and a warning is printed once per library.
+    """
+    with _optional_deps_lock:
+        if name not in _optional_deps:
+            _optional_deps[name] = _import_optional(name)
+        return _optional_deps[name]
+
+def _import_optional(name):
+    try:
+        if name == "load_dotenv":
+            from dotenv import load_dotenv as loaded
+        elif name == "PlantUML":
+            from plantuml import PlantUML as loaded
+        else:
+            loaded = getattr(importlib.import_module("IPython.display"), name)
+        return loaded
+    except ImportError:
+        pass
+    # Provide safe fallbacks so the module can be used even when optional deps are missing.
+    package = {"load_dotenv": "python-dotenv", "PlantUML": "plantuml"}.get(name, "ipython")
+    print(f"Warning: Optional dependency {package} not found. Some features will be degraded.")
+    print(f"To enable full functionality run: pip install {package}")
+    if name == "load_dotenv":
+        # noop load_dotenv fallback
+        def loaded(*args, **kwargs):
+            print("Warning: python-dotenv not installed; .env will not be loaded.")
+    elif name == "display":
         # no-op in non-notebook environments
-        return None
+        def loaded(*args, **kwargs):
+            return None
+    elif name == "Markdown":
+        def loaded(text):
+            return text
+    elif name == "Image":
+        class loaded:
+            def __init__(self, *args, **kwargs):
+                # placeholder for notebook image object
+                pass
+    else:
+        # PlantUML fallback
+        class loaded:
+            def __init__(self, url=None):
+                print("Warning: plantuml not installed; rendering disabled.")
+            def processes(self, *args, **kwargs):
+                print("PlantUML rendering skipped (plantuml not installed).")
+    return loaded
+
+def load_dotenv(*args, **kwargs):
+    return _optional("load_dotenv")(*args, **kwargs)
 
-    def Markdown(text):
-        return text
+def display(*args, **kwargs):
+    return _optional("display")(*args, **kwargs)
 
-    class IPyImage:
-        def __init__(self, *args, **kwargs):
-            # placeholder for notebook image object
-            pass
+def Markdown(text):
+    return _optional("Markdown")(text)
 
-    # PlantUML fallback
-    class PlantUML:
-        def __init__(self, url=None):
-            print("Warning: plantuml not installed; rendering disabled.")
-        def processes(self, *args, **kwargs):
-            print("PlantUML rendering skipped (plantuml not installed).")
+def IPyImage(*args, **kwargs):
+    return _optional("Image")(*args, **kwargs)
+
+def PlantUML(*args, **kwargs):
+    return _optional("PlantUML")(*args, **kwargs)
 
 
 # --- Model & Provider Configuration ---
 RECOMMENDED_MODELS = {
-    "gpt-5-nano-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000},
-    "gpt-5-mini-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000},
-    "gpt-5-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000},
-    "gpt-4o": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 128_000, "output_tokens": 16_384},
-    "gpt-4o-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 128_000, "output_tokens": 16_384},
-    "gpt-4.1": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_768},
-    "gpt-4.1-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_000},
-    "gpt-4.1-nano": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_000},
-    "o3": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000},
-    "o4-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000},
+    "gpt-5-nano-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000, "rpm": 500, "tpm": 200_000},
+    "gpt-5-mini-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000, "rpm": 500, "tpm": 200_000},
+    "gpt-5-2025-08-07": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 400_000, "output_tokens": 128_000, "rpm": 500, "tpm": 30_000},
+    "gpt-4o": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 128_000, "output_tokens": 16_384, "rpm": 500, "tpm": 30_000},
+    "gpt-4o-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 128_000, "output_tokens": 16_384, "rpm": 500, "tpm": 200_000},
+    "gpt-4.1": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_768, "rpm": 500, "tpm": 30_000},
+    "gpt-4.1-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_000, "rpm": 500, "tpm": 200_000},
+    "gpt-4.1-nano": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 32_000, "rpm": 500, "tpm": 200_000},
+    "o3": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000, "rpm": 500, "tpm": 30_000},
+    "o4-mini": {"provider": "openai", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000, "rpm": 1_000, "tpm": 100_000},
     "dall-e-3": {"provider": "openai", "vision": False, "text_generation": False, "image_generation": True, "image_modification": False, "audio_transcription": False, "context_window_tokens": None, "output_tokens": None},
     "whisper-1": {"provider": "openai", "vision": False, "text_generation": False, "image_generation": False, "image_modification": False, "audio_transcription": True, "context_window_tokens": None, "output_tokens": None},
-    "claude-opus-4-1-20250805": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000},
-    "claude-opus-4-20250514": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000},
-    "claude-sonnet-4-20250514": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 100_000},
-    "gemini-2.5-pro": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536},
-    "gemini-2.5-flash": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536},
-    "gemini-2.5-flash-lite": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536},
+    "claude-opus-4-1-20250805": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000, "rpm": 50, "tpm": 30_000},
+    "claude-opus-4-20250514": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 200_000, "output_tokens": 100_000, "rpm": 50, "tpm": 30_000},
+    "claude-sonnet-4-20250514": {"provider": "anthropic", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_000_000, "output_tokens": 100_000, "rpm": 50, "tpm": 30_000},
+    "gemini-2.5-pro": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536, "rpm": 150, "tpm": 2_000_000},
+    "gemini-2.5-flash": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536, "rpm": 1_000, "tpm": 1_000_000},
+    "gemini-2.5-flash-lite": {"provider": "google", "vision": True, "text_generation": True, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 65_536, "rpm": 4_000, "tpm": 4_000_000},
     "gemini-live-2.5-flash-preview": {"provider": "google", "vision": False, "text_generation": False, "image_generation": False, "image_modification": False, "audio_transcription": False, "context_window_tokens": 1_048_576, "output_tokens": 8_192},
     "gemini-2.5-flash-image-preview": {"provider": "google", "vision": False, "text_generation": False, "image_generation": True, "image_modification": False, "audio_transcription": False, "context_window_tokens": 32_768, "output_tokens": 32_768},
     "gemini-2.0-flash-preview-image-generation": {"provider": "google", "vision": False, "text_generation": False, "image_generation": True, "image_modification": False, "audio_transcription": False, "context_window_tokens": 32_000, "output_tokens": 8_192},
@@ -198,7 +255,17 @@ def recommended_models_table(task=None, provider=None, text_generation=None, vis
 
 # --- Environment and API Client Setup ---
 
-def load_environment():
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+# Process-wide client registry: (api_provider, model_name, api key fingerprint) -> client
+_llm_clients = {}
+_llm_clients_lock = threading.Lock()
+_llm_client_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+_PROVIDER_API_KEYS = {"openai": "OPENAI_API_KEY", "anthropic": "ANTHROPIC_API_KEY",
+                      "huggingface": "HUGGINGFACE_API_KEY", "gemini": "GOOGLE_API_KEY", "google": "GOOGLE_API_KEY"}
+
+def load_environment(force=False):
     """
     Loads environment variables from a .env file in the project root.
     
@@ -208,7 +275,8 @@ def load_environment():
     making them available to the application through os.getenv().
     
     Args:
-        None
+        force (bool, optional): Re-read the .env file even if it was already
+            loaded by this process. Defaults to False.
     
     Returns:
         None: This function doesn't return a value but has the side effect of
@@ -219,6 +287,8 @@ def load_environment():
             instead of raising exceptions.
     
     Notes:
+        - Runs once per process; later calls return immediately unless force=True
+          (see invalidate_llm_clients(reload_env=True))
         - Searches upward from current directory until it finds .env or .git
         - Falls back to current directory if no markers are found
         - Uses python-dotenv library to parse and load the .env file
@@ -238,20 +308,102 @@ def load_environment():
         - python-dotenv: For parsing and loading .env files
         - os: For file system operations and environment variable access
     """
-    path = os.getcwd()
-    while path != os.path.dirname(path):
-        if os.path.exists(os.path.join(path, '.env')) or os.path.exists(os.path.join(path, '.git')):
-            project_root = path
-            break
-        path = os.path.dirname(path)
-    else:
-        project_root = os.getcwd()
+    global _environment_loaded
+    with _environment_lock:
+        if _environment_loaded and not force:
+            return
+        _environment_loaded = True
+
+        path = os.getcwd()
+        while path != os.path.dirname(path):
+            if os.path.exists(os.path.join(path, '.env')) or os.path.exists(os.path.join(path, '.git')):
+                project_root = path
+                break
+            path = os.path.dirname(path)
+        else:
+            project_root = os.getcwd()
 
-    dotenv_path = os.path.join(project_root, '.env')
-    if os.path.exists(dotenv_path):
-        load_dotenv(dotenv_path=dotenv_path)
-    else:
-        print("Warning: .env file not found. API keys may not be loaded.")
+        dotenv_path = os.path.join(project_root, '.env')
+        if os.path.exists(dotenv_path):
+            load_dotenv(dotenv_path=dotenv_path, override=force)
+        else:
+            print("Warning: .env file not found. API keys may not be loaded.")
+
+def _api_key_fingerprint(api_key):
+    """A short digest that tells API keys apart without keeping them in registry keys."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+
+def _llm_client_key(model_name, api_provider):
+    return (api_provider, model_name, _api_key_fingerprint(os.getenv(_PROVIDER_API_KEYS.get(api_provider, ""), "")))
+
+def _create_llm_client(model_name, config, api_provider):
+    if api_provider == "openai":
+        from openai import OpenAI
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key: raise ValueError("OPENAI_API_KEY not found in .env file.")
+        return OpenAI(api_key=api_key)
+    elif api_provider == "anthropic":
+        from anthropic import Anthropic
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key: raise ValueError("ANTHROPIC_API_KEY not found in .env file.")
+        return Anthropic(api_key=api_key)
+    elif api_provider == "huggingface":
+        from huggingface_hub import InferenceClient
+        api_key = os.getenv("HUGGINGFACE_API_KEY")
+        if not api_key: raise ValueError("HUGGINGFACE_API_KEY not found in .env file.")
+        return InferenceClient(model=model_name, token=api_key)
+    elif api_provider == "gemini" or api_provider == "google": # Google for text/vision, Imagen, or STT
+        if config.get("audio_transcription"):
+            from google.cloud import speech
+            return speech.SpeechClient()
+        # Decide based on model family
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key: raise ValueError("GOOGLE_API_KEY not found in .env file.")
+        if "imagen" in model_name:
+            # Use the new google-genai low-level Client for Imagen
+            from google import genai as google_genai
+            return google_genai.Client(api_key=api_key)
+        # Use google-generativeai GenerativeModel for Gemini text/vision
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(model_name)
+    return None
+
+def invalidate_llm_clients(api_provider=None, model_name=None, reload_env=False):
+    """
+    Drops registered clients so the next setup_llm_client() call builds fresh ones.
+
+    Args:
+        api_provider (str, optional): Only drop this provider's clients.
+        model_name (str, optional): Only drop clients for this model.
+        reload_env (bool, optional): Re-read the .env file first, e.g. after
+            rotating an API key. Defaults to False.
+
+    Returns:
+        int: The number of sync and async clients removed.
+
+    Example:
+        >>> invalidate_llm_clients("openai", reload_env=True)
+        2
+    """
+    if reload_env:
+        load_environment(force=True)
+    removed = 0
+    with _llm_clients_lock:
+        for registry in (_llm_clients, *list(_async_clients.values())):
+            for key in list(registry):
+                provider, model = key[0], key[1]
+                if (api_provider is None or provider == api_provider) and (model_name is None or model in (None, model_name)):
+                    del registry[key]
+                    removed += 1
+        _llm_client_stats["invalidations"] += removed
+    return removed
+
+def llm_client_registry_stats():
+    """Counts of registered clients and of setup_llm_client() calls served from the registry."""
+    with _llm_clients_lock:
+        async_clients = sum(len(clients) for clients in list(_async_clients.values()))
+        return {**_llm_client_stats, "clients": len(_llm_clients), "async_clients": async_clients}
 
 
 def setup_llm_client(model_name="gpt-4o"):
@@ -262,6 +414,8 @@ def setup_llm_client(model_name="gpt-4o"):
     handling authentication and configuration for multiple providers including
     OpenAI, Anthropic, Hugging Face, and Google (Gemini/Speech-to-Text).
     It automatically loads environment variables and validates API keys.
+    Clients are kept in a process-wide registry keyed by provider, model and API
+    key fingerprint, so repeated calls return the same warmed client.
     
     Args:
         model_name (str, optional): The identifier of the model to use. Must be
@@ -285,7 +439,9 @@ def setup_llm_client(model_name="gpt-4o"):
             instead of raising exceptions.
     
     Notes:
-        - Automatically calls load_environment() to load .env file
+        - Automatically calls load_environment() to load .env file (once per process)
+        - Returns the registered client when one exists for the same provider,
+          model and API key; invalidate_llm_clients() forces a rebuild
         - Validates that the model exists in RECOMMENDED_MODELS
         - Checks for required API keys in environment variables
         - Handles ImportError if provider libraries aren't installed
@@ -323,52 +479,500 @@ def setup_llm_client(model_name="gpt-4o"):
         return None, None, None
     config = RECOMMENDED_MODELS[model_name]
     api_provider = config["provider"]
-    client = None
-    try:
-        if api_provider == "openai":
-            from openai import OpenAI
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key: raise ValueError("OPENAI_API_KEY not found in .env file.")
-            client = OpenAI(api_key=api_key)
-        elif api_provider == "anthropic":
-            from anthropic import Anthropic
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            if not api_key: raise ValueError("ANTHROPIC_API_KEY not found in .env file.")
-            client = Anthropic(api_key=api_key)
-        elif api_provider == "huggingface":
-            from huggingface_hub import InferenceClient
-            api_key = os.getenv("HUGGINGFACE_API_KEY")
-            if not api_key: raise ValueError("HUGGINGFACE_API_KEY not found in .env file.")
-            client = InferenceClient(model=model_name, token=api_key)
-        elif api_provider == "gemini" or api_provider == "google": # Google for text/vision, Imagen, or STT
-            if config.get("audio_transcription"):
-                from google.cloud import speech
-                client = speech.SpeechClient()
-            else:
-                # Decide based on model family
-                api_key = os.getenv("GOOGLE_API_KEY")
-                if not api_key: raise ValueError("GOOGLE_API_KEY not found in .env file.")
-                if "imagen" in model_name:
-                    # Use the new google-genai low-level Client for Imagen
-                    from google import genai as google_genai
-                    client = google_genai.Client(api_key=api_key)
-                else:
-                    # Use google-generativeai GenerativeModel for Gemini text/vision
-                    import google.generativeai as genai
-                    genai.configure(api_key=api_key)
-                    client = genai.GenerativeModel(model_name)
-    except ImportError:
-        print(f"ERROR: The required library for '{api_provider}' is not installed.")
-        return None, None, None
-    except ValueError as e:
-        print(f"ERROR: {e}")
-        return None, None, None
+    key = _llm_client_key(model_name, api_provider)
+    with _llm_clients_lock:
+        client = _llm_clients.get(key)
+        if client is not None:
+            _llm_client_stats["hits"] += 1
+            return client, model_name, api_provider
+        _llm_client_stats["misses"] += 1
+        try:
+            client = _create_llm_client(model_name, config, api_provider)
+        except ImportError:
+            print(f"ERROR: The required library for '{api_provider}' is not installed.")
+            return None, None, None
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return None, None, None
+        if client is not None:
+            _llm_clients[key] = client
     print(f"✅ LLM Client configured: Using '{api_provider}' with model '{model_name}'")
     return client, model_name, api_provider
 
+# --- Request Scheduling ---
+
+class LLMError(Exception):
+    """
+    A provider call that failed for good, raised by get_completion(..., raise_errors=True).
+
+    Attributes:
+        provider (str): The provider that was called.
+        model_name (str): The model that was called.
+        attempts (int): How many times the request was sent.
+        retry_after (float): Seconds the provider asked us to wait, if it said.
+    """
+
+    retryable = False
+
+    def __init__(self, message, provider=None, model_name=None, attempts=0, retry_after=None):
+        super().__init__(message)
+        self.provider = provider
+        self.model_name = model_name
+        self.attempts = attempts
+        self.retry_after = retry_after
+
+class LLMRateLimitError(LLMError):
+    """HTTP 429 / quota exhausted, or the local queue waited longer than LLM_QUEUE_TIMEOUT."""
+    retryable = True
+
+class LLMUnavailableError(LLMError):
+    """Timeouts, dropped connections and 5xx responses."""
+    retryable = True
+
+class LLMRequestError(LLMError):
+    """Errors a retry cannot fix: bad requests, authentication, missing client."""
+
+# Requests and tokens per minute per (provider, model). Text models in RECOMMENDED_MODELS
+# carry their own "rpm"/"tpm" (the providers' entry-tier limits); these provider defaults
+# cover the rest. LLM_RPM_<PROVIDER> / LLM_TPM_<PROVIDER> override both, e.g. on higher tiers.
+PROVIDER_RATE_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200_000},
+    "anthropic": {"rpm": 50, "tpm": 40_000},
+    "gemini": {"rpm": 60, "tpm": 1_000_000},
+    "google": {"rpm": 60, "tpm": 1_000_000},
+    "huggingface": {"rpm": 60, "tpm": None},
+}
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "120"))
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "512"))
+
+_RATE_LIMIT_ERRORS = {"RateLimitError", "ResourceExhausted", "TooManyRequests"}
+_UNAVAILABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError", "ServiceUnavailable",
+                       "DeadlineExceeded", "OverloadedError", "ConnectError", "ConnectTimeout", "ReadTimeout",
+                       "RemoteProtocolError"}
+
+def rate_limits_for(model_name, api_provider):
+    """The {"rpm", "tpm"} budget of one model; None means unlimited."""
+    limits = dict(PROVIDER_RATE_LIMITS.get(api_provider, {"rpm": None, "tpm": None}))
+    config = RECOMMENDED_MODELS.get(model_name, {})
+    for name in ("rpm", "tpm"):
+        if name in config:
+            limits[name] = config[name]
+        override = os.getenv(f"LLM_{name.upper()}_{(api_provider or '').upper()}")
+        if override:
+            limits[name] = int(override) or None
+    return limits
+
+def estimate_tokens(prompt, model_name=None):
+    """A rough request size (about four characters per token plus the expected answer) for tpm budgeting."""
+    output_tokens = min(LLM_EXPECTED_OUTPUT_TOKENS, RECOMMENDED_MODELS.get(model_name, {}).get("output_tokens") or LLM_EXPECTED_OUTPUT_TOKENS)
+    return len(prompt or "") // 4 + output_tokens
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def classify_llm_error(exc, api_provider=None, model_name=None, attempts=0):
+    """Maps an SDK exception onto LLMRateLimitError, LLMUnavailableError or LLMRequestError."""
+    if isinstance(exc, LLMError):
+        return exc
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(exc, "code", None) if isinstance(getattr(exc, "code", None), int) else None
+    name = type(exc).__name__
+    if status == 429 or name in _RATE_LIMIT_ERRORS or "rate limit" in str(exc).lower():
+        error_class = LLMRateLimitError
+    elif (status is not None and (status >= 500 or status == 408)) or name in _UNAVAILABLE_ERRORS \
+            or isinstance(exc, (ConnectionError, TimeoutError)):
+        error_class = LLMUnavailableError
+    else:
+        error_class = LLMRequestError
+    return error_class(str(exc), api_provider, model_name, attempts, _retry_after(exc))
+
+class SlidingWindowRateLimiter:
+    """
+    Counts the requests and tokens sent in the last `window` seconds and makes
+    callers wait (rather than fail) until a new request fits both budgets.
+
+    Example:
+        >>> limiter = SlidingWindowRateLimiter(rpm=50, tpm=40_000)
+        >>> limiter.acquire(tokens=1200, timeout=60)
+    """
+
+    def __init__(self, rpm=None, tpm=None, window=60.0, clock=time.monotonic):
+        from collections import deque
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.clock = clock
+        self._sent = deque()  # (timestamp, tokens)
+        self._tokens = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """Records the request and returns 0 if it fits now; otherwise returns how long to wait."""
+        if self.tpm:
+            tokens = min(tokens, self.tpm)  # a request larger than the budget would never fit
+        with self._lock:
+            now = self.clock()
+            while self._sent and self._sent[0][0] <= now - self.window:
+                self._tokens -= self._sent.popleft()[1]
+            wait = max(0.0, self._paused_until - now)
+            if self.rpm and len(self._sent) >= self.rpm:
+                wait = max(wait, self._sent[0][0] + self.window - now)
+            if self.tpm and self._tokens + tokens > self.tpm:
+                freed, expires = self._tokens + tokens - self.tpm, None
+                for sent_at, sent_tokens in self._sent:
+                    freed -= sent_tokens
+                    if freed <= 0:
+                        expires = sent_at
+                        break
+                wait = max(wait, (expires if expires is not None else now) + self.window - now)
+            if wait > 0:
+                return wait
+            self._sent.append((now, tokens))
+            self._tokens += tokens
+            return 0.0
+
+    def pause(self, seconds):
+        """Holds every caller back for `seconds`, e.g. after the provider answered 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self.clock() + seconds)
+
+    def acquire(self, tokens=0, timeout=LLM_QUEUE_TIMEOUT, sleep=time.sleep):
+        deadline = self.clock() + timeout
+        while True:
+            wait = self.reserve(tokens)
+            if wait == 0:
+                return
+            if self.clock() + wait > deadline:
+                raise LLMRateLimitError(f"Rate limit queue timed out after {timeout}s", retry_after=wait)
+            sleep(wait)
+
+    async def aacquire(self, tokens=0, timeout=LLM_QUEUE_TIMEOUT):
+        import asyncio
+        deadline = self.clock() + timeout
+        while True:
+            wait = self.reserve(tokens)
+            if wait == 0:
+                return
+            if self.clock() + wait > deadline:
+                raise LLMRateLimitError(f"Rate limit queue timed out after {timeout}s", retry_after=wait)
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        with self._lock:
+            return {"rpm": self.rpm, "tpm": self.tpm, "requests_in_window": len(self._sent), "tokens_in_window": self._tokens}
+
+class LLMScheduler:
+    """
+    Runs provider calls within each model's rate limits, retrying retryable failures
+    with jittered exponential backoff and raising typed LLMError subclasses.
+
+    Args:
+        max_retries (int): Retries after the first attempt.
+        base_delay (float): Backoff before the first retry; doubles each time.
+        max_delay (float): Cap on a single backoff.
+        queue_timeout (float): How long a call may wait for rate-limit capacity.
+        limits (callable): (model_name, api_provider) -> {"rpm", "tpm"}.
+        sleep (callable): Used for sync waits; tests pass one that advances `clock`.
+        clock (callable): Monotonic time source shared with the rate limiters.
+
+    Example:
+        >>> scheduler = LLMScheduler(max_retries=2)
+        >>> scheduler.call(lambda: client.chat.completions.create(...), "openai", "gpt-4o", prompt)
+    """
+
+    def __init__(self, max_retries=LLM_MAX_RETRIES, base_delay=LLM_RETRY_BASE_DELAY, max_delay=LLM_RETRY_MAX_DELAY,
+                 queue_timeout=LLM_QUEUE_TIMEOUT, limits=rate_limits_for, sleep=time.sleep, clock=time.monotonic):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue_timeout = queue_timeout
+        self.limits = limits
+        self.sleep = sleep
+        self.clock = clock
+        self._limiters = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "failures": 0}
+
+    def limiter(self, api_provider, model_name):
+        with self._lock:
+            limiter = self._limiters.get((api_provider, model_name))
+            if limiter is None:
+                limiter = self._limiters[(api_provider, model_name)] = SlidingWindowRateLimiter(clock=self.clock, **self.limits(model_name, api_provider))
+            return limiter
+
+    def backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+        import random
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0)
+
+    def _count(self, event):
+        with self._lock:
+            self._stats[event] += 1
+
+    def _retry_delay(self, exc, limiter, api_provider, model_name, attempt):
+        """
+        Returns how long to back off before retrying, or raises the typed error.
+        A rate-limited model is paused instead, so every queued caller backs off together.
+        """
+        error = classify_llm_error(exc, api_provider, model_name, attempt)
+        error.attempts = attempt
+        if not error.retryable or attempt > self.max_retries:
+            self._count("failures")
+            raise error from (None if error is exc else exc)
+        delay = self.backoff(attempt, error.retry_after)
+        self._count("retries")
+        if isinstance(error, LLMRateLimitError):
+            limiter.pause(delay)
+            return 0
+        return delay
+
+    def call(self, fn, api_provider, model_name, prompt=""):
+        limiter = self.limiter(api_provider, model_name)
+        tokens = estimate_tokens(prompt, model_name)
+        for attempt in range(1, self.max_retries + 2):
+            limiter.acquire(tokens, self.queue_timeout, sleep=self.sleep)
+            self._count("requests")
+            try:
+                return fn()
+            except Exception as exc:
+                delay = self._retry_delay(exc, limiter, api_provider, model_name, attempt)
+                if delay:
+                    self.sleep(delay)
+
+    async def acall(self, fn, api_provider, model_name, prompt=""):
+        """Async call(): `fn` returns an awaitable, and waiting never blocks the event loop."""
+        import asyncio
+        limiter = self.limiter(api_provider, model_name)
+        tokens = estimate_tokens(prompt, model_name)
+        for attempt in range(1, self.max_retries + 2):
+            await limiter.aacquire(tokens, self.queue_timeout)
+            self._count("requests")
+            try:
+                return await fn()
+            except Exception as exc:
+                delay = self._retry_delay(exc, limiter, api_provider, model_name, attempt)
+                if delay:
+                    await asyncio.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            limiters = dict(self._limiters)
+        stats["limits"] = {f"{provider}/{model}": limiter.stats() for (provider, model), limiter in limiters.items()}
+        return stats
+
+llm_scheduler = LLMScheduler()
+
+def llm_scheduler_stats():
+    """Request, retry and failure counts plus the current rate-limit windows."""
+    return llm_scheduler.stats()
+
+# --- Completion Cache ---
+
+# Opt-in cache of get_completion() answers: LLM_COMPLETION_CACHE=memory or sqlite (off by default)
+LLM_COMPLETION_CACHE = os.getenv("LLM_COMPLETION_CACHE", "off").lower()
+LLM_COMPLETION_CACHE_PATH = os.getenv("LLM_COMPLETION_CACHE_PATH", os.path.join("artifacts", ".completion_cache.sqlite3"))
+LLM_COMPLETION_CACHE_TTL = float(os.getenv("LLM_COMPLETION_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_COMPLETION_CACHE_MAX_ENTRIES = int(os.getenv("LLM_COMPLETION_CACHE_MAX_ENTRIES", "10000"))
+# Only answers requested at or below this temperature are cached, unless forced
+LLM_COMPLETION_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_COMPLETION_CACHE_MAX_TEMPERATURE", "0.2"))
+
+_completion_cache = None
+_completion_cache_configured = False
+_completion_cache_policy = {"max_temperature": LLM_COMPLETION_CACHE_MAX_TEMPERATURE,
+                            "force": os.getenv("LLM_COMPLETION_CACHE_FORCE", "0") == "1",
+                            "offline": os.getenv("LLM_COMPLETION_CACHE_OFFLINE", "0") == "1"}
+_completion_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "bypassed": 0}
+_completion_cache_lock = threading.Lock()
+
+def completion_cache_key(api_provider, model_name, prompt, temperature):
+    """A SHA-256 digest of everything that determines a completion, used as the cache key."""
+    import json
+    payload = json.dumps([api_provider, model_name, prompt, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class InMemoryCompletionCache:
+    """
+    A process-local LRU cache of completions keyed by completion_cache_key().
+
+    Example:
+        >>> configure_completion_cache(InMemoryCompletionCache(max_entries=1000))
+    """
+
+    def __init__(self, max_entries=LLM_COMPLETION_CACHE_MAX_ENTRIES):
+        from collections import OrderedDict
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._entries), "evictions": self.evictions}
+
+class SQLiteCompletionCache:
+    """
+    A SQLite-backed completion cache that survives restarts and can be shared
+    between processes (or committed as a fixture for offline tests).
+
+    Entries older than `ttl_seconds` count as misses and are removed; beyond
+    `max_entries` the least recently read ones are evicted.
+
+    Example:
+        >>> configure_completion_cache(SQLiteCompletionCache("artifacts/.completion_cache.sqlite3", ttl_seconds=86400))
+    """
+
+    def __init__(self, path=LLM_COMPLETION_CACHE_PATH, ttl_seconds=LLM_COMPLETION_CACHE_TTL,
+                 max_entries=LLM_COMPLETION_CACHE_MAX_ENTRIES):
+        try:
+            from app.agent.sqlite_cache import SQLiteCache
+        except ImportError:  # utils.py run from app/agent, as demo_agent.py does
+            from sqlite_cache import SQLiteCache
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._store = SQLiteCache(path, "completion_cache", ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    @property
+    def evictions(self):
+        return self._store.stats()["evictions"]
+
+    def get(self, key):
+        return self._store.get(key)
+
+    def put(self, key, value):
+        self._store.put(key, value)
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self):
+        stats = self._store.stats()
+        return {"backend": "sqlite", "entries": stats["entries"], "evictions": stats["evictions"]}
+
+def configure_completion_cache(backend=None, max_temperature=None, force=None, offline=None):
+    """
+    Installs the completion cache used by get_completion() and async_get_completion().
+
+    Args:
+        backend: An InMemoryCompletionCache, SQLiteCompletionCache (or any object
+            with get/put/clear/stats), or None to turn caching off.
+        max_temperature (float, optional): Highest temperature whose answers are
+            cached. Sampled answers above it are always requested fresh.
+        force (bool, optional): Cache regardless of temperature.
+        offline (bool, optional): Answer only from the cache; a miss returns an
+            error string instead of calling the provider.
+
+    Returns:
+        The installed backend.
+
+    Example:
+        >>> configure_completion_cache(SQLiteCompletionCache("tests/fixtures/completions.sqlite3"), offline=True)
+    """
+    global _completion_cache, _completion_cache_configured
+    with _completion_cache_lock:
+        _completion_cache = backend
+        _completion_cache_configured = True
+        for name, value in (("max_temperature", max_temperature), ("force", force), ("offline", offline)):
+            if value is not None:
+                _completion_cache_policy[name] = value
+    return backend
+
+def get_completion_cache():
+    """Returns the installed completion cache, building the LLM_COMPLETION_CACHE backend on first use."""
+    global _completion_cache, _completion_cache_configured
+    with _completion_cache_lock:
+        if not _completion_cache_configured:
+            _completion_cache_configured = True
+            if LLM_COMPLETION_CACHE == "memory":
+                _completion_cache = InMemoryCompletionCache()
+            elif LLM_COMPLETION_CACHE == "sqlite":
+                _completion_cache = SQLiteCompletionCache()
+        return _completion_cache
+
+def completion_cache_stats():
+    """Hit/miss counters of the completion cache, or None when caching is off."""
+    cache = _completion_cache
+    if cache is None:
+        return None
+    with _completion_cache_lock:
+        stats = {**_completion_cache_stats, **_completion_cache_policy}
+    stats.update(cache.stats())
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+    return stats
+
+def _count_completion_cache(event):
+    with _completion_cache_lock:
+        _completion_cache_stats[event] += 1
+
+def _completion_cache_for(temperature, use_cache):
+    """The cache to consult for this call, or None when the policy says to skip it."""
+    if use_cache is False:
+        return None
+    cache = get_completion_cache()
+    if cache is None:
+        return None
+    if not (use_cache or _completion_cache_policy["force"] or temperature <= _completion_cache_policy["max_temperature"]):
+        _count_completion_cache("bypassed")
+        return None
+    return cache
+
+def _is_error_completion(answer):
+    return not isinstance(answer, str) or answer == "API client not initialized." or answer.startswith("An API error occurred")
+
+def _cached_completion(prompt, model_name, api_provider, temperature, use_cache, raise_errors=False):
+    """Returns (cache, key, answer); answer is set on a hit, or to an error in offline mode."""
+    cache = _completion_cache_for(temperature, use_cache)
+    if cache is None:
+        return None, None, None
+    key = completion_cache_key(api_provider, model_name, prompt, temperature)
+    answer = cache.get(key)
+    _count_completion_cache("hits" if answer is not None else "misses")
+    if answer is None and _completion_cache_policy["offline"]:
+        if raise_errors:
+            raise LLMRequestError("completion not in cache (offline mode)", api_provider, model_name)
+        answer = "An API error occurred: completion not in cache (offline mode)"
+    return cache, key, answer
+
+def _store_completion(cache, key, answer):
+    if cache is not None and not _is_error_completion(answer):
+        cache.put(key, answer)
+        _count_completion_cache("stores")
+
 # --- Core Interaction Functions ---
 
-def get_completion(prompt, client, model_name, api_provider, temperature=0.7):
+def get_completion(prompt, client, model_name, api_provider, temperature=0.7, use_cache=None, raise_errors=False):
     """
     Sends a text-only prompt to the LLM and returns the completion.
     
@@ -388,14 +992,19 @@ def get_completion(prompt, client, model_name, api_provider, temperature=0.7):
         temperature (float, optional): Controls randomness in the output. Higher
             values (e.g., 1.0) make output more random, lower values (e.g., 0.1)
             make it more deterministic. Defaults to 0.7. Range typically 0.0-2.0.
+        use_cache (bool, optional): None follows the completion cache policy,
+            True caches regardless of temperature, False bypasses the cache.
+        raise_errors (bool, optional): Raise an LLMError subclass instead of
+            returning an error message string. Defaults to False.
     
     Returns:
         str: The generated text completion from the model. Returns an error
             message string if the API call fails.
     
     Raises:
-        None: This function catches all exceptions and returns error messages
-            as strings instead of raising exceptions.
+        LLMError: Only with raise_errors=True; LLMRateLimitError and
+            LLMUnavailableError once retries are exhausted, LLMRequestError for
+            errors a retry cannot fix. Otherwise errors are returned as strings.
     
     Notes:
         - Handles different API structures for each provider
@@ -404,7 +1013,14 @@ def get_completion(prompt, client, model_name, api_provider, temperature=0.7):
         - Hugging Face: Uses chat_completion with minimum temperature of 0.1
         - Google/Gemini: Uses generate_content method
         - Special error handling for OpenAI models that don't support temperature
+        - Calls go through llm_scheduler: they wait for the model's requests/min
+          and tokens/min budget, and 429s, timeouts and 5xx responses are retried
+          with jittered exponential backoff (LLM_MAX_RETRIES)
         - Returns descriptive error messages if API calls fail
+        - When a completion cache is configured (LLM_COMPLETION_CACHE or
+          configure_completion_cache()), answers at temperatures up to
+          LLM_COMPLETION_CACHE_MAX_TEMPERATURE are served from and stored in it;
+          error messages are never cached
     
     Example:
         >>> client, model, provider = setup_llm_client("gpt-4o")
@@ -424,57 +1040,302 @@ def get_completion(prompt, client, model_name, api_provider, temperature=0.7):
         - Provider-specific client libraries
         - RECOMMENDED_MODELS: For model capability validation
     """
-    if not client: return "API client not initialized."
+    cache, key, answer = _cached_completion(prompt, model_name, api_provider, temperature, use_cache, raise_errors)
+    if answer is not None:
+        return answer
+    answer = _request_completion(prompt, client, model_name, api_provider, temperature, raise_errors)
+    _store_completion(cache, key, answer)
+    return answer
+
+def _request_completion(prompt, client, model_name, api_provider, temperature, raise_errors=False):
+    if not client:
+        if raise_errors: raise LLMRequestError("API client not initialized.", api_provider, model_name)
+        return "API client not initialized."
     try:
-        if api_provider == "openai":
-            # Some newer models use different endpoints
-            try:
-                # Try chat completions first (standard endpoint)
-                response = client.chat.completions.create(model=model_name, messages=[{"role": "user", "content": prompt}], temperature=temperature)
-                return response.choices[0].message.content
-            except Exception as api_error:
-                error_message = str(api_error).lower()
-                
-                if "temperature" in error_message and "unsupported" in error_message:
-                    # Retry without temperature parameter
-                    try:
-                        response = client.chat.completions.create(model=model_name, messages=[{"role": "user", "content": prompt}])
-                        return response.choices[0].message.content
-                    except Exception as retry_error:
-                        if "v1/responses" in str(retry_error):
-                            # Use the responses endpoint for certain models
-                            response = client.responses.create(model=model_name, input=prompt)
-                            return response.choices[0].text
-                        else:
-                            raise retry_error
-                elif "v1/responses" in str(api_error):
-                    # Use the responses endpoint for certain models
-                    try:
-                        response = client.responses.create(model=model_name, input=prompt, temperature=temperature)
-                        return response.text
-                    except Exception:
-                        # Try responses endpoint without temperature
-                        response = client.responses.create(model=model_name, input=prompt)
-                        return response.text
-                else:
-                    raise api_error
-        elif api_provider == "anthropic":
-            response = client.messages.create(
-                model=model_name,
-                max_tokens=4096,
-                temperature=temperature,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return response.content[0].text
-        elif api_provider == "huggingface":
-            response = client.chat_completion(messages=[{"role": "user", "content": prompt}], temperature=max(0.1, temperature), max_tokens=4096)
-            return response.choices[0].message.content
-        elif api_provider == "gemini" or api_provider == "google":
-            response = client.generate_content(prompt)
-            return response.text
-    except Exception as e:
+        return llm_scheduler.call(lambda: _provider_completion(prompt, client, model_name, api_provider, temperature),
+                                  api_provider, model_name, prompt)
+    except LLMError as e:
+        if raise_errors: raise
         return f"An API error occurred: {e}"
 
+def _provider_completion(prompt, client, model_name, api_provider, temperature):
+    if api_provider == "openai":
+        # Some newer models use different endpoints
+        try:
+            # Try chat completions first (standard endpoint)
+            response = client.chat.completions.create(model=model_name, messages=[{"role": "user", "content": prompt}], temperature=temperature)
+            return response.choices[0].message.content
+        except Exception as api_error:
+            error_message = str(api_error).lower()
+
+            if "temperature" in error_message and "unsupported" in error_message:
+                # Retry without temperature parameter
+                try:
+                    response = client.chat.completions.create(model=model_name, messages=[{"role": "user", "content": prompt}])
+                    return response.choices[0].message.content
+                except Exception as retry_error:
+                    if "v1/responses" in str(retry_error):
+                        # Use the responses endpoint for certain models
+                        response = client.responses.create(model=model_name, input=prompt)
+                        return response.choices[0].text
+                    else:
+                        raise retry_error
+            elif "v1/responses" in str(api_error):
+                # Use the responses endpoint for certain models
+                try:
+                    response = client.responses.create(model=model_name, input=prompt, temperature=temperature)
+                    return response.text
+                except Exception:
+                    # Try responses endpoint without temperature
+                    response = client.responses.create(model=model_name, input=prompt)
+                    return response.text
+            else:
+                raise api_error
+    elif api_provider == "anthropic":
+        response = client.messages.create(
+            model=model_name,
+            max_tokens=4096,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text
+    elif api_provider == "huggingface":
+        response = client.chat_completion(messages=[{"role": "user", "content": prompt}], temperature=max(0.1, temperature), max_tokens=4096)
+        return response.choices[0].message.content
+    elif api_provider == "gemini" or api_provider == "google":
+        response = client.generate_content(prompt)
+        return response.text
+
+def _stream_openai(prompt, client, model_name, temperature):
+    messages = [{"role": "user", "content": prompt}]
+    try:
+        stream = client.chat.completions.create(model=model_name, messages=messages, temperature=temperature, stream=True)
+    except Exception as api_error:
+        error_message = str(api_error).lower()
+        if "temperature" in error_message and "unsupported" in error_message:
+            stream = client.chat.completions.create(model=model_name, messages=messages, stream=True)
+        else:
+            raise
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def stream_completion(prompt, client, model_name, api_provider, temperature=0.7, raise_errors=False):
+    """
+    Sends a text-only prompt to the LLM and yields the completion as it is generated.
+
+    This is the streaming counterpart of get_completion(): the same prompt, client
+    and provider arguments, but text deltas are yielded as soon as the provider
+    sends them, so callers can forward the first tokens long before the full
+    answer is ready.
+
+    Args:
+        prompt (str): The text prompt to send to the model.
+        client: The initialized API client object from setup_llm_client().
+        model_name (str): The identifier of the model to use for completion.
+        api_provider (str): The provider name ("openai", "anthropic", "huggingface",
+            "gemini", or "google").
+        temperature (float, optional): Controls randomness in the output.
+            Defaults to 0.7.
+        raise_errors (bool, optional): Raise LLMError subclasses instead of yielding
+            the error text, as get_completion(raise_errors=True) does. Defaults to False.
+
+    Yields:
+        str: Consecutive pieces of the completion. Joining them gives the same
+            text get_completion() would have returned.
+
+    Raises:
+        LLMError: Only with raise_errors=True. Otherwise, like get_completion(),
+            an error message is yielded as the last delta instead of raising.
+
+    Failures before the first delta go through the same rate-limit and retry path
+    as get_completion(); once text has been yielded the stream is not restarted.
+
+    Notes:
+        - OpenAI: chat completions with stream=True (retried without temperature
+          for models that reject it)
+        - Anthropic: messages.stream() text_stream
+        - Hugging Face: chat_completion with stream=True
+        - Google/Gemini: generate_content with stream=True
+
+    Example:
+        >>> client, model, provider = setup_llm_client("gpt-4o")
+        >>> for delta in stream_completion("Write a haiku about rice.", client, model, provider):
+        ...     print(delta, end="", flush=True)
+    """
+    if not client:
+        if raise_errors: raise LLMRequestError("API client not initialized.", api_provider, model_name)
+        yield "API client not initialized."
+        return
+    limiter = llm_scheduler.limiter(api_provider, model_name)
+    tokens = estimate_tokens(prompt, model_name)
+    for attempt in range(1, llm_scheduler.max_retries + 2):
+        started = False
+        try:
+            # Streams share the model's rate-limit budget with get_completion(); a queue timeout is not retried
+            limiter.acquire(tokens, llm_scheduler.queue_timeout, sleep=llm_scheduler.sleep)
+        except LLMError as e:
+            if raise_errors: raise
+            yield f"An API error occurred: {e}"
+            return
+        llm_scheduler._count("requests")
+        try:
+            for delta in _provider_stream(prompt, client, model_name, api_provider, temperature):
+                started = True
+                yield delta
+            return
+        except Exception as exc:
+            try:
+                if started:
+                    # The caller already has part of the answer, so a retry would duplicate it
+                    raise classify_llm_error(exc, api_provider, model_name, attempt) from exc
+                delay = llm_scheduler._retry_delay(exc, limiter, api_provider, model_name, attempt)
+            except LLMError as e:
+                if raise_errors: raise
+                yield f"An API error occurred: {e}"
+                return
+            if delay:
+                llm_scheduler.sleep(delay)
+
+def _provider_stream(prompt, client, model_name, api_provider, temperature):
+    if api_provider == "openai":
+        yield from _stream_openai(prompt, client, model_name, temperature)
+    elif api_provider == "anthropic":
+        with client.messages.stream(
+            model=model_name,
+            max_tokens=4096,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for text in stream.text_stream:
+                if text:
+                    yield text
+    elif api_provider == "huggingface":
+        stream = client.chat_completion(messages=[{"role": "user", "content": prompt}],
+                                        temperature=max(0.1, temperature), max_tokens=4096, stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    elif api_provider == "gemini" or api_provider == "google":
+        for chunk in client.generate_content(prompt, stream=True):
+            if getattr(chunk, "text", None):
+                yield chunk.text
+
+async def astream_completion(prompt, client, model_name, api_provider, temperature=0.7, raise_errors=False):
+    """
+    Async version of stream_completion() for use inside event loops (FastAPI, async graph nodes).
+
+    With a client from setup_async_llm_client() the provider's stream is iterated
+    natively on the shared connection pool, under the same LLM_MAX_CONCURRENCY
+    limit, rate limits and retries as async_get_completion(). A synchronous client
+    still works: its stream runs on a worker thread and every delta is handed to
+    the event loop as soon as it arrives.
+
+    Example:
+        >>> client, model, provider = setup_async_llm_client("gpt-4o")
+        >>> async for delta in astream_completion("Write a haiku about rice.", client, model, provider):
+        ...     print(delta, end="", flush=True)
+    """
+    import asyncio
+
+    if not client or not _is_async_client(client, api_provider):
+        async for delta in _astream_in_thread(prompt, client, model_name, api_provider, temperature, raise_errors):
+            yield delta
+        return
+    limiter = llm_scheduler.limiter(api_provider, model_name)
+    tokens = estimate_tokens(prompt, model_name)
+    async with llm_semaphore():
+        for attempt in range(1, llm_scheduler.max_retries + 2):
+            started = False
+            try:
+                await limiter.aacquire(tokens, llm_scheduler.queue_timeout)
+            except LLMError as e:
+                if raise_errors: raise
+                yield f"An API error occurred: {e}"
+                return
+            llm_scheduler._count("requests")
+            try:
+                async for delta in _aprovider_stream(prompt, client, model_name, api_provider, temperature):
+                    started = True
+                    yield delta
+                return
+            except Exception as exc:
+                try:
+                    if started:
+                        raise classify_llm_error(exc, api_provider, model_name, attempt) from exc
+                    delay = llm_scheduler._retry_delay(exc, limiter, api_provider, model_name, attempt)
+                except LLMError as e:
+                    if raise_errors: raise
+                    yield f"An API error occurred: {e}"
+                    return
+                if delay:
+                    await asyncio.sleep(delay)
+
+async def _aprovider_stream(prompt, client, model_name, api_provider, temperature):
+    messages = [{"role": "user", "content": prompt}]
+    if api_provider == "openai":
+        stream = await _acreate_openai(client, model=model_name, messages=messages, temperature=temperature, stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    elif api_provider == "anthropic":
+        async with client.messages.stream(
+            model=model_name,
+            max_tokens=4096,
+            temperature=temperature,
+            messages=messages
+        ) as stream:
+            async for text in stream.text_stream:
+                if text:
+                    yield text
+    elif api_provider == "huggingface":
+        stream = await client.chat_completion(messages=messages, temperature=max(0.1, temperature), max_tokens=4096, stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    elif api_provider == "gemini" or api_provider == "google":
+        async for chunk in await client.generate_content_async(prompt, stream=True):
+            if getattr(chunk, "text", None):
+                yield chunk.text
+
+async def _astream_in_thread(prompt, client, model_name, api_provider, temperature, raise_errors):
+    """Bridges stream_completion() on a synchronous client to the event loop through a worker thread."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+    cancelled = threading.Event()
+
+    def emit(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:  # the loop closed after the consumer went away
+            cancelled.set()
+
+    def produce():
+        try:
+            for delta in stream_completion(prompt, client, model_name, api_provider, temperature, raise_errors):
+                if cancelled.is_set():
+                    break
+                emit(delta)
+        except Exception as e:
+            emit(e)  # re-raised in the consumer (raise_errors=True)
+        finally:
+            emit(done)
+
+    threading.Thread(target=produce, name="llm-stream", daemon=True).start()
+    try:
+        while True:
+            delta = await queue.get()
+            if delta is done:
+                return
+            if isinstance(delta, Exception):
+                raise delta
+            yield delta
+    finally:
+        cancelled.set()
+
 def get_vision_completion(prompt, image_path_or_url, client, model_name, api_provider):
     """
     Sends an image and a text prompt to a vision-capable LLM and returns the completion.
@@ -634,6 +1495,332 @@ def get_vision_completion(prompt, image_path_or_url, client, model_name, api_pro
     except Exception as e:
         return f"An API error occurred during vision completion: {e}"
 
+# --- Async Interaction Functions ---
+
+# Upper bound on in-flight async LLM calls per event loop, and on each pooled client's connections
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+# event loop -> {(api_provider, model_name or None, api key fingerprint): async client}
+_async_clients = weakref.WeakKeyDictionary()
+_llm_semaphores = None  # event loop -> asyncio.Semaphore, created lazily
+_llm_loop = None  # background event loop shared by synchronous callers of run_on_llm_loop()
+
+
+def setup_async_llm_client(model_name="gpt-4o"):
+    """
+    Configures and returns an async LLM client based on the specified model name.
+
+    This is the async counterpart of setup_llm_client(): the same model names and
+    API keys, but the returned client's calls are awaitable. Clients are created
+    once per provider, API key and running event loop and then reused, so every
+    caller on that loop shares the same pooled HTTP connections instead of
+    opening new ones per request.
+
+    Args:
+        model_name (str, optional): The identifier of the model to use. Must be
+            a key in the RECOMMENDED_MODELS dictionary. Defaults to "gpt-4o".
+
+    Returns:
+        tuple: A 3-element tuple containing:
+            - client: The shared async client
+                - OpenAI: AsyncOpenAI over a pooled httpx.AsyncClient
+                - Anthropic: AsyncAnthropic over a pooled httpx.AsyncClient
+                - Hugging Face: AsyncInferenceClient instance
+                - Google: GenerativeModel (used through its *_async methods)
+            - model_name (str): The model name (echoed back)
+            - api_provider (str): The provider name ("openai", "anthropic", etc.)
+
+            Returns (None, None, None) if initialization fails.
+
+    Raises:
+        None: This function handles all errors gracefully and prints error messages
+            instead of raising exceptions.
+
+    Notes:
+        - Pool size is LLM_MAX_CONNECTIONS (env, default 20) connections per client
+        - Audio transcription and Imagen models have no async client here
+        - httpx connections belong to the event loop that opened them, so each loop
+          gets its own clients; called outside a running loop, the client is new and
+          not shared. Synchronous code can use run_on_llm_loop() to reuse one loop
+
+    Example:
+        >>> client, model, provider = setup_async_llm_client("gpt-4o")
+        >>> answer = await async_get_completion("Hello", client, model, provider)
+    """
+    import asyncio
+
+    load_environment()
+    if model_name not in RECOMMENDED_MODELS:
+        print(f"ERROR: Model '{model_name}' is not in the list of recommended models.")
+        return None, None, None
+    config = RECOMMENDED_MODELS[model_name]
+    api_provider = config["provider"]
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    try:
+        if api_provider not in _PROVIDER_API_KEYS or config.get("audio_transcription") or "imagen" in model_name:
+            raise ValueError(f"No async client is available for '{model_name}'.")
+        api_key = os.getenv(_PROVIDER_API_KEYS[api_provider])
+        if not api_key: raise ValueError(f"{_PROVIDER_API_KEYS[api_provider]} not found in .env file.")
+        # Hugging Face and Gemini clients are bound to one model; the HTTP SDKs are not
+        cache_key = (api_provider, model_name if api_provider not in ("openai", "anthropic") else None,
+                     _api_key_fingerprint(api_key))
+        with _llm_clients_lock:
+            client = _async_clients.get(loop, {}).get(cache_key) if loop is not None else None
+        if client is not None:
+            return client, model_name, api_provider
+        if api_provider == "openai":
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+            client = AsyncOpenAI(api_key=api_key, http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)))
+        elif api_provider == "anthropic":
+            import httpx
+            from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+            client = AsyncAnthropic(api_key=api_key, http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)))
+        elif api_provider == "huggingface":
+            from huggingface_hub import AsyncInferenceClient
+            client = AsyncInferenceClient(model=model_name, token=api_key)
+        else:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            client = genai.GenerativeModel(model_name)
+        if loop is not None:
+            with _llm_clients_lock:
+                client = _async_clients.setdefault(loop, {}).setdefault(cache_key, client)
+    except ImportError:
+        print(f"ERROR: The required library for '{api_provider}' is not installed.")
+        return None, None, None
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return None, None, None
+    print(f"✅ Async LLM Client configured: Using '{api_provider}' with model '{model_name}'")
+    return client, model_name, api_provider
+
+
+def llm_semaphore():
+    """
+    Returns the semaphore that bounds concurrent async LLM calls on the running event loop.
+
+    asyncio primitives are tied to one loop, so each loop gets its own semaphore of
+    LLM_MAX_CONCURRENCY permits. Wrap other provider calls in it to share the budget.
+    """
+    import asyncio
+    import weakref
+
+    global _llm_semaphores
+    if _llm_semaphores is None:
+        _llm_semaphores = weakref.WeakKeyDictionary()
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(max(1, LLM_MAX_CONCURRENCY))
+    return semaphore
+
+
+def run_on_llm_loop(coro):
+    """
+    Runs a coroutine on a background event loop shared by the whole process and returns its result.
+
+    Lets synchronous workers (e.g. the RAG job pool) run async agents without an
+    asyncio.run() loop per call, so the async clients of setup_async_llm_client()
+    and their pooled connections are reused across calls. The calling thread blocks
+    until the coroutine finishes; exceptions are re-raised in it.
+
+    Example:
+        >>> run_on_llm_loop(async_get_completion("Hello", client, model, provider))
+    """
+    import asyncio
+
+    global _llm_loop
+    with _llm_clients_lock:
+        if _llm_loop is None:
+            _llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=_llm_loop.run_forever, name="llm-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _llm_loop).result()
+
+
+def _is_async_client(client, api_provider):
+    if api_provider == "gemini" or api_provider == "google":
+        return hasattr(client, "generate_content_async")
+    return type(client).__name__.startswith("Async")
+
+
+async def _acreate_openai(client, **kwargs):
+    """Awaits chat.completions.create, retrying without temperature for models that reject it."""
+    try:
+        return await client.chat.completions.create(**kwargs)
+    except Exception as api_error:
+        error_message = str(api_error).lower()
+        if "temperature" in error_message and "unsupported" in error_message and "temperature" in kwargs:
+            kwargs.pop("temperature")
+            return await client.chat.completions.create(**kwargs)
+        raise
+
+
+async def async_get_completion(prompt, client, model_name, api_provider, temperature=0.7, use_cache=None, raise_errors=False):
+    """
+    Async version of get_completion() for use inside event loops (FastAPI, async graph nodes).
+
+    With a client from setup_async_llm_client() the request is awaited natively on
+    the shared connection pool; a synchronous client from setup_llm_client() still
+    works and is run on a worker thread. Either way at most LLM_MAX_CONCURRENCY
+    calls are in flight per event loop, so callers can asyncio.gather() freely.
+    It consults the same completion cache and llm_scheduler rate limits as
+    get_completion(), and raise_errors=True raises the same LLMError types.
+
+    Args:
+        prompt (str): The text prompt to send to the model.
+        client: An async client from setup_async_llm_client() (or a sync client).
+        model_name (str): The identifier of the model to use for completion.
+        api_provider (str): The provider name ("openai", "anthropic", "huggingface",
+            "gemini", or "google").
+        temperature (float, optional): Controls randomness in the output.
+            Defaults to 0.7.
+
+    Returns:
+        str: The generated text completion, or an error message string if the
+            API call fails (the same contract as get_completion()).
+
+    Example:
+        >>> client, model, provider = setup_async_llm_client("gpt-4o")
+        >>> answers = await asyncio.gather(*(async_get_completion(p, client, model, provider) for p in prompts))
+    """
+    cache, key, answer = _cached_completion(prompt, model_name, api_provider, temperature, use_cache, raise_errors)
+    if answer is not None:
+        return answer
+    answer = await _arequest_completion(prompt, client, model_name, api_provider, temperature, raise_errors)
+    _store_completion(cache, key, answer)
+    return answer
+
+async def _arequest_completion(prompt, client, model_name, api_provider, temperature, raise_errors=False):
+    import asyncio
+
+    if not client:
+        if raise_errors: raise LLMRequestError("API client not initialized.", api_provider, model_name)
+        return "API client not initialized."
+    async with llm_semaphore():
+        if not _is_async_client(client, api_provider):
+            return await asyncio.to_thread(_request_completion, prompt, client, model_name, api_provider, temperature, raise_errors)
+        try:
+            return await llm_scheduler.acall(lambda: _aprovider_completion(prompt, client, model_name, api_provider, temperature),
+                                             api_provider, model_name, prompt)
+        except LLMError as e:
+            if raise_errors: raise
+            return f"An API error occurred: {e}"
+
+async def _aprovider_completion(prompt, client, model_name, api_provider, temperature):
+    if api_provider == "openai":
+        try:
+            response = await _acreate_openai(client, model=model_name, messages=[{"role": "user", "content": prompt}], temperature=temperature)
+            return response.choices[0].message.content
+        except Exception as api_error:
+            if "v1/responses" not in str(api_error):
+                raise
+            # Use the responses endpoint for certain models
+            response = await client.responses.create(model=model_name, input=prompt)
+            return response.output_text
+    elif api_provider == "anthropic":
+        response = await client.messages.create(
+            model=model_name,
+            max_tokens=4096,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text
+    elif api_provider == "huggingface":
+        response = await client.chat_completion(messages=[{"role": "user", "content": prompt}], temperature=max(0.1, temperature), max_tokens=4096)
+        return response.choices[0].message.content
+    elif api_provider == "gemini" or api_provider == "google":
+        response = await client.generate_content_async(prompt)
+        return response.text
+
+
+def _read_image(image_path_or_url):
+    """Returns (bytes, mime type) of an image URL or a local path already resolved against the project root."""
+    if image_path_or_url.startswith('http://') or image_path_or_url.startswith('https://'):
+        response_img = requests.get(image_path_or_url)
+        response_img.raise_for_status()
+        return response_img.content, response_img.headers.get('Content-Type', 'image/jpeg')
+    with open(image_path_or_url, "rb") as f:
+        img_content = f.read()
+    mime_type, _ = mimetypes.guess_type(image_path_or_url)
+    return img_content, mime_type
+
+
+async def async_get_vision_completion(prompt, image_path_or_url, client, model_name, api_provider):
+    """
+    Async version of get_vision_completion() with the same arguments and return values.
+
+    Image downloads and file reads run on a worker thread and the provider call is
+    awaited under the same concurrency limit as async_get_completion(). Synchronous
+    clients are passed to get_vision_completion() on a worker thread.
+
+    Example:
+        >>> client, model, provider = setup_async_llm_client("gpt-4o")
+        >>> await async_get_vision_completion("Describe this dish.", "artifacts/screens/dish.png", client, model, provider)
+    """
+    import asyncio
+
+    if not client: return "API client not initialized."
+    if not RECOMMENDED_MODELS.get(model_name, {}).get("vision"):
+        return f"Error: Model '{model_name}' does not support vision."
+
+    async with llm_semaphore():
+        if not _is_async_client(client, api_provider):
+            return await asyncio.to_thread(get_vision_completion, prompt, image_path_or_url, client, model_name, api_provider)
+
+        is_url = image_path_or_url.startswith('http://') or image_path_or_url.startswith('https://')
+        if not is_url:
+            resolved_path = os.path.join(_find_project_root(), image_path_or_url)
+            if not os.path.exists(resolved_path):
+                return f"Error: Local image file not found at {image_path_or_url}"
+            image_path_or_url = resolved_path
+
+        try:
+            if api_provider == "openai":
+                image_url = image_path_or_url if is_url else await asyncio.to_thread(_encode_image_to_base64, image_path_or_url)
+                response = await client.chat.completions.create(
+                    model=model_name,
+                    messages=[{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image_url", "image_url": {"url": image_url}}
+                        ]
+                    }]
+                )
+                return response.choices[0].message.content
+
+            img_content, mime_type = await asyncio.to_thread(_read_image, image_path_or_url)
+            if api_provider == "anthropic":
+                if not mime_type:
+                    return f"Error: Could not determine mime type for {image_path_or_url}"
+                response = await client.messages.create(
+                    model=model_name,
+                    max_tokens=4096,
+                    messages=[{
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image", "source": {"type": "base64", "media_type": mime_type,
+                                                         "data": base64.b64encode(img_content).decode('utf-8')}}
+                        ]
+                    }]
+                )
+                return response.content[0].text
+            elif api_provider == "gemini" or api_provider == "google":
+                response = await client.generate_content_async([prompt, Image.open(BytesIO(img_content))])
+                return response.text
+            elif api_provider == "huggingface":
+                return await client.image_to_text(image=img_content, prompt=prompt)
+        except Exception as e:
+            return f"An API error occurred during vision completion: {e}"
+
 def get_image_generation_completion(prompt, client, model_name, api_provider):
     """
     Generates an image from a text prompt using an image generation LLM.
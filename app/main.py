@@ -3,9 +3,13 @@ from fastapi import FastAPI, HTTPException, status
 from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker, Session, object_session
+from sqlalchemy.exc import IntegrityError
 from contextlib import contextmanager
+import hashlib
+import os
+import re
 
 from sqlalchemy import (
     Column,
@@ -15,14 +19,56 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     UniqueConstraint,
+    Index,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
-from app.agent.recipe_agent import RecipeRAGAgent
+from app.database import engine, read_engine, SessionLocal, ReadSessionLocal, get_db, get_read_db
+from app.serialization import PrebuiltJSONResponse, RecipeJSONCache, join_json_array
+from app.agent.agent_pool import RecipeAgentPool, AgentPoolExhausted
+from app.agent.dependencies import (AgentDependencyError, RAG_SEARCH_FEATURES, agent_features,
+                                    probe_agent_dependencies, require_agent_features)
+from app.agent.job_queue import RagJob, RagJobQueue, QueueFullError
+from app.agent.recipe_cache import RecipeSearchCache, canonical_ingredient_name, canonicalize_ingredients
+from app.agent.search_cache import search_cache_stats
+from app.agent.utils import (llm_client_registry_stats, completion_cache_stats, llm_scheduler_stats, run_on_llm_loop,
+                             LLMRateLimitError, LLMUnavailableError)
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+import asyncio
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index ingredients of recipes stored before recipe_ingredients existed
+    db = SessionLocal()
+    try:
+        ensure_rag_import_user(db)
+        indexed = backfill_recipe_ingredients(db)
+        if indexed:
+            print(f"Indexed ingredients for {indexed} existing recipes.")
+    finally:
+        db.close()
+    # Probe the optional agent libraries once; RAG search is disabled (503) if any are missing
+    probe_agent_dependencies()
+    features = agent_features()
+    unavailable = [feature for feature in RAG_SEARCH_FEATURES if not features[feature]]
+    if unavailable:
+        print(f"Warning: RAG search is disabled, missing agent features: {', '.join(unavailable)}")
+    # Warm the RAG agent pool once so the first searches don't pay the setup cost
+    if os.getenv("RAG_AGENT_WARMUP", "1") == "1" and not unavailable:
+        try:
+            await run_in_threadpool(agent_pool.warm_up)
+            print(f"RAG agent pool warmed: {agent_pool.stats()}")
+        except Exception as e:
+            print(f"Warning: RAG agent pool warm-up failed, agents will be built on demand: {e}")
+    yield
+    rag_jobs.shutdown()
 
-app = FastAPI(title="Recipe App API")
+
+app = FastAPI(title="Recipe App API", lifespan=lifespan)
 
 Base = declarative_base()
 
@@ -50,6 +96,22 @@ class Recipe(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="recipes")
     favorited_by = relationship("UserFavorite", back_populates="recipe", cascade="all, delete")
+    ingredient_rows = relationship("RecipeIngredient", back_populates="recipe", cascade="all, delete")
+    # Never reuse a deleted recipe's id (as artifacts/schema.sql does), so a cached body can't be served for a new recipe
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# Normalized ingredients: one row per (recipe, ingredient), indexed by canonical name
+class RecipeIngredient(Base):
+    __tablename__ = "recipe_ingredients"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.recipe_id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    canonical_name = Column(String, nullable=False)
+    quantity = Column(String)
+    recipe = relationship("Recipe", back_populates="ingredient_rows")
+    __table_args__ = (
+        Index("ix_recipe_ingredients_canonical_name", "canonical_name", "recipe_id"),
+    )
 
 # User favorites
 class UserFavorite(Base):
@@ -63,61 +125,105 @@ class UserFavorite(Base):
 
 
 
-# Robust absolute path for recipes.db in artifacts folder
-import os
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, '../artifacts/recipes.db')}"
+# Full-text search over recipes (SQLite FTS5). recipes_fts is an external-content
+# table that stores only the index; triggers keep it in sync with recipes. A bulk
+# import adds a row to recipes_fts_paused inside its transaction, so the insert
+# trigger skips its rows and they are indexed in one statement before the commit.
+RECIPE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, description, instructions, content='recipes', content_rowid='recipe_id'
+    )""",
+    "CREATE TABLE IF NOT EXISTS recipes_fts_paused (id INTEGER PRIMARY KEY)",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes
+    WHEN NOT EXISTS (SELECT 1 FROM recipes_fts_paused) BEGIN
+        INSERT INTO recipes_fts(rowid, title, description, instructions)
+        VALUES (new.recipe_id, new.title, new.description, new.instructions);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, instructions)
+        VALUES ('delete', old.recipe_id, old.title, old.description, old.instructions);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, description, instructions)
+        VALUES ('delete', old.recipe_id, old.title, old.description, old.instructions);
+        INSERT INTO recipes_fts(rowid, title, description, instructions)
+        VALUES (new.recipe_id, new.title, new.description, new.instructions);
+    END""",
+]
+
+def ensure_recipe_search_index(connection):
+    """Creates the recipes FTS5 index and its triggers if missing, indexing any existing rows."""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'"
+    ).first()
+    insert_trigger = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'recipes_fts_ai'"
+    ).scalar()
+    if insert_trigger and "recipes_fts_paused" not in insert_trigger:
+        connection.exec_driver_sql("DROP TRIGGER recipes_fts_ai")  # created before bulk imports could pause it
+    for statement in RECIPE_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')")
+
+@event.listens_for(Recipe.__table__, "after_create")
+def _create_recipe_search_index(target, connection, **kw):
+    ensure_recipe_search_index(connection)
+
+@event.listens_for(Recipe.__table__, "before_drop")
+def _drop_recipe_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS recipes_fts")
+        connection.exec_driver_sql("DROP TABLE IF EXISTS recipes_fts_paused")
+
+# Per-table change counters behind the HTTP validators (ETags). SQLite triggers bump a
+# table's version on every insert, update or delete, whichever process or statement made it.
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+VERSIONED_TABLES = ["users", "recipes", "user_favorites"]
+
+def ensure_table_versions(connection):
+    """Creates the version rows and triggers for VERSIONED_TABLES if missing."""
+    if connection.dialect.name != "sqlite":
+        return
+    for table in VERSIONED_TABLES:
+        connection.exec_driver_sql(
+            "INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,)
+        )
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            connection.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()}
+                AFTER {operation} ON {table} BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END""")
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_table_versions(target, connection, **kw):
+    ensure_table_versions(connection)
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}, echo=False
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base.metadata.create_all(bind=engine)
+# Databases created before full-text search or table versions existed get them here
+with engine.begin() as connection:
+    ensure_recipe_search_index(connection)
+    ensure_table_versions(connection)
 
-# Dependency for FastAPI endpoints
-def get_db():
-    """
-    Provides a database session for FastAPI dependency injection.
-    
-    This function is a generator that creates a new SQLAlchemy database session
-    for each request and ensures it's properly closed after the request completes.
-    It's designed to be used as a dependency in FastAPI route handlers to manage
-    database connections efficiently.
-    
-    Args:
-        None
-    
-    Yields:
-        Session: A SQLAlchemy database session instance that can be used to
-            query and modify the database. The session is automatically committed
-            or rolled back based on the success of the request.
-    
-    Raises:
-        None: This function doesn't raise exceptions directly, but database
-            operations using the yielded session may raise SQLAlchemy exceptions.
-    
-    Notes:
-        - Uses the SessionLocal factory configured with the SQLite database
-        - Implements the context manager pattern with try/finally
-        - Ensures database connections are closed even if exceptions occur
-        - Thread-safe for SQLite with check_same_thread=False
-        - Used with FastAPI's Depends() for automatic dependency injection
-    
-    Example:
-        >>> @app.get("/items/")
-        ... def read_items(db: Session = Depends(get_db)):
-        ...     return db.query(Item).all()
-    
-    Dependencies:
-        - SessionLocal: SQLAlchemy session factory
-        - Session: SQLAlchemy session class
-    """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Imported RAG recipes are owned by this system user, which must exist once foreign keys are enforced
+RAG_IMPORT_USER_ID = 0
 
+def ensure_rag_import_user(db: Session):
+    if not db.get(User, RAG_IMPORT_USER_ID):
+        db.add(User(
+            user_id=RAG_IMPORT_USER_ID,
+            username="rag_import",
+            email="rag-import@recipeshare.app",
+            password_hash="!",  # cannot log in
+        ))
+        db.commit()
 
 
 # ---------------------- #
@@ -167,12 +273,105 @@ class RecipeResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class RecipeListItem(BaseModel):
+    """A recipe in list views; only the columns requested through `fields` are present."""
+    recipe_id: int
+    user_id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    instructions: Optional[str] = None
+    created_at: Optional[datetime] = None
+    ingredients: Optional[List[IngredientEntry]] = None
+
+class RecipeSearchResult(RecipeResponse):
+    matched: Optional[int] = None  # pantry ingredients the recipe uses
+    total: Optional[int] = None  # ingredients in the recipe
+    coverage: Optional[float] = None  # matched / total
+    score: Optional[float] = None  # BM25 relevance for text queries, higher is better
+    snippet: Optional[str] = None  # best matching excerpt with <mark> highlights
+
 class RAGRecipeSearchRequest(BaseModel):
     ingredients: str
-    num_recipes: Optional[int] = 3  # optional, default to 3
+    num_recipes: int = Field(3, ge=1, le=20)
 
 class RAGRecipeSearchResponse(BaseModel):
     results: List[RecipeBase]
+    extraction_path: Optional[str] = None  # cache, local, batched, per_index or failed
+
+class RAGJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, running, completed or failed
+    results: List[RecipeBase] = []
+    extraction_path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class BulkImportRowStatus(BaseModel):
+    index: int  # position of the recipe in the request body
+    status: str  # created, duplicate, invalid or failed
+    recipe_id: Optional[int] = None  # new recipe, or the existing one for duplicates
+    title: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkImportResponse(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    failed: int
+    results: List[BulkImportRowStatus]
+
+
+# ---------------------- #
+# RAG AGENT POOL         #
+# ---------------------- #
+
+# Agents are expensive to build, so they are created once and checked out per request.
+# The pool imports the LangChain/FAISS agent stack on its first build (warm-up or first
+# RAG search), so CRUD-only workers never load it.
+agent_pool = RecipeAgentPool(
+    size=int(os.getenv("RAG_AGENT_POOL_SIZE", "2")),
+)
+
+def _rag_cache_embedding():
+    # The similarity tier is opt-in because it spends an embedding call per lookup
+    if os.getenv("RAG_CACHE_SEMANTIC", "0") != "1":
+        return None
+    try:
+        require_agent_features("knowledge_base")
+    except AgentDependencyError as e:
+        print(f"Warning: RAG_CACHE_SEMANTIC is ignored: {e}")
+        return None
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings()
+
+def local_rag_recipes(pantry, num_recipes: int) -> Optional[List[dict]]:
+    """
+    Answers a RAG search from previously imported recipes (user_id=0) when at least
+    num_recipes of them can be made entirely from the pantry.
+    """
+    db = ReadSessionLocal()
+    try:
+        found = find_recipes_by_ingredients(db, pantry, limit=num_recipes, min_coverage=1.0, user_id=RAG_IMPORT_USER_ID)
+    finally:
+        db.close()
+    if len(found) < num_recipes:
+        return None
+    return [
+        {key: recipe[key] for key in ("title", "description", "instructions", "ingredients")}
+        for recipe in found
+    ]
+
+# Same ingredient set (in any order, spacing or case) + num_recipes is served from memory,
+# and with RAG_LOCAL_FIRST=1 from fully-covered imported recipes before calling the LLM
+rag_cache = RecipeSearchCache(
+    max_entries=int(os.getenv("RAG_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.getenv("RAG_CACHE_TTL_SECONDS", "3600")),
+    embedding=_rag_cache_embedding(),
+    similarity_threshold=float(os.getenv("RAG_CACHE_SIMILARITY", "0.95")),
+    backing_store=local_rag_recipes if os.getenv("RAG_LOCAL_FIRST", "0") == "1" else None,
+)
 
 
 # ---------------------- #
@@ -180,7 +379,8 @@ class RAGRecipeSearchResponse(BaseModel):
 # ---------------------- #
 
 
-from fastapi import Depends
+from fastapi import Depends, Query, Request, Response
+from sqlalchemy import select, insert, or_, and_, func, case
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -194,6 +394,335 @@ def get_user_by_id(db: Session, user_id: int):
 def get_recipe_by_id(db: Session, recipe_id: int):
     return db.query(Recipe).filter(Recipe.recipe_id == recipe_id).first()
 
+def decode_ingredients(raw) -> List[IngredientEntry]:
+    """
+    Decodes a recipe's stored ingredient JSON, keeping only the entries that are valid
+    IngredientEntry objects. RAG imports store loosely typed lists (plain strings,
+    numeric quantities); those entries are dropped rather than failing the response.
+    """
+    try:
+        entries = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    if not isinstance(entries, list):
+        return []
+    ingredients = []
+    for entry in entries:
+        try:
+            ingredients.append(IngredientEntry.model_validate(entry))
+        except ValueError:  # pydantic's ValidationError
+            continue
+    return ingredients
+
+def recipe_to_response(r: Recipe) -> RecipeResponse:
+    ingredients = decode_ingredients(r.ingredients)
+    return RecipeResponse(
+        recipe_id=r.recipe_id,
+        user_id=r.user_id,
+        title=r.title,
+        description=r.description,
+        instructions=r.instructions,
+        created_at=r.created_at,
+        ingredients=ingredients
+    )
+
+# Encoded RecipeResponse JSON per recipe_id, so hot reads skip json.loads and pydantic
+recipe_json_cache = RecipeJSONCache(
+    max_entries=int(os.getenv("RECIPE_JSON_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("RECIPE_JSON_CACHE_TTL", "300")),
+)
+
+# Writes are only invalidated once they commit: invalidating at flush time would let a
+# concurrent read of the still-committed row re-cache it for the whole TTL
+@event.listens_for(Recipe, "after_insert")
+@event.listens_for(Recipe, "after_update")
+@event.listens_for(Recipe, "after_delete")
+def _invalidate_recipe_json(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        recipe_json_cache.invalidate(target.recipe_id)
+    else:
+        session.info.setdefault("stale_recipe_ids", set()).add(target.recipe_id)
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_bulk_recipe_writes(orm_execute_state):
+    # query(Recipe).update()/.delete() don't load the rows they change
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is Recipe.__mapper__:
+        orm_execute_state.session.info["stale_recipe_json"] = True
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_recipe_json(session):
+    session.info.pop("table_versions", None)
+    stale = session.info.pop("stale_recipe_ids", None)
+    if session.info.pop("stale_recipe_json", False):
+        recipe_json_cache.clear()
+    elif stale:
+        recipe_json_cache.invalidate(*stale)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_recipe_writes(session):
+    session.info.pop("table_versions", None)
+    session.info.pop("stale_recipe_ids", None)
+    session.info.pop("stale_recipe_json", None)
+
+def recipes_version(db: Session) -> Optional[int]:
+    """
+    Returns the recipes table version that this session's recipe JSON is cached under.
+
+    It is read once per transaction (http_cache reads it first) and before any recipe
+    rows, so a body is never stored under a version newer than the row it came from.
+    None when the backend keeps no table versions; recipe_json_cache is then bypassed.
+    """
+    if "table_versions" not in db.info:
+        db.info["table_versions"] = read_table_versions(db)
+    versions = db.info["table_versions"]
+    return None if versions is None else versions.get("recipes", 0)
+
+def cache_recipe_json(r, version: Optional[int]) -> bytes:
+    """Encodes a recipe row as RecipeResponse JSON and stores it in recipe_json_cache at `version`."""
+    encoded = recipe_to_response(r).model_dump_json().encode("utf-8")
+    if version is not None:
+        recipe_json_cache.put(r.recipe_id, encoded, version)
+    return encoded
+
+def encode_recipe(r, version: Optional[int]) -> bytes:
+    """Returns the RecipeResponse JSON for a recipe row, from recipe_json_cache when possible."""
+    encoded = recipe_json_cache.get(r.recipe_id, version) if version is not None else None
+    return encoded if encoded is not None else cache_recipe_json(r, version)
+
+def encoded_recipes(db: Session, recipe_ids: List[int]) -> List[bytes]:
+    """Returns the RecipeResponse JSON for `recipe_ids` in order, loading only the uncached recipes."""
+    version = recipes_version(db)
+    found = recipe_json_cache.get_many(recipe_ids, version) if version is not None else {}
+    missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in found]
+    if missing:
+        for r in db.query(Recipe).filter(Recipe.recipe_id.in_(missing)):
+            found[r.recipe_id] = cache_recipe_json(r, version)
+    return [found[recipe_id] for recipe_id in recipe_ids if recipe_id in found]
+
+# Cache-Control per kind of read. Public recipe reads can be served by a reverse proxy
+# and revalidated with If-None-Match; favorites are per-user, so only the browser keeps them.
+HTTP_CACHE_POLICIES = {
+    "recipe": os.getenv("CACHE_CONTROL_RECIPE", "public, max-age=60, stale-while-revalidate=300"),
+    "recipe_list": os.getenv("CACHE_CONTROL_RECIPE_LIST", "public, max-age=10, stale-while-revalidate=60"),
+    "favorites": os.getenv("CACHE_CONTROL_FAVORITES", "private, no-cache"),
+    "user": os.getenv("CACHE_CONTROL_USER", "private, no-cache"),
+}
+
+def read_table_versions(db: Session) -> Optional[dict]:
+    """
+    Returns {table_name: version} from the table_versions counters, or None if they
+    aren't maintained. Only SQLite has the triggers that bump them; on other backends
+    (e.g. Postgres) reads get no ETag and recipe_json_cache is bypassed.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return None
+    return dict(db.execute(text("SELECT table_name, version FROM table_versions")).all())
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag`, as RFC 9110 requires for GETs."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+def http_cache(policy: str, *tables: str):
+    """
+    Dependency factory for conditional GETs.
+
+    The ETag combines the versions of `tables` with the request URL, so it changes
+    whenever any row those tables hold changes. A matching If-None-Match ends the
+    request with 304 Not Modified before the endpoint runs; otherwise the dependency
+    returns the ETag and Cache-Control headers for the endpoint to send.
+
+    The versions are kept in session.info, so the endpoint serves recipe_json_cache
+    entries only at the version the ETag names (see recipes_version) and never sends
+    another worker's older body under a newer tag. Without table versions (non-SQLite
+    backends) only Cache-Control is sent.
+    """
+    def dependency(request: Request, db: Session = Depends(get_read_db)) -> dict:
+        headers = {"Cache-Control": HTTP_CACHE_POLICIES[policy]}
+        versions = db.info["table_versions"] = read_table_versions(db)
+        if versions is None:
+            return headers
+        url_digest = hashlib.sha1(str(request.url).encode("utf-8")).hexdigest()[:16]
+        headers["ETag"] = '"' + ".".join(str(versions.get(table, 0)) for table in tables) + f'-{url_digest}"'
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return headers
+    return dependency
+
+# Columns that list_recipes can project through its `fields` parameter
+RECIPE_LIST_FIELDS = ["recipe_id", "user_id", "title", "description", "instructions", "created_at", "ingredients"]
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def recipe_row_to_dict(row) -> dict:
+    """
+    Converts a (possibly projected) recipe row to a dict, decoding ingredients only if
+    selected, with the same validation as recipe_to_response.
+    """
+    data = dict(row._mapping)
+    if "ingredients" in data:
+        data["ingredients"] = [entry.model_dump() for entry in decode_ingredients(data["ingredients"])]
+    return data
+
+def paginate(query, response: Response, limit: Optional[int], to_dict, cursor_field: str) -> List[dict]:
+    """Returns one page of `query` and sets X-Next-After-Id when more rows may follow."""
+    limit = limit or DEFAULT_PAGE_SIZE
+    page = [to_dict(row) for row in query.limit(limit)]
+    if len(page) == limit:
+        response.headers["X-Next-After-Id"] = str(page[-1][cursor_field])
+    return page
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def stream_ndjson(build_query, bind, to_dict, limit: Optional[int] = None) -> StreamingResponse:
+    """
+    Streams the rows of `build_query(session)` as newline-delimited JSON.
+
+    The rows are read in batches of STREAM_BATCH_SIZE on a session owned by the
+    stream, because the request's session is closed once the handler returns.
+    """
+    def rows():
+        with Session(bind=bind) as stream_db:
+            query = build_query(stream_db)
+            if limit is not None:
+                query = query.limit(limit)
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(to_dict(row), default=_json_default) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+def ingredient_row_values(ingredients) -> List[dict]:
+    """Returns the normalized ingredient columns for a recipe, one dict per distinct canonical name."""
+    rows = {}
+    for ing in ingredients or []:
+        if isinstance(ing, dict):
+            name, quantity = str(ing.get("name") or ""), ing.get("quantity")
+        else:
+            name, quantity = str(ing), None
+        canonical = canonical_ingredient_name(name)
+        if canonical and canonical not in rows:
+            rows[canonical] = {
+                "name": name.strip(),
+                "canonical_name": canonical,
+                "quantity": None if quantity is None else str(quantity),
+            }
+    return list(rows.values())
+
+def build_ingredient_rows(ingredients) -> List[RecipeIngredient]:
+    """Builds the normalized ingredient rows for a recipe, one per distinct canonical name."""
+    return [RecipeIngredient(**values) for values in ingredient_row_values(ingredients)]
+
+def backfill_recipe_ingredients(db: Session, batch_size: int = 500) -> int:
+    """
+    Indexes the ingredients of recipes stored before the recipe_ingredients table
+    existed. Returns the number of recipes indexed.
+
+    Runs on every startup, so only recipes with stored ingredients and no index
+    rows are read; recipes without ingredients are skipped in SQL. The only rows
+    revisited each time are those whose stored ingredients yield no names.
+    """
+    indexed = 0
+    last_id = 0
+    has_rows = select(RecipeIngredient.recipe_id).where(RecipeIngredient.recipe_id == Recipe.recipe_id).exists()
+    while True:
+        batch = (
+            db.query(Recipe)
+            .filter(Recipe.recipe_id > last_id, ~has_rows, Recipe.ingredients.not_in(["", "[]"]))
+            .order_by(Recipe.recipe_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return indexed
+        for r in batch:
+            try:
+                ingredients = json.loads(r.ingredients)
+            except Exception:
+                ingredients = [part for part in (r.ingredients or "").split(",")]
+            rows = build_ingredient_rows(ingredients)
+            if rows:
+                r.ingredient_rows = rows
+                indexed += 1
+        db.commit()
+        last_id = batch[-1].recipe_id
+
+def find_recipes_by_ingredients(db: Session, pantry, limit: int = 20, offset: int = 0,
+                                min_coverage: float = 0.0, user_id: Optional[int] = None) -> List[dict]:
+    """
+    Ranks recipes by how much of their ingredient list the pantry covers.
+
+    `pantry` is a collection of canonical ingredient names. Returns dicts with the
+    recipe plus `matched` (pantry ingredients used), `total` (recipe ingredients)
+    and `coverage` (matched / total), best coverage first.
+    """
+    pantry = list(pantry)
+    if not pantry:
+        return []
+    candidates = select(RecipeIngredient.recipe_id).where(RecipeIngredient.canonical_name.in_(pantry))
+    matched = func.sum(case((RecipeIngredient.canonical_name.in_(pantry), 1), else_=0))
+    total = func.count(RecipeIngredient.id)
+    coverage = (matched * 1.0 / total).label("coverage")
+    query = (
+        db.query(Recipe, matched.label("matched"), total.label("total"), coverage)
+        .join(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.recipe_id)
+        .filter(Recipe.recipe_id.in_(candidates))
+        .group_by(Recipe.recipe_id)
+        .having(coverage >= min_coverage)
+        .order_by(coverage.desc(), matched.desc(), Recipe.recipe_id)
+    )
+    if user_id is not None:
+        query = query.filter(Recipe.user_id == user_id)
+    results = []
+    for r, matched_count, total_count, recipe_coverage in query.offset(offset).limit(limit):
+        result = recipe_to_response(r).model_dump()
+        result.update(matched=matched_count, total=total_count, coverage=recipe_coverage)
+        results.append(result)
+    return results
+
+def fts_match_expression(q: str) -> str:
+    """Turns free text into a safe FTS5 query: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", q or "")
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def full_text_search(db: Session, q: str, limit: int = 20, offset: int = 0,
+                     user_id: Optional[int] = None, pantry=None) -> List[dict]:
+    """Ranks recipes matching `q` with BM25, weighting title over description over instructions."""
+    if db.get_bind().dialect.name != "sqlite":
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite FTS5")
+    match = fts_match_expression(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="The text query has no searchable words")
+    sql = """
+        SELECT r.recipe_id, r.user_id, r.title, r.description, r.instructions, r.created_at, r.ingredients,
+               -bm25(recipes_fts, 10.0, 2.0, 1.0) AS score,
+               snippet(recipes_fts, -1, '<mark>', '</mark>', '...', 12) AS snippet
+        FROM recipes_fts
+        JOIN recipes r ON r.recipe_id = recipes_fts.rowid
+        WHERE recipes_fts MATCH :match
+    """
+    params = {"match": match, "limit": limit, "offset": offset}
+    if user_id is not None:
+        sql += " AND r.user_id = :user_id"
+        params["user_id"] = user_id
+    if pantry:
+        names = {f"pantry_{i}": name for i, name in enumerate(pantry)}
+        sql += (" AND r.recipe_id IN (SELECT recipe_id FROM recipe_ingredients WHERE canonical_name IN ("
+                + ", ".join(f":{key}" for key in names) + "))")
+        params.update(names)
+    sql += " ORDER BY score DESC, r.recipe_id LIMIT :limit OFFSET :offset"
+    return [recipe_row_to_dict(row) for row in db.execute(text(sql), params)]
+
 def get_ingredient_by_id(db: Session, ingredient_id: int):
     return db.query(Ingredient).filter(Ingredient.ingredient_id == ingredient_id).first()
 
@@ -216,15 +745,55 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @app.get("/users/", response_model=List[UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+def list_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    stream: bool = False,
+    cache_headers: dict = Depends(http_cache("user", "users")),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Lists users in user_id order, one page at a time. The rag_import system user
+    that owns imported recipes is not listed.
+
+    Pass the X-Next-After-Id response header back as `after_id` to get the next page.
+    With stream=true every matching user is written as NDJSON while the cursor is
+    read, so memory use does not grow with the table.
+    """
+    columns = [User.user_id, User.username, User.email, User.created_at]
+
+    def build_query(session: Session):
+        query = session.query(*columns).filter(User.user_id != RAG_IMPORT_USER_ID)
+        if after_id is not None:
+            query = query.filter(User.user_id > after_id)
+        if created_after is not None:
+            query = query.filter(User.created_at >= created_after)
+        if created_before is not None:
+            query = query.filter(User.created_at < created_before)
+        return query.order_by(User.user_id)
+
+    to_dict = lambda row: dict(row._mapping)
+    if stream:
+        streamed = stream_ndjson(build_query, db.get_bind(), to_dict, limit)
+        streamed.headers.update(cache_headers)
+        return streamed
+    response.headers.update(cache_headers)
+    return paginate(build_query(db), response, limit, to_dict, "user_id")
 
 @app.get("/users/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(
+    user_id: int,
+    response: Response,
+    cache_headers: dict = Depends(http_cache("user", "users")),
+    db: Session = Depends(get_read_db),
+):
     user = get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    response.headers.update(cache_headers)
     return user
 
 @app.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -249,11 +818,16 @@ def create_recipe(recipe: RecipeCreate, db: Session = Depends(get_db)):
         title=recipe.title,
         description=recipe.description,
         instructions=recipe.instructions,
-        ingredients=json.dumps([ing.dict() for ing in recipe.ingredients]),
+        ingredients=json.dumps([ing.model_dump() for ing in recipe.ingredients]),
         created_at=datetime.utcnow()
     )
+    db_recipe.ingredient_rows = build_ingredient_rows([ing.model_dump() for ing in recipe.ingredients])
     db.add(db_recipe)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Recipe owner does not exist")
     db.refresh(db_recipe)
     return RecipeResponse(
         recipe_id=db_recipe.recipe_id,
@@ -266,80 +840,434 @@ def create_recipe(recipe: RecipeCreate, db: Session = Depends(get_db)):
     )
 
 
-@app.get("/recipes/", response_model=List[RecipeResponse])
-def list_recipes(db: Session = Depends(get_db)):
-    recipes = db.query(Recipe).all()
-    result = []
-    for r in recipes:
+@app.get("/recipes/", response_model=List[RecipeListItem], response_model_exclude_unset=True)
+def list_recipes(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    cache_headers: dict = Depends(http_cache("recipe_list", "recipes")),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Lists recipes in recipe_id order, one page at a time.
+
+    Filters by owner (`user_id`) and creation time, and `fields` (e.g.
+    "title,description") limits the columns that are read and returned;
+    recipe_id is always included. Pass the X-Next-After-Id response header back as
+    `after_id` to get the next page. With stream=true every matching recipe is
+    written as NDJSON while the cursor is read, so memory use stays flat.
+    Full (unprojected) pages are assembled from recipe_json_cache, so only the ids
+    of the page and any uncached recipes are read.
+    """
+    selected = RECIPE_LIST_FIELDS if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = set(selected) - set(RECIPE_LIST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown recipe fields: {', '.join(sorted(unknown))}")
+    if "recipe_id" not in selected:
+        selected = ["recipe_id"] + selected
+    columns = [getattr(Recipe, field) for field in selected]
+
+    def build_query(session: Session, columns=columns):
+        query = session.query(*columns)
+        if after_id is not None:
+            query = query.filter(Recipe.recipe_id > after_id)
+        if user_id is not None:
+            query = query.filter(Recipe.user_id == user_id)
+        if created_after is not None:
+            query = query.filter(Recipe.created_at >= created_after)
+        if created_before is not None:
+            query = query.filter(Recipe.created_at < created_before)
+        return query.order_by(Recipe.recipe_id)
+
+    if stream:
+        streamed = stream_ndjson(build_query, db.get_bind(), recipe_row_to_dict, limit)
+        streamed.headers.update(cache_headers)
+        return streamed
+    if fields is None:
+        page_size = limit or DEFAULT_PAGE_SIZE
+        recipe_ids = [recipe_id for recipe_id, in build_query(db, [Recipe.recipe_id]).limit(page_size)]
+        headers = dict(cache_headers)
+        if len(recipe_ids) == page_size:
+            headers["X-Next-After-Id"] = str(recipe_ids[-1])
+        return PrebuiltJSONResponse(join_json_array(encoded_recipes(db, recipe_ids)), headers=headers)
+    response.headers.update(cache_headers)
+    return paginate(build_query(db), response, limit, recipe_row_to_dict, "recipe_id")
+
+
+@app.get("/recipes/search", response_model=List[RecipeSearchResult])
+def search_recipes(
+    q: Optional[str] = Query(None, description="Full-text query over title, description and instructions"),
+    ingredients: Optional[str] = Query(None, description="Comma-separated pantry ingredients"),
+    min_coverage: float = Query(0.0, ge=0.0, le=1.0),
+    user_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Searches recipes by text, by pantry ingredients, or both.
+
+    - `q` runs a BM25-ranked full-text search over title, description and
+      instructions (the last word also matches as a prefix) and returns a
+      highlighted snippet per recipe.
+    - `ingredients` ranks recipes by coverage: the share of each recipe's
+      ingredients that the pantry provides, served from the recipe_ingredients index.
+    - With both, text matches are limited to recipes using a pantry ingredient.
+    """
+    pantry = canonicalize_ingredients(ingredients) if ingredients is not None else None
+    if q is None and not pantry:
+        raise HTTPException(status_code=400, detail="Provide a text query (q) or at least one ingredient")
+    if q is None:
+        return find_recipes_by_ingredients(db, pantry, limit, offset, min_coverage, user_id)
+    return full_text_search(db, q, limit, offset, user_id, pantry)
+
+@app.get("/recipes/{recipe_id}", response_model=RecipeResponse)
+def get_recipe(
+    recipe_id: int,
+    cache_headers: dict = Depends(http_cache("recipe", "recipes")),
+    db: Session = Depends(get_read_db),
+):
+    version = recipes_version(db)
+    encoded = recipe_json_cache.get(recipe_id, version) if version is not None else None
+    if encoded is None:
+        r = get_recipe_by_id(db, recipe_id)
+        if not r:
+            raise HTTPException(status_code=404, detail="Recipe not found")
+        encoded = cache_recipe_json(r, version)
+    return PrebuiltJSONResponse(encoded, headers=cache_headers)
+
+# Recipes per transaction for bulk imports
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+MAX_BULK_BATCH_SIZE = 10000
+
+def _validation_message(exc: Exception) -> str:
+    errors = getattr(exc, "errors", None)
+    if callable(errors):
+        return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in errors())
+    return str(exc)
+
+def _bulk_recipe_values(record, validate: bool):
+    """Returns (title, description, instructions, ingredients) for one bulk record or raises ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("Each recipe must be a JSON object")
+    if validate:
+        recipe = RecipeCreate(**record).model_dump()
+        return recipe["title"], recipe["description"], recipe["instructions"], recipe["ingredients"]
+    title = record.get("title")
+    if not isinstance(title, str) or not title:
+        raise ValueError("title: Field required")
+    return title, record.get("description", ""), record.get("instructions", ""), record.get("ingredients", [])
+
+# Column order of the tuples bulk imports hand to executemany
+BULK_RECIPE_COLUMNS = ("user_id", "title", "description", "instructions", "ingredients", "created_at")
+BULK_INGREDIENT_COLUMNS = ("recipe_id", "name", "canonical_name", "quantity")
+
+def _bulk_insert(db: Session, table, columns, rows: list):
+    """
+    One executemany of prepared tuples. On SQLite they go straight to the driver,
+    skipping SQLAlchemy's per-row parameter processing; other backends get a Core insert.
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "sqlite":
+        db.connection().exec_driver_sql(
+            f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+        )
+    else:
+        db.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+
+def _index_imported_recipes(db: Session, recipe_ids):
+    """Indexes a bulk import's recipes for full-text search in one statement and resumes the insert trigger."""
+    # Writers are serialized and ids are never reused, so the range holds only this batch
+    db.connection().exec_driver_sql(
+        "INSERT INTO recipes_fts(rowid, title, description, instructions) "
+        "SELECT recipe_id, title, description, instructions FROM recipes WHERE recipe_id BETWEEN ? AND ?",
+        (min(recipe_ids), max(recipe_ids)),
+    )
+    db.connection().exec_driver_sql("DELETE FROM recipes_fts_paused")
+
+def import_recipe_batch(db: Session, records, user_id: int, validate: bool = True) -> List[dict]:
+    """
+    Inserts one batch of recipes for `user_id` in a single transaction.
+
+    `records` is a sequence of (index, recipe dict) pairs. Titles the user already
+    owns, or that appear earlier in the batch, are reported as duplicates after one
+    set-based lookup; the remaining recipes and their ingredient rows are written
+    with one executemany of prepared tuples each. Returns one status dict per
+    record, in order.
+    With validate=False records are only required to have a title (RAG output).
+    """
+    statuses = []
+    pending = {}  # title -> (status, values, ingredients)
+    duplicates = []  # (status, title) repeated within the batch
+    now = datetime.utcnow()
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    if sqlite:
+        now = now.strftime("%Y-%m-%d %H:%M:%S.%f")  # how SQLAlchemy stores DateTime on SQLite
+    for index, record in records:
+        row = {"index": index, "status": "invalid", "recipe_id": None, "title": None, "error": None}
+        statuses.append(row)
+        try:
+            title, description, instructions, ingredients = _bulk_recipe_values(record, validate)
+        except ValueError as e:
+            row["error"] = _validation_message(e)
+            continue
+        row["title"] = title
+        if title in pending:
+            row["status"] = "duplicate"
+            duplicates.append((row, title))
+            continue
+        pending[title] = (row, (user_id, title, description, instructions, json.dumps(ingredients), now), ingredients)
+    if not pending:
+        return statuses
+
+    existing = dict(db.execute(
+        select(Recipe.title, Recipe.recipe_id).where(Recipe.user_id == user_id, Recipe.title.in_(list(pending)))
+    ).all())
+    new = [(row, values, ingredients) for title, (row, values, ingredients) in pending.items() if title not in existing]
+    for title, recipe_id in existing.items():
+        row = pending[title][0]
+        row.update(status="duplicate", recipe_id=recipe_id)
+
+    if new:
         try:
-            ingredients = [IngredientEntry(**ing) for ing in json.loads(r.ingredients)]
-        except Exception:
-            ingredients = []
-        result.append(RecipeResponse(
-            recipe_id=r.recipe_id,
-            user_id=r.user_id,
-            title=r.title,
-            description=r.description,
-            instructions=r.instructions,
-            created_at=r.created_at,
-            ingredients=ingredients
+            if sqlite:
+                db.connection().exec_driver_sql("INSERT INTO recipes_fts_paused DEFAULT VALUES")
+            # A plain executemany plus one id lookup; RETURNING with guaranteed row order
+            # makes SQLite fall back to one INSERT per recipe
+            _bulk_insert(db, Recipe.__table__, BULK_RECIPE_COLUMNS, [values for _, values, _ in new])
+            recipe_ids = dict(db.execute(
+                select(Recipe.title, Recipe.recipe_id)
+                .where(Recipe.user_id == user_id, Recipe.title.in_([row["title"] for row, _, _ in new]))
+            ).all())
+            if sqlite:
+                _index_imported_recipes(db, recipe_ids.values())
+            ingredient_rows = []
+            for row, _, ingredients in new:
+                recipe_id = recipe_ids[row["title"]]
+                row.update(status="created", recipe_id=recipe_id)
+                ingredient_rows.extend((recipe_id, values["name"], values["canonical_name"], values["quantity"])
+                                       for values in ingredient_row_values(ingredients))
+            _bulk_insert(db, RecipeIngredient.__table__, BULK_INGREDIENT_COLUMNS, ingredient_rows)
+            db.commit()
+            recipe_json_cache.invalidate(*recipe_ids.values())
+        except IntegrityError as e:
+            db.rollback()
+            for row, _, _ in new:
+                row.update(status="failed", recipe_id=None, error=str(e.orig))
+
+    for row, title in duplicates:
+        row["recipe_id"] = pending[title][0]["recipe_id"]
+    return statuses
+
+async def ndjson_lines(request: Request):
+    """Yields the non-blank lines of an NDJSON request body as the chunks arrive."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+@app.post("/recipes/bulk", response_model=BulkImportResponse)
+async def bulk_import_recipes(
+    request: Request,
+    user_id: int = Query(RAG_IMPORT_USER_ID, description="Owner of the imported recipes"),
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=MAX_BULK_BATCH_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Imports many recipes in one request.
+
+    The body is either a JSON array of recipes or, with an application/x-ndjson
+    content type, one recipe per line; NDJSON bodies are imported batch by batch
+    while they are still being received. Each batch of `batch_size` recipes is
+    deduplicated by title against the owner's recipes and committed in one
+    transaction. The response has a status per input recipe: created, duplicate
+    (with the existing recipe_id), invalid (with the validation error) or failed.
+    """
+    owner = await run_in_threadpool(get_user_by_id, db, user_id)
+    if owner is None:
+        if user_id != RAG_IMPORT_USER_ID:
+            raise HTTPException(status_code=404, detail="User not found")
+        await run_in_threadpool(ensure_rag_import_user, db)
+
+    statuses = []
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        batch = []
+        index = 0
+        async for line in ndjson_lines(request):
+            try:
+                batch.append((index, json.loads(line)))
+            except ValueError:
+                statuses.append({"index": index, "status": "invalid", "error": "Line is not valid JSON"})
+            index += 1
+            if len(batch) >= batch_size:
+                statuses.extend(await run_in_threadpool(import_recipe_batch, db, batch, user_id))
+                batch = []
+        if batch:
+            statuses.extend(await run_in_threadpool(import_recipe_batch, db, batch, user_id))
+        statuses.sort(key=lambda row: row["index"])
+    else:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of recipes or NDJSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of recipes or NDJSON")
+        for start in range(0, len(records), batch_size):
+            batch = list(enumerate(records[start:start + batch_size], start))
+            statuses.extend(await run_in_threadpool(import_recipe_batch, db, batch, user_id))
+
+    counts = {name: 0 for name in ("created", "duplicate", "invalid", "failed")}
+    for row in statuses:
+        counts[row["status"]] += 1
+    return {
+        "created": counts["created"],
+        "duplicates": counts["duplicate"],
+        "invalid": counts["invalid"],
+        "failed": counts["failed"],
+        "results": statuses,
+    }
+
+def store_rag_results(db: Session, results: List[dict]) -> List[dict]:
+    """Stores RAG search results as recipes owned by user_id=0, skipping titles that already exist."""
+    return import_recipe_batch(db, list(enumerate(results)), RAG_IMPORT_USER_ID, validate=False)
+
+def run_rag_job(job: RagJob, ingredients: str, num_recipes: int) -> dict:
+    """
+    Runs one RAG search on a job worker thread and stores its results in the database.
+    Repeated ingredient sets are answered from rag_cache without touching an agent.
+
+    The agent's async graph runs on the shared LLM event loop, so concurrent jobs
+    await their extraction calls on one pool of async client connections.
+    """
+    cached = rag_cache.get(ingredients, num_recipes)
+    if cached is not None:
+        for recipe in cached:
+            job.publish("recipe", recipe)
+        return {"recipe_list": cached, "extraction_path": "cache"}
+
+    require_agent_features(*RAG_SEARCH_FEATURES)
+    with agent_pool.checkout() as agent:
+        search = run_on_llm_loop(agent.asearch(
+            ingredients=ingredients,
+            num_recipes=num_recipes,
+            on_recipe=lambda recipe: job.publish("recipe", recipe),
+            on_token=lambda token: job.publish("token", token),
         ))
-    return result
+    if search["recipe_list"]:
+        rag_cache.put(ingredients, num_recipes, search["recipe_list"])
+    db = SessionLocal()
+    try:
+        store_rag_results(db, search["recipe_list"])
+    finally:
+        db.close()
+    return search
 
+# RAG searches take tens of seconds, so they run on a bounded worker pool instead of request threads
+rag_jobs = RagJobQueue(
+    run_rag_job,
+    max_workers=int(os.getenv("RAG_JOB_WORKERS", "2")),
+    max_queue=int(os.getenv("RAG_JOB_MAX_QUEUE", "20")),
+)
 
-@app.get("/recipes/{recipe_id}", response_model=RecipeResponse)
-def get_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    r = get_recipe_by_id(db, recipe_id)
-    if not r:
-        raise HTTPException(status_code=404, detail="Recipe not found")
+def submit_rag_job(request: RAGRecipeSearchRequest) -> RagJob:
     try:
-        ingredients = [IngredientEntry(**ing) for ing in json.loads(r.ingredients)]
-    except Exception:
-        ingredients = []
-    return RecipeResponse(
-        recipe_id=r.recipe_id,
-        user_id=r.user_id,
-        title=r.title,
-        description=r.description,
-        instructions=r.instructions,
-        created_at=r.created_at,
-        ingredients=ingredients
-    )
+        return rag_jobs.submit(ingredients=request.ingredients, num_recipes=request.num_recipes)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def get_rag_job(job_id: str) -> RagJob:
+    job = rag_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @app.post("/recipes/rag_search/", response_model=RAGRecipeSearchResponse)
-def rag_recipe_search(request: RAGRecipeSearchRequest, db: Session = Depends(get_db)):
+async def rag_recipe_search(request: RAGRecipeSearchRequest):
     """
     Search for recipes on the internet using a Retrieval-Augmented Generation (RAG) agent.
     Leverages the RecipeRAGAgent from app/agent/recipe_agent.py.
+
+    The search runs on the RAG job pool; this handler only awaits it, so slow searches
+    never tie up the threadpool that serves the CRUD endpoints.
     """
-    agent = RecipeRAGAgent()
-    try:
-        results = agent.query(ingredients=request.ingredients, num_recipes=request.num_recipes)
-        # Store the results in the database
-        # For each result, check if it already exists (by title and user_id=0), if not, add as a Recipe with user_id=0
-        for res in results:
-            title = res.get("title")
-            description = res.get("description", "")
-            instructions = res.get("instructions", "")
-            ingredients = res.get("ingredients", [])
-            # Serialize ingredients as JSON string
-            ingredients_json = json.dumps(ingredients)
-            # Check if recipe already exists (by title and user_id=0)
-            existing = db.query(Recipe).filter_by(title=title, user_id=0).first()
-            if not existing:
-                db_recipe = Recipe(
-                    user_id=0,
-                    title=title,
-                    description=description,
-                    instructions=instructions,
-                    ingredients=ingredients_json,
-                    created_at=datetime.utcnow()
-                )
-                db.add(db_recipe)
-                db.commit()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"RAG search failed: {str(e)}")
-    return RAGRecipeSearchResponse(results=results)
+    job = submit_rag_job(request)
+    await asyncio.wrap_future(job.future)
+    if job.status == "failed":
+        # The provider stayed rate limited or down through every retry, or the agent libraries are missing
+        if isinstance(job.exception, (AgentPoolExhausted, AgentDependencyError, LLMRateLimitError, LLMUnavailableError)):
+            raise HTTPException(status_code=503, detail=job.error)
+        raise HTTPException(status_code=500, detail=f"RAG search failed: {job.error}")
+    return RAGRecipeSearchResponse(results=job.results, extraction_path=job.extraction_path)
+
+@app.post("/recipes/rag_search/jobs", response_model=RAGJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_rag_search_job(request: RAGRecipeSearchRequest):
+    """Queues a RAG search and returns its job id immediately."""
+    return submit_rag_job(request).to_dict()
+
+@app.get("/recipes/rag_search/jobs/{job_id}", response_model=RAGJobResponse)
+def get_rag_search_job(job_id: str):
+    """Returns the status of a RAG search job and any recipes extracted so far."""
+    return get_rag_job(job_id).to_dict()
+
+def rag_job_event_stream(job: RagJob, poll_interval: float) -> StreamingResponse:
+    """Forwards a job's events as Server-Sent Events until it completes or fails."""
+    async def event_stream():
+        cursor = 0
+        while True:
+            events = job.events_since(cursor)
+            cursor += len(events)
+            for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+                if event in RagJob.TERMINAL_STATUSES:
+                    return
+            await asyncio.sleep(poll_interval)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Job-Id": job.job_id}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+@app.get("/recipes/rag_search/jobs/{job_id}/events")
+async def stream_rag_search_job(job_id: str, poll_interval: float = 0.25):
+    """
+    Streams a RAG search job as Server-Sent Events: 'status' changes, 'token' events
+    carrying the recipe answer as the model generates it, one 'recipe' event per
+    extracted recipe, then a final 'completed' or 'failed' event.
+    """
+    return rag_job_event_stream(get_rag_job(job_id), poll_interval)
+
+@app.post("/recipes/rag_search/stream")
+async def stream_rag_search(request: RAGRecipeSearchRequest, poll_interval: float = Query(0.05, gt=0, le=5)):
+    """
+    Starts a RAG search and streams it in the same response, with the events of
+    /recipes/rag_search/jobs/{job_id}/events. The first model tokens reach the
+    client without a second request; the job id is in the X-Job-Id header.
+    """
+    return rag_job_event_stream(submit_rag_job(request), poll_interval)
+
+@app.get("/metrics/rag")
+def rag_metrics():
+    """Reports RAG agent pool size and warm-up time, job queue depth and cache hit rates."""
+    return {
+        "agent_pool": agent_pool.stats(),
+        "jobs": rag_jobs.stats(),
+        "cache": rag_cache.stats(),
+        "search_cache": search_cache_stats(),
+        "llm_clients": llm_client_registry_stats(),
+        "completion_cache": completion_cache_stats(),
+        "llm_scheduler": llm_scheduler_stats(),
+        "dependencies": agent_features(),
+    }
 
 # User favorites endpoints
 @app.post("/users/{user_id}/favorites/{recipe_id}", status_code=status.HTTP_201_CREATED)
@@ -356,27 +1284,40 @@ def add_favorite(user_id: int, recipe_id: int, db: Session = Depends(get_db)):
     return {"message": "Recipe favorited"}
 
 @app.get("/users/{user_id}/favorites/", response_model=List[RecipeResponse])
-def list_favorites(user_id: int, db: Session = Depends(get_db)):
-    favs = db.query(UserFavorite).filter_by(user_id=user_id).all()
-    recipes = [get_recipe_by_id(db, fav.recipe_id) for fav in favs]
-    result = []
-    import json
-    for r in recipes:
-        if r:
-            try:
-                ingredients = [IngredientEntry(**ing) for ing in json.loads(r.ingredients)]
-            except Exception:
-                ingredients = []
-            result.append(RecipeResponse(
-                recipe_id=r.recipe_id,
-                user_id=r.user_id,
-                title=r.title,
-                description=r.description,
-                instructions=r.instructions,
-                created_at=r.created_at,
-                ingredients=ingredients
-            ))
-    return result
+def list_favorites(
+    user_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after_recipe_id: Optional[int] = None,
+    cache_headers: dict = Depends(http_cache("favorites", "recipes", "user_favorites")),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Lists a user's favorite recipes, oldest favorite first.
+
+    Favorites and their recipes are loaded with a single joined query regardless of
+    how many favorites the user has. Pages are keyset-based: pass the recipe_id of
+    the last recipe on a page as `after_recipe_id` to get the next `limit` recipes.
+    """
+    query = (
+        db.query(Recipe)
+        .join(UserFavorite, UserFavorite.recipe_id == Recipe.recipe_id)
+        .filter(UserFavorite.user_id == user_id)
+    )
+    if after_recipe_id is not None:
+        cursor_favorited_at = (
+            select(UserFavorite.favorited_at)
+            .where(UserFavorite.user_id == user_id, UserFavorite.recipe_id == after_recipe_id)
+            .scalar_subquery()
+        )
+        query = query.filter(or_(
+            UserFavorite.favorited_at > cursor_favorited_at,
+            and_(UserFavorite.favorited_at == cursor_favorited_at, UserFavorite.recipe_id > after_recipe_id),
+        ))
+    query = query.order_by(UserFavorite.favorited_at, UserFavorite.recipe_id)
+    if limit is not None:
+        query = query.limit(limit)
+    version = recipes_version(db)
+    return PrebuiltJSONResponse(join_json_array(encode_recipe(r, version) for r in query), headers=cache_headers)
 
 # ---------------------- #
 # To run:
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library encoder
+    orjson = None
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """Encodes `content` as compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def join_json_array(items: Iterable[bytes]) -> bytes:
+    """Builds a JSON array from already-encoded JSON values without decoding them."""
+    return b"[" + b",".join(items) + b"]"
+
+
+class PrebuiltJSONResponse(Response):
+    """
+    A JSON response that sends bytes as-is and encodes anything else with `dumps`.
+
+    Returning it from an endpoint skips response_model validation and FastAPI's own
+    encoding, so it is meant for payloads that were encoded from a validated model.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, (bytes, bytearray)):
+            return bytes(content)
+        return dumps(content)
+
+
+class RecipeJSONCache:
+    """
+    An LRU + TTL cache of encoded RecipeResponse JSON keyed by recipe_id.
+
+    Each entry is stored with the version of the recipes table it was rendered at,
+    and a lookup at any other version is a miss. Writes from any process bump that
+    version, so a stale body is never served, even one put back by a reader that
+    loaded the row before the write committed. max_entries=0 disables caching.
+
+    Example:
+        >>> cache = RecipeJSONCache(max_entries=10000, ttl_seconds=300)
+        >>> cache.put(1, b'{"recipe_id":1}', version=7)
+        >>> cache.get_many([1, 2], version=7)
+        {1: b'{"recipe_id":1}'}
+        >>> cache.get(1, version=8) is None
+        True
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # recipe_id -> (expires_at, version, bytes)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, recipe_id: int, version: Optional[int] = None) -> Optional[bytes]:
+        return self.get_many([recipe_id], version).get(recipe_id)
+
+    def get_many(self, recipe_ids: List[int], version: Optional[int] = None) -> Dict[int, bytes]:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for recipe_id in recipe_ids:
+                entry = self._entries.get(recipe_id)
+                if entry and entry[0] > now and entry[1] == version:
+                    self._entries.move_to_end(recipe_id)
+                    found[recipe_id] = entry[2]
+                elif entry:
+                    del self._entries[recipe_id]
+                    if entry[1] != version:
+                        self._stats["stale"] += 1
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(recipe_ids) - len(found)
+        return found
+
+    def put(self, recipe_id: int, encoded: bytes, version: Optional[int] = None):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[recipe_id] = (time.time() + self.ttl_seconds, version, encoded)
+            self._entries.move_to_end(recipe_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, *recipe_ids: int):
+        with self._lock:
+            for recipe_id in recipe_ids:
+                if self._entries.pop(recipe_id, None) is not None:
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        stats["encoder"] = "orjson" if orjson is not None else "json"
+        return stats
@@ -29,4 +29,87 @@ CREATE TABLE user_favorites (
     PRIMARY KEY (user_id, recipe_id),
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
     FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+-- Normalized recipe ingredients (one row per recipe and ingredient), kept in sync with
+-- recipes.ingredients so "recipes containing these ingredients" queries use an index
+CREATE TABLE recipe_ingredients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipe_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    canonical_name TEXT NOT NULL, -- lowercased, singular form used for matching
+    quantity TEXT,
+    FOREIGN KEY (recipe_id) REFERENCES recipes(recipe_id) ON DELETE CASCADE
+);
+CREATE INDEX ix_recipe_ingredients_recipe_id ON recipe_ingredients (recipe_id);
+CREATE INDEX ix_recipe_ingredients_canonical_name ON recipe_ingredients (canonical_name, recipe_id);
+
+-- Full-text search over recipes (SQLite FTS5). The index stores no content of its own;
+-- the triggers below keep it in sync with the recipes table. A bulk import adds a row to
+-- recipes_fts_paused inside its transaction, so the insert trigger skips its rows and
+-- they are indexed in one statement before the commit.
+CREATE VIRTUAL TABLE recipes_fts USING fts5(
+    title, description, instructions, content='recipes', content_rowid='recipe_id'
+);
+
+CREATE TABLE recipes_fts_paused (id INTEGER PRIMARY KEY);
+
+CREATE TRIGGER recipes_fts_ai AFTER INSERT ON recipes
+WHEN NOT EXISTS (SELECT 1 FROM recipes_fts_paused) BEGIN
+    INSERT INTO recipes_fts(rowid, title, description, instructions)
+    VALUES (new.recipe_id, new.title, new.description, new.instructions);
+END;
+
+CREATE TRIGGER recipes_fts_ad AFTER DELETE ON recipes BEGIN
+    INSERT INTO recipes_fts(recipes_fts, rowid, title, description, instructions)
+    VALUES ('delete', old.recipe_id, old.title, old.description, old.instructions);
+END;
+
+CREATE TRIGGER recipes_fts_au AFTER UPDATE ON recipes BEGIN
+    INSERT INTO recipes_fts(recipes_fts, rowid, title, description, instructions)
+    VALUES ('delete', old.recipe_id, old.title, old.description, old.instructions);
+    INSERT INTO recipes_fts(rowid, title, description, instructions)
+    VALUES (new.recipe_id, new.title, new.description, new.instructions);
+END;
+
+-- Per-table change counters used for HTTP ETags. Every write to a versioned table bumps its version.
+CREATE TABLE table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO table_versions (table_name, version) VALUES ('users', 0), ('recipes', 0), ('user_favorites', 0);
+
+CREATE TRIGGER users_version_insert AFTER INSERT ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER users_version_update AFTER UPDATE ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER users_version_delete AFTER DELETE ON users BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'users';
+END;
+
+CREATE TRIGGER recipes_version_insert AFTER INSERT ON recipes BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'recipes';
+END;
+
+CREATE TRIGGER recipes_version_update AFTER UPDATE ON recipes BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'recipes';
+END;
+
+CREATE TRIGGER recipes_version_delete AFTER DELETE ON recipes BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'recipes';
+END;
+
+CREATE TRIGGER user_favorites_version_insert AFTER INSERT ON user_favorites BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_favorites';
+END;
+
+CREATE TRIGGER user_favorites_version_update AFTER UPDATE ON user_favorites BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_favorites';
+END;
+
+CREATE TRIGGER user_favorites_version_delete AFTER DELETE ON user_favorites BEGIN
+    UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_favorites';
+END;
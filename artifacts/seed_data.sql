@@ -1,3 +1,7 @@
+-- System user that owns recipes imported by the RAG search (required when foreign keys are enforced)
+INSERT INTO users (user_id, username, email, password_hash) VALUES
+	(0, 'rag_import', 'rag-import@recipeshare.app', '!');
+
 INSERT INTO users (username, email, password_hash) VALUES
 	('alice', 'alice@example.com', 'hash1'),
 	('bob', 'bob@example.com', 'hash2'),
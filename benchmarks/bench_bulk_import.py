@@ -0,0 +1,111 @@
+"""
+Measures bulk recipe import throughput (recipes/s) on a file-backed SQLite database
+with the full-text search and table-version triggers installed.
+
+  - batch:  import_recipe_batch called directly, batch by batch
+  - json:   POST /recipes/bulk with a JSON array body
+  - ndjson: POST /recipes/bulk with an application/x-ndjson body
+
+Every run imports into a fresh database; the median of --repeats runs is reported.
+
+Usage:
+    python benchmarks/bench_bulk_import.py --recipes 20000 --batch-size 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.database import create_app_engine
+
+
+def make_recipes(count: int) -> list:
+    return [{
+        "title": f"Recipe {i}",
+        "description": "A weeknight dinner",
+        "instructions": "Chop, stir and simmer until done. " * 5,
+        "ingredients": [{"name": f"Ingredient {j}", "quantity": f"{j} cups"} for j in range(i % 4, i % 4 + 6)],
+    } for i in range(count)]
+
+
+def fresh_database(directory: str, run: int):
+    engine = create_app_engine(f"sqlite:///{os.path.join(directory, f'bulk-{run}.db')}")
+    main.Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    with session_factory() as db:
+        main.ensure_rag_import_user(db)
+    return engine, session_factory
+
+
+def run_batch(session_factory, recipes: list, batch_size: int) -> float:
+    with session_factory() as db:
+        start = time.perf_counter()
+        for offset in range(0, len(recipes), batch_size):
+            statuses = main.import_recipe_batch(db, list(enumerate(recipes[offset:offset + batch_size], offset)), 0)
+            assert all(row["status"] == "created" for row in statuses)
+        return time.perf_counter() - start
+
+
+def run_http(session_factory, recipes: list, batch_size: int, ndjson: bool) -> float:
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[main.get_db] = override_get_db
+    try:
+        client = TestClient(main.app)
+        if ndjson:
+            kwargs = {"content": "\n".join(json.dumps(recipe) for recipe in recipes),
+                      "headers": {"content-type": "application/x-ndjson"}}
+        else:
+            kwargs = {"content": json.dumps(recipes), "headers": {"content-type": "application/json"}}
+        start = time.perf_counter()
+        response = client.post("/recipes/bulk", params={"user_id": 0, "batch_size": batch_size}, **kwargs)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200 and response.json()["created"] == len(recipes), response.text[:500]
+        return elapsed
+    finally:
+        main.app.dependency_overrides.pop(main.get_db, None)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=main.BULK_BATCH_SIZE)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    recipes = make_recipes(args.recipes)
+    runners = {
+        "batch": lambda factory: run_batch(factory, recipes, args.batch_size),
+        "json": lambda factory: run_http(factory, recipes, args.batch_size, ndjson=False),
+        "ndjson": lambda factory: run_http(factory, recipes, args.batch_size, ndjson=True),
+    }
+    print(f"{args.recipes} recipes, batch size {args.batch_size}")
+    print(f"{'path':<8} {'recipes/s':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        run = 0
+        for name, runner in runners.items():
+            timings = []
+            for _ in range(args.repeats):
+                engine, session_factory = fresh_database(directory, run)
+                run += 1
+                timings.append(runner(session_factory))
+                engine.dispose()
+            print(f"{name:<8} {args.recipes / statistics.median(timings):>10.0f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,115 @@
+"""
+Compares knowledge-base embedding backends on the project's artifacts.
+
+Every backend embeds the same chunks, uncached, and reports throughput (chunks/s,
+excluding model load). Retrieval quality is measured two ways:
+  - hit@1 / hit@5: a passage from the middle of each chunk is used as the query,
+    and it is a hit when that chunk is ranked first / in the top 5.
+  - agree@5: how much of the OpenAI top 5 each backend also returns, averaged
+    over the same queries (only when the openai backend ran).
+Backends whose libraries or API key are missing are skipped with the reason.
+
+Usage:
+    python benchmarks/bench_embeddings.py --backends openai,local-float32,local-int8 --threads 4
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app.agent.dependencies import AgentDependencyError
+from app.agent.embeddings import LocalEmbeddings, create_embedding
+from app.agent.knowledge_base import _split_artifact, embed_texts
+
+DEFAULT_ARTIFACTS = ["artifacts/**/*.md", "artifacts/**/*.sql"]
+
+
+def load_chunks(patterns) -> list:
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern, recursive=True)})
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            chunks += [doc.page_content for doc in _split_artifact(path, f.read())]
+    return chunks
+
+
+def probe_queries(chunks) -> list:
+    """A 200-character passage from the middle of each chunk."""
+    return [chunk[max(0, len(chunk) // 2 - 100):len(chunk) // 2 + 100] for chunk in chunks]
+
+
+def build_embedding(backend: str, threads: int, batch_size: int):
+    if backend == "openai":
+        if not os.getenv("OPENAI_API_KEY"):
+            raise RuntimeError("OPENAI_API_KEY is not set")
+        return create_embedding("openai", cache=False)
+    precision = backend.split("-", 1)[1] if "-" in backend else "float32"
+    return LocalEmbeddings(precision=precision, num_threads=threads, batch_size=batch_size)
+
+
+def rankings(embedding, chunks, queries, k: int) -> list:
+    vectors = np.asarray(embed_texts(chunks, embedding), dtype=np.float32)
+    query_vectors = np.asarray([embedding.embed_query(query) for query in queries], dtype=np.float32)
+    distances = ((query_vectors[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    return [list(row[:k]) for row in np.argsort(distances, axis=1)]
+
+
+def run(backend: str, chunks, queries, threads: int, batch_size: int, repeats: int) -> dict:
+    embedding = build_embedding(backend, threads, batch_size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        embedding.embed_documents(chunks[:1])  # load the model outside the timings
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embed_texts(chunks, embedding)
+        timings.append(time.perf_counter() - start)
+    ranked = rankings(embedding, chunks, queries, k=5)
+    return {
+        "chunks_per_s": len(chunks) / statistics.median(timings),
+        "hit@1": statistics.fmean(top[0] == i for i, top in enumerate(ranked)),
+        "hit@5": statistics.fmean(i in top for i, top in enumerate(ranked)),
+        "ranked": ranked,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="openai,local-float32,local-float16,local-int8")
+    parser.add_argument("--artifacts", nargs="*", default=DEFAULT_ARTIFACTS)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.artifacts)
+    if not chunks:
+        sys.exit(f"no chunks found in {args.artifacts}")
+    queries = probe_queries(chunks)
+    print(f"{len(chunks)} chunks, {args.threads} threads, batch size {args.batch_size}")
+
+    results = {}
+    for backend in args.backends.split(","):
+        try:
+            results[backend] = run(backend, chunks, queries, args.threads, args.batch_size, args.repeats)
+        except (AgentDependencyError, RuntimeError) as e:
+            print(f"skipped {backend}: {e}")
+
+    reference = results.get("openai")
+    print(f"{'backend':<16} {'chunks/s':>10} {'hit@1':>7} {'hit@5':>7} {'agree@5':>8}")
+    for backend, result in results.items():
+        agree = (statistics.fmean(len(set(mine) & set(theirs)) / len(theirs) for mine, theirs in zip(result["ranked"], reference["ranked"]))
+                 if reference else None)
+        print(f"{backend:<16} {result['chunks_per_s']:>10.1f} {result['hit@1']:>7.2f} {result['hit@5']:>7.2f} "
+              f"{'-' if agree is None else f'{agree:.2f}':>8}")
+
+
+if __name__ == "__main__":
+    main_cli()
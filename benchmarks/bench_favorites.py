@@ -0,0 +1,102 @@
+"""
+Measures GET /users/{user_id}/favorites/ as a user's favorites grow: SQL statements
+per request and p50/p99 latency, on a file-backed SQLite database.
+
+The whole list is requested (no `limit`), so the numbers compare directly with
+revisions that loaded every favorite and then fetched its recipe one by one. The
+script only relies on the models and get_db, so it also runs against those.
+
+Usage:
+    python benchmarks/bench_favorites.py --favorites 10,100,1000 --requests 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+
+
+def fresh_database(directory: str, favorites: int):
+    engine = create_engine(f"sqlite:///{os.path.join(directory, f'favorites-{favorites}.db')}",
+                           connect_args={"check_same_thread": False})
+    main.Base.metadata.create_all(bind=engine)
+    ingredients = json.dumps([{"name": f"Ingredient {i}", "quantity": f"{i} cups"} for i in range(8)])
+    with engine.begin() as connection:
+        connection.execute(insert(main.User.__table__), [
+            {"user_id": 1, "username": "cook", "email": "cook@example.com", "password_hash": "x"}
+        ])
+        connection.execute(insert(main.Recipe.__table__), [
+            {"recipe_id": i, "user_id": 1, "title": f"Recipe {i}", "description": "A weeknight dinner",
+             "instructions": "Chop, stir and simmer until done. " * 5, "ingredients": ingredients}
+            for i in range(1, favorites + 1)
+        ])
+        connection.execute(insert(main.UserFavorite.__table__), [
+            {"user_id": 1, "recipe_id": i} for i in range(1, favorites + 1)
+        ])
+    return engine
+
+
+def measure(engine, favorites: int, requests: int):
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    statements = [0]
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.__setitem__(0, statements[0] + 1))
+    dependencies = [main.get_db] + ([main.get_read_db] if hasattr(main, "get_read_db") else [])
+    for dependency in dependencies:
+        main.app.dependency_overrides[dependency] = override_db
+    try:
+        client = TestClient(main.app)
+        for _ in range(3):  # warm up SQLite's page cache and the app
+            client.get("/users/1/favorites/")
+        statements[0] = 0
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.get("/users/1/favorites/")
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200 and len(response.json()) == favorites, response.text[:500]
+        return statements[0] / requests, timings
+    finally:
+        for dependency in dependencies:
+            main.app.dependency_overrides.pop(dependency, None)
+
+
+def percentile(timings: list, pct: float) -> float:
+    return statistics.quantiles(timings, n=100, method="inclusive")[int(pct) - 1]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--favorites", default="10,100,1000")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"GET /users/1/favorites/, {args.requests} requests each")
+    print(f"{'favorites':>9} {'queries':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for favorites in (int(count) for count in args.favorites.split(",")):
+            engine = fresh_database(directory, favorites)
+            queries, timings = measure(engine, favorites, args.requests)
+            engine.dispose()
+            print(f"{favorites:>9} {queries:>8.0f} {percentile(timings, 50):>8.2f} {percentile(timings, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
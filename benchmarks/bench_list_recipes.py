@@ -0,0 +1,103 @@
+"""
+Compares p50/p99 latency of GET /recipes/ with and without the encoded-JSON cache.
+
+The "model" run asks for every column through `fields`, which serves the same
+payload through pydantic validation and FastAPI's encoder (the pre-cache path).
+The "cold" run clears recipe_json_cache before every request; "warm" reuses it.
+
+Usage:
+    python benchmarks/bench_list_recipes.py --rows 10000 --limit 1000 --requests 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.database import create_app_engine
+
+
+def seed(session_factory, rows: int):
+    ingredients = json.dumps([{"name": f"Ingredient {i}", "quantity": f"{i} cups"} for i in range(8)])
+    with session_factory() as db:
+        main.ensure_rag_import_user(db)
+        db.execute(main.insert(main.Recipe.__table__), [
+            {"user_id": 0, "title": f"Recipe {i}", "description": "A weeknight dinner " * 5,
+             "instructions": "Chop, stir and simmer until done. " * 20, "ingredients": ingredients,
+             "created_at": datetime.utcnow()}
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def measure(client, params: dict, requests: int, before=None) -> list:
+    timings = []
+    for _ in range(requests):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = client.get("/recipes/", params=params)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return timings
+
+
+def percentile(timings: list, pct: float) -> float:
+    return statistics.quantiles(timings, n=100, method="inclusive")[int(pct) - 1]
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=main.MAX_PAGE_SIZE)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_recipes_")
+    url = f"sqlite:///{os.path.join(workdir, 'recipes.db')}"
+    engine = create_app_engine(url)
+    main.Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        main.ensure_recipe_search_index(connection)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    read_factory = sessionmaker(autocommit=False, autoflush=False, bind=create_app_engine(url, read_only=True))
+    seed(session_factory, args.rows)
+
+    def read_db():
+        db = read_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[main.get_read_db] = read_db
+    main.recipe_json_cache.max_entries = max(main.recipe_json_cache.max_entries, args.rows)
+    client = TestClient(main.app)
+    all_fields = {"limit": args.limit, "fields": ",".join(main.RECIPE_LIST_FIELDS)}
+    cached = {"limit": args.limit}
+
+    measure(client, all_fields, 5)  # warm up SQLite's page cache and the app
+    runs = {
+        "model (before)": measure(client, all_fields, args.requests),
+        "cached, cold": measure(client, cached, args.requests, before=main.recipe_json_cache.clear),
+        "cached, warm": measure(client, cached, args.requests),
+    }
+
+    print(f"GET /recipes/?limit={args.limit} over {args.rows} rows, {args.requests} requests each "
+          f"({main.recipe_json_cache.stats()['encoder']} encoder)")
+    print(f"{'path':<16} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, timings in runs.items():
+        print(f"{name:<16} {percentile(timings, 50):>8.2f} {percentile(timings, 99):>8.2f}")
+
+
+if __name__ == "__main__":
+    main_cli()
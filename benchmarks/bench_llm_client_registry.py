@@ -0,0 +1,66 @@
+"""
+Measures what the LLM client registry saves on every agent construction.
+
+"uncached" reproduces the old setup_llm_client: re-read .env (walking up from
+the working directory) and build a new SDK client on each call. "registry" is
+the current path, which returns the registered client after the first call.
+No requests are sent, so a placeholder API key is used when none is set.
+
+Usage:
+    python benchmarks/bench_llm_client_registry.py --model gpt-4.1 --calls 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.agent import utils
+
+
+def measure(model: str, calls: int, before=None) -> list:
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(calls):
+            if before:
+                before()
+            start = time.perf_counter()
+            client, _, _ = utils.setup_llm_client(model)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert client is not None, f"could not build a client for {model}"
+    return timings
+
+
+def uncached():
+    utils.invalidate_llm_clients()
+    utils._environment_loaded = False
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt-4.1")
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    provider = utils.RECOMMENDED_MODELS[args.model]["provider"]
+    os.environ.setdefault(utils._PROVIDER_API_KEYS[provider], "placeholder-key")
+    measure(args.model, 3, before=uncached)  # import the provider SDK outside the timings
+
+    runs = {
+        "uncached (before)": measure(args.model, args.calls, before=uncached),
+        "registry": measure(args.model, args.calls),
+    }
+    print(f"setup_llm_client('{args.model}') x {args.calls}")
+    print(f"{'path':<18} {'p50 ms':>8} {'mean ms':>8}")
+    for name, timings in runs.items():
+        print(f"{name:<18} {statistics.median(timings):>8.3f} {statistics.fmean(timings):>8.3f}")
+    saved = statistics.fmean(runs["uncached (before)"]) - statistics.fmean(runs["registry"])
+    print(f"saved per agent construction: {saved:.3f} ms")
+
+
+if __name__ == "__main__":
+    main_cli()
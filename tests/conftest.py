@@ -7,13 +7,52 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import StaticPool
 from app.main import Base  # Adjust the import based on actual app structure
-from app.main import get_db  # Adjust the import based on actual app structure
+from app.main import get_db, get_read_db  # Adjust the import based on actual app structure
 from fastapi.testclient import TestClient
 from app.main import app  # Adjust the import based on actual app structure
+from app.main import recipe_json_cache
+import app.main as main
 
 # Create a new SQLAlchemy engine for an in-memory SQLite database
 SQLALCHEMY_DATABASE_URL = "sqlite://"
 
+# Every test gets its own database, so recipe ids must not hit JSON cached by another test
+@pytest.fixture(autouse=True)
+def clear_recipe_json_cache():
+    recipe_json_cache.clear()
+    yield
+
+
+# An in-memory database behind every app session: request dependencies, the
+# background SessionLocal and ReadSessionLocal. Yields its sessionmaker.
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, override_get_db)
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "ReadSessionLocal", TestingSessionLocal)
+    yield TestingSessionLocal
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+# The engine behind session_factory, for tests that count statements or open their own sessions
+@pytest.fixture
+def engine(session_factory):
+    return session_factory.kw["bind"]
+
+
 # Fixture to create and destroy the database schema
 @pytest.fixture(scope="function")
 def db_engine():
@@ -52,6 +91,7 @@ def client(test_engine):
             db.close()
 
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_read_db] = _get_test_db
 
     client = TestClient(app)
     try:
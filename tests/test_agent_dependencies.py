@@ -0,0 +1,76 @@
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main as main
+from app.main import app, Base
+from app.agent import dependencies
+from app.agent.agent_pool import RecipeAgentPool
+from app.agent.dependencies import AgentDependencyError, agent_features, probe_agent_dependencies, require_agent_features
+from app.agent.recipe_cache import RecipeSearchCache
+
+
+@pytest.fixture
+def without_faiss(monkeypatch):
+    """Probes as if faiss-cpu were not installed, and fails the test if anything tries to pip install."""
+    real_find_spec = dependencies.importlib.util.find_spec
+    monkeypatch.setattr(dependencies.importlib.util, "find_spec",
+                        lambda name, *args: None if name == "faiss" else real_find_spec(name, *args))
+    monkeypatch.setattr(subprocess, "check_call", lambda *args, **kwargs: pytest.fail(f"ran {args}"))
+    probe_agent_dependencies(refresh=True)
+    yield
+    monkeypatch.undo()
+    probe_agent_dependencies(refresh=True)
+
+
+def test_probe_runs_once_per_process(monkeypatch):
+    probe_agent_dependencies(refresh=True)
+    monkeypatch.setattr(dependencies, "_is_installed", lambda module: pytest.fail("probed again"))
+    assert probe_agent_dependencies() == probe_agent_dependencies()
+
+
+def test_missing_library_disables_its_features(without_faiss):
+    features = agent_features()
+    assert (features["graph"], features["knowledge_base"], features["web_search"]) == (True, False, True)
+    require_agent_features("graph", "web_search")
+    with pytest.raises(AgentDependencyError) as raised:
+        require_agent_features("graph", "knowledge_base")
+    assert (raised.value.feature, raised.value.missing) == ("knowledge_base", ["faiss"])
+    assert "pip install faiss-cpu" in str(raised.value)
+
+
+def test_semantic_rag_cache_is_skipped_without_the_agent_stack(monkeypatch):
+    monkeypatch.setenv("RAG_CACHE_SEMANTIC", "1")
+    monkeypatch.setattr(dependencies, "_probe", {**probe_agent_dependencies(), "langchain_openai": False})
+    monkeypatch.setitem(sys.modules, "langchain_openai", None)  # importing it would raise
+    assert main._rag_cache_embedding() is None
+
+
+def test_rag_agent_refuses_to_build_instead_of_installing(without_faiss):
+    from app.agent.rag_agent import RAGAgent
+
+    with pytest.raises(AgentDependencyError):
+        RAGAgent([], agent=None)
+
+
+def test_rag_search_returns_503_when_the_agent_stack_is_missing(without_faiss, monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(main, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(main, "agent_pool", RecipeAgentPool(size=1, factory=lambda: pytest.fail("built an agent")))
+    monkeypatch.setattr(main, "rag_cache", RecipeSearchCache())
+    client = TestClient(app)
+
+    response = client.post("/recipes/rag_search/", json={"ingredients": "rice", "num_recipes": 1})
+    assert response.status_code == 503
+    assert "faiss-cpu" in response.json()["detail"]
+    assert client.get("/metrics/rag").json()["dependencies"]["knowledge_base"] is False
+
+    # Cached answers don't need an agent and keep working
+    main.rag_cache.put("rice", 1, [{"title": "rice bowl", "description": "", "instructions": "", "ingredients": []}])
+    assert client.post("/recipes/rag_search/", json={"ingredients": "rice", "num_recipes": 1}).status_code == 200
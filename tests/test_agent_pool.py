@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main as main
+from app.main import app, Base
+from app.agent.agent_pool import RecipeAgentPool, AgentPoolExhausted
+from app.agent.recipe_cache import RecipeSearchCache
+
+
+class FakeRecipeAgent:
+    instances = 0
+
+    def __init__(self):
+        FakeRecipeAgent.instances += 1
+
+    async def asearch(self, ingredients, num_recipes=3, on_recipe=None, on_token=None):
+        recipes = [{"title": f"{ingredients} bowl", "description": "", "instructions": "", "ingredients": []}]
+        for recipe in recipes:
+            if on_recipe:
+                on_recipe(recipe)
+        return {"recipe_list": recipes, "extraction_path": "local"}
+
+
+@pytest.fixture(autouse=True)
+def reset_instances():
+    FakeRecipeAgent.instances = 0
+
+
+def test_warm_up_builds_full_pool():
+    pool = RecipeAgentPool(size=3, factory=FakeRecipeAgent)
+    pool.warm_up()
+    stats = pool.stats()
+    assert FakeRecipeAgent.instances == 3
+    assert stats["created"] == 3
+    assert stats["available"] == 3
+    assert stats["warmup_seconds"] is not None
+
+
+def test_checkout_reuses_agents():
+    pool = RecipeAgentPool(size=1, factory=FakeRecipeAgent)
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        assert pool.stats()["in_use"] == 1
+    assert first is second
+    assert FakeRecipeAgent.instances == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_checkout_times_out_when_exhausted():
+    pool = RecipeAgentPool(size=1, factory=FakeRecipeAgent)
+    with pool.checkout():
+        with pytest.raises(AgentPoolExhausted):
+            with pool.checkout(timeout=0.01):
+                pass
+
+
+def test_concurrent_checkouts_never_share_an_agent():
+    pool = RecipeAgentPool(size=2, factory=FakeRecipeAgent)
+    in_use = set()
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        for _ in range(20):
+            with pool.checkout() as agent:
+                with lock:
+                    if id(agent) in in_use:
+                        errors.append("shared")
+                    in_use.add(id(agent))
+                with lock:
+                    in_use.discard(id(agent))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert FakeRecipeAgent.instances <= 2
+
+
+def test_rag_search_uses_pool_and_reports_metrics(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    monkeypatch.setattr(main, "agent_pool", RecipeAgentPool(size=1, factory=FakeRecipeAgent))
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "rag_cache", RecipeSearchCache())
+    client = TestClient(app)
+
+    for ingredients in ("rice", "beans", "corn"):
+        response = client.post("/recipes/rag_search/", json={"ingredients": ingredients, "num_recipes": 1})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["title"] == f"{ingredients} bowl"
+
+    assert FakeRecipeAgent.instances == 1
+    metrics = client.get("/metrics/rag").json()["agent_pool"]
+    assert metrics["size"] == 1
+    assert metrics["checkouts"] == 3
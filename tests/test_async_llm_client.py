@@ -0,0 +1,173 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+from utils import async_get_completion, async_get_vision_completion, setup_async_llm_client
+
+
+def openai_response(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class AsyncFakeOpenAI:
+    """Mimics AsyncOpenAI: awaitable chat.completions.create that records peak concurrency."""
+
+    def __init__(self, reply="ok", delay=0.05, reject_temperature=False, error=None):
+        self.reply = reply
+        self.delay = delay
+        self.reject_temperature = reject_temperature
+        self.error = error
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.reject_temperature and "temperature" in kwargs:
+            raise ValueError("Unsupported value: 'temperature' does not support 0.7")
+        if self.error:
+            raise self.error
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return openai_response(self.reply(kwargs) if callable(self.reply) else self.reply)
+
+
+def test_gathered_calls_are_bounded_by_the_semaphore(monkeypatch):
+    monkeypatch.setattr(utils, "LLM_MAX_CONCURRENCY", 3)
+    client = AsyncFakeOpenAI(reply=lambda kwargs: kwargs["messages"][0]["content"].upper())
+
+    async def run():
+        return await asyncio.gather(*(async_get_completion(f"p{i}", client, "gpt-4o", "openai") for i in range(9)))
+
+    assert asyncio.run(run()) == [f"P{i}" for i in range(9)]
+    assert client.max_active == 3
+
+
+def test_retries_without_temperature_and_reports_errors():
+    client = AsyncFakeOpenAI(reject_temperature=True)
+    assert asyncio.run(async_get_completion("p", client, "o3", "openai")) == "ok"
+    assert "temperature" not in client.calls[-1]
+
+    failing = AsyncFakeOpenAI(error=ValueError("invalid model"))
+    assert asyncio.run(async_get_completion("p", failing, "gpt-4o", "openai")) == "An API error occurred: invalid model"
+    assert asyncio.run(async_get_completion("p", None, "gpt-4o", "openai")) == "API client not initialized."
+
+
+def test_sync_clients_run_off_the_event_loop():
+    threads = []
+
+    def create(**kwargs):
+        threads.append(threading.current_thread())
+        return openai_response("sync")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    assert asyncio.run(async_get_completion("p", client, "gpt-4o", "openai")) == "sync"
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_vision_sends_the_image_url():
+    client = AsyncFakeOpenAI(reply="a bowl of rice", delay=0)
+    answer = asyncio.run(async_get_vision_completion("What is this?", "https://example.com/rice.png", client, "gpt-4o", "openai"))
+    assert answer == "a bowl of rice"
+    assert client.calls[0]["messages"][0]["content"][1]["image_url"] == {"url": "https://example.com/rice.png"}
+
+
+def test_async_clients_are_shared_per_provider_and_key(monkeypatch):
+    pytest.importorskip("openai")
+    monkeypatch.setattr(utils, "_async_clients", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-one")
+
+    async def run():
+        first = setup_async_llm_client("gpt-4o")
+        second = setup_async_llm_client("gpt-4.1")
+        assert first[0] is second[0]
+        assert type(first[0]).__name__ == "AsyncOpenAI"
+        assert (first[1], first[2]) == ("gpt-4o", "openai")
+
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-two")
+        assert setup_async_llm_client("gpt-4o")[0] is not first[0]
+        assert setup_async_llm_client("not-a-model") == (None, None, None)
+
+    asyncio.run(run())
+
+
+def test_async_clients_are_not_shared_between_event_loops(monkeypatch):
+    pytest.importorskip("openai")
+    monkeypatch.setattr(utils, "_async_clients", {})
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-one")
+
+    async def client():
+        return setup_async_llm_client("gpt-4o")[0]
+
+    first, second = asyncio.run(client()), asyncio.run(client())
+    assert first is not second
+    assert setup_async_llm_client("gpt-4o")[0] not in (first, second)  # no running loop: never registered
+    assert utils.llm_client_registry_stats()["async_clients"] == 2
+
+
+def test_run_on_llm_loop_reuses_one_loop_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def running_loop():
+        return asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        loops = list(executor.map(lambda _: utils.run_on_llm_loop(running_loop()), range(4)))
+    assert len(set(loops)) == 1
+    with pytest.raises(ZeroDivisionError):
+        utils.run_on_llm_loop(_divide_by_zero())
+
+
+async def _divide_by_zero():
+    return 1 / 0
+
+
+def test_async_recipe_extraction_awaits_per_index_calls_together(monkeypatch):
+    from app.agent import recipe_agent
+
+    active = {"now": 0, "max": 0}
+
+    async def fake_completion(prompt, client, model_name, api_provider, temperature=0.7, **kwargs):
+        if "at index" not in prompt:
+            return "not json"
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.02)
+        active["now"] -= 1
+        index = int(prompt.split("at index ")[1].split()[0])
+        return json.dumps({"title": f"Recipe {index}"})
+
+    monkeypatch.setattr(recipe_agent, "async_get_completion", fake_completion)
+    agent_info = SimpleNamespace(client=object(), model_name="gpt-4.1", api_provider="openai")
+    state = {"answer": "three recipes, none of them JSON", "num_recipes": 3, "coding_agent": agent_info}
+    result = asyncio.run(recipe_agent.create_recipe_agent(use_async=True).nodes["EXTRACT_RECIPES"].ainvoke(state))
+    assert result["extraction_path"] == "per_index"
+    assert [recipe["title"] for recipe in result["recipe_list"]] == ["Recipe 0", "Recipe 1", "Recipe 2"]
+    assert active["max"] == 3
+
+
+def test_async_pm_graph_runs_with_ainvoke(monkeypatch):
+    import demo_agent
+
+    replies = iter(["Software Architect", "Users have an email.", "Every user has an email address."])
+
+    async def fake_completion(prompt, client, model_name, api_provider, temperature=0.7):
+        return next(replies)
+
+    monkeypatch.setattr(demo_agent, "async_get_completion", fake_completion)
+    retriever = SimpleNamespace(invoke=lambda question: [])
+    agent_info = SimpleNamespace(client=object(), model_name="gpt-4.1", api_provider="openai",
+                                 get_knowledge=lambda key: retriever)
+    result = asyncio.run(demo_agent.create_pm_agent(use_async=True).ainvoke(
+        {"question": "What is a user?", "documents": [], "answer": "", "agent": agent_info}))
+    assert result["researcher"] == "software architect"
+    assert result["answer"] == "Every user has an email address."
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.main import app, Recipe, RecipeIngredient, User, store_rag_results
+
+
+@pytest.fixture
+def engine(engine, session_factory):
+    with session_factory() as db:
+        db.add(User(user_id=1, username="chef", email="chef@example.com", password_hash="x"))
+        db.commit()
+    return engine
+
+
+def recipe(title, *names):
+    return {"title": title, "description": "d", "instructions": "i",
+            "ingredients": [{"name": name, "quantity": "1"} for name in names]}
+
+
+def test_json_array_import_reports_per_row_status(engine):
+    client = TestClient(app)
+    client.post("/recipes/bulk", params={"user_id": 1}, json=[recipe("Existing", "Salt")])
+
+    body = [recipe("Soup", "Water", "Salt"), recipe("Existing"), {"title": "No ingredients"},
+            recipe("Soup", "Leeks"), "not an object", recipe("Stew", "Beef")]
+    response = client.post("/recipes/bulk", params={"user_id": 1, "batch_size": 2}, json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["duplicates"], data["invalid"], data["failed"]) == (2, 2, 2, 0)
+    statuses = [row["status"] for row in data["results"]]
+    assert statuses == ["created", "duplicate", "invalid", "duplicate", "invalid", "created"]
+    assert data["results"][3]["recipe_id"] == data["results"][0]["recipe_id"]
+    assert "ingredients" in data["results"][2]["error"]
+
+    soup = client.get(f"/recipes/{data['results'][0]['recipe_id']}").json()
+    assert soup["user_id"] == 1
+    assert [i["name"] for i in soup["ingredients"]] == ["Water", "Salt"]
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(RecipeIngredient).filter_by(recipe_id=soup["recipe_id"]).count() == 2
+
+
+def test_ndjson_import_commits_once_per_batch(engine):
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    lines = [json.dumps(recipe(f"Recipe {i}", "Rice")) for i in range(5)] + ["{broken", ""]
+    response = TestClient(app).post(
+        "/recipes/bulk", params={"user_id": 1, "batch_size": 2},
+        content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"},
+    )
+    data = response.json()
+    assert data["created"] == 5 and data["invalid"] == 1
+    assert [row["index"] for row in data["results"]] == list(range(6))
+    assert len(commits) == 3
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(Recipe).count() == 5
+
+
+def test_bulk_import_rejects_unknown_owner_and_bad_body(engine):
+    client = TestClient(app)
+    assert client.post("/recipes/bulk", params={"user_id": 99}, json=[recipe("A")]).status_code == 404
+    assert client.post("/recipes/bulk", json={"title": "A"}).status_code == 400
+
+
+def test_store_rag_results_skips_known_titles_in_one_batch(engine):
+    with sessionmaker(bind=engine)() as db:
+        first = store_rag_results(db, [{"title": "Fried Rice", "ingredients": ["Rice"]}, {"ingredients": []}])
+        second = store_rag_results(db, [{"title": "Fried Rice", "ingredients": ["Rice"]}])
+        assert [row["status"] for row in first] == ["created", "invalid"]
+        assert second[0]["status"] == "duplicate"
+        assert db.query(Recipe).filter_by(user_id=main.RAG_IMPORT_USER_ID).count() == 1
+
+
+def test_bulk_imported_recipes_are_searchable(engine):
+    client = TestClient(app)
+    response = client.post("/recipes/bulk", params={"user_id": 1, "batch_size": 2},
+                           json=[recipe("Garlic Soup"), recipe("Garlic Bread"), recipe("Lentil Stew")])
+    assert response.json()["created"] == 3
+    client.post("/recipes/", json=recipe("Garlic Noodles", "Garlic"))
+    titles = {r["title"] for r in client.get("/recipes/search", params={"q": "garlic"}).json()}
+    assert titles == {"Garlic Soup", "Garlic Bread", "Garlic Noodles"}
+    with sessionmaker(bind=engine)() as db:
+        assert db.connection().exec_driver_sql("SELECT COUNT(*) FROM recipes_fts_paused").scalar() == 0
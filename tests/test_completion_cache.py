@@ -0,0 +1,118 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent import recipe_agent, utils
+from app.agent.utils import (InMemoryCompletionCache, SQLiteCompletionCache, completion_cache_key,
+                             completion_cache_stats, configure_completion_cache, get_completion)
+
+
+class CountingClient:
+    """A sync OpenAI-shaped client that answers with a numbered reply."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"answer {self.calls}"))])
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch):
+    monkeypatch.setattr(utils, "_completion_cache", None)
+    monkeypatch.setattr(utils, "_completion_cache_configured", False)
+    monkeypatch.setattr(utils, "_completion_cache_policy", {"max_temperature": 0.2, "force": False, "offline": False})
+    monkeypatch.setattr(utils, "_completion_cache_stats", {"hits": 0, "misses": 0, "stores": 0, "bypassed": 0})
+
+
+def test_caching_is_off_by_default():
+    client = CountingClient()
+    get_completion("p", client, "gpt-4o", "openai", temperature=0)
+    get_completion("p", client, "gpt-4o", "openai", temperature=0)
+    assert client.calls == 2
+    assert completion_cache_stats() is None
+
+
+def test_deterministic_prompts_are_served_from_memory():
+    configure_completion_cache(InMemoryCompletionCache())
+    client = CountingClient()
+    assert get_completion("route me", client, "gpt-4o", "openai", temperature=0) == "answer 1"
+    assert get_completion("route me", client, "gpt-4o", "openai", temperature=0) == "answer 1"
+    assert get_completion("route me", client, "gpt-4.1", "openai", temperature=0) == "answer 2"
+    assert client.calls == 2
+    stats = completion_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (1, 2, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_sampled_completions_are_only_cached_when_forced():
+    configure_completion_cache(InMemoryCompletionCache())
+    client = CountingClient()
+    get_completion("p", client, "gpt-4o", "openai")
+    get_completion("p", client, "gpt-4o", "openai")
+    assert client.calls == 2
+    assert completion_cache_stats()["bypassed"] == 2
+
+    get_completion("p", client, "gpt-4o", "openai", use_cache=True)
+    assert get_completion("p", client, "gpt-4o", "openai", use_cache=True) == "answer 3"
+    assert get_completion("p", client, "gpt-4o", "openai", temperature=0, use_cache=False) == "answer 4"
+
+
+def test_errors_are_not_cached():
+    configure_completion_cache(InMemoryCompletionCache())
+    failing = CountingClient(error=ValueError("invalid model"))
+    assert get_completion("p", failing, "gpt-4o", "openai", temperature=0).startswith("An API error occurred")
+    assert get_completion("p", CountingClient(), "gpt-4o", "openai", temperature=0) == "answer 1"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = InMemoryCompletionCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+
+def test_sqlite_backend_persists_and_expires(tmp_path):
+    path = str(tmp_path / "completions.sqlite3")
+    SQLiteCompletionCache(path).put("k", "stored")
+    assert SQLiteCompletionCache(path).get("k") == "stored"
+
+    expiring = SQLiteCompletionCache(path, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert expiring.get("k") is None
+    assert expiring.stats()["entries"] == 0
+
+
+def test_offline_run_against_a_prefilled_cache(tmp_path):
+    recipes = [{"title": "Fried Rice", "ingredients": [{"name": "Rice", "quantity": "1 cup"}]}]
+    answer = "Fried rice is the best use of leftover rice."
+    prompt = recipe_agent._extract_all_prompt(answer, 1)
+    fixture = SQLiteCompletionCache(str(tmp_path / "fixture.sqlite3"))
+    fixture.put(completion_cache_key("openai", "gpt-4.1", prompt, 0), json.dumps(recipes))
+    configure_completion_cache(fixture, offline=True)
+
+    # No client at all: the node is answered entirely from the cache
+    agent_info = SimpleNamespace(client=None, model_name="gpt-4.1", api_provider="openai")
+    result = recipe_agent.extract_recipes_node({"answer": answer, "num_recipes": 1, "coding_agent": agent_info})
+    assert result["recipe_list"] == recipes
+    assert result["extraction_path"] == "batched"
+    assert get_completion("unknown", None, "gpt-4.1", "openai", temperature=0).endswith("(offline mode)")
+
+
+def test_async_completions_share_the_cache():
+    import asyncio
+
+    configure_completion_cache(InMemoryCompletionCache())
+    client = CountingClient()
+    assert get_completion("p", client, "gpt-4o", "openai", temperature=0) == "answer 1"
+    assert asyncio.run(utils.async_get_completion("p", client, "gpt-4o", "openai", temperature=0)) == "answer 1"
+    assert client.calls == 1
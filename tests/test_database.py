@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_app_engine, create_read_engine
+from app.main import Base, User, ensure_rag_import_user, RAG_IMPORT_USER_ID
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'recipes.db'}"
+
+
+def pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def test_sqlite_profile_pragmas_are_applied_on_connect(db_url):
+    engine = create_app_engine(db_url)
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "synchronous") == 1  # NORMAL
+    assert pragma(engine, "foreign_keys") == 1
+    assert pragma(engine, "busy_timeout") == 5000
+    assert pragma(engine, "cache_size") == -64000
+    assert engine.pool.size() == 5
+
+
+def test_read_engine_rejects_writes(db_url):
+    engine = create_app_engine(db_url)
+    Base.metadata.create_all(bind=engine)
+    read_engine = create_app_engine(db_url, read_only=True)
+    with read_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM users")).scalar() == 0
+        with pytest.raises(OperationalError):
+            connection.execute(text("INSERT INTO users (username, email, password_hash) VALUES ('a', 'a@b.co', 'h')"))
+
+
+def test_foreign_keys_need_the_rag_import_user(db_url):
+    engine = create_app_engine(db_url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        ensure_rag_import_user(db)
+        ensure_rag_import_user(db)
+        assert db.get(User, RAG_IMPORT_USER_ID).username == "rag_import"
+        assert db.query(User).count() == 1
+
+
+def test_in_memory_database_is_shared_by_threads_and_the_read_engine():
+    from concurrent.futures import ThreadPoolExecutor
+
+    engine = create_app_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    assert create_read_engine("sqlite://", engine) is engine
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(pragma, engine, "foreign_keys").result() == 1
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (username, email, password_hash) VALUES ('a', 'a@b.co', 'h')"))
+        count = executor.submit(lambda: engine.connect().execute(text("SELECT count(*) FROM users")).scalar()).result()
+    assert count == 1
+    assert create_read_engine("sqlite:///recipes.db", engine) is not engine
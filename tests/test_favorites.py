@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app, User, Recipe, UserFavorite
+
+
+def seed_favorites(engine, count):
+    """Creates user 1 with `count` favorites, favorited in reverse recipe_id order."""
+    start = datetime(2025, 1, 1)
+    with sessionmaker(bind=engine)() as db:
+        db.add(User(user_id=1, username="alice", email="alice@example.com", password_hash="hash1"))
+        for i in range(1, count + 1):
+            db.add(Recipe(recipe_id=i, user_id=1, title=f"Recipe {i}", ingredients='[{"name": "Salt", "quantity": "1 tsp"}]'))
+            db.add(UserFavorite(user_id=1, recipe_id=i, favorited_at=start - timedelta(minutes=i)))
+        db.commit()
+
+
+def count_queries(engine, fn):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+@pytest.mark.parametrize("favorites", [5, 50, 500])
+def test_query_count_is_constant(engine, favorites):
+    seed_favorites(engine, favorites)
+    client = TestClient(app)
+    responses = []
+    queries = count_queries(engine, lambda: responses.append(client.get("/users/1/favorites/")))
+    assert len(responses[0].json()) == favorites
+    assert queries == 2  # the ETag's table_versions lookup plus one joined query
+
+
+def test_favorites_are_ordered_by_favorited_at(engine):
+    seed_favorites(engine, 3)
+    body = TestClient(app).get("/users/1/favorites/").json()
+    assert [r["recipe_id"] for r in body] == [3, 2, 1]
+    assert body[0]["ingredients"] == [{"name": "Salt", "quantity": "1 tsp"}]
+
+
+def test_keyset_pagination(engine):
+    seed_favorites(engine, 5)
+    client = TestClient(app)
+    first = client.get("/users/1/favorites/", params={"limit": 2}).json()
+    assert [r["recipe_id"] for r in first] == [5, 4]
+    second = client.get("/users/1/favorites/", params={"limit": 2, "after_recipe_id": 4}).json()
+    assert [r["recipe_id"] for r in second] == [3, 2]
+    last = client.get("/users/1/favorites/", params={"limit": 2, "after_recipe_id": 1}).json()
+    assert last == []
@@ -0,0 +1,123 @@
+from fastapi.testclient import TestClient
+
+from app.main import app, Recipe, store_rag_results, fts_match_expression, ensure_recipe_search_index
+
+
+def create(client, title, description, instructions="", ingredients=("Salt",)):
+    payload = {"title": title, "description": description, "instructions": instructions,
+               "ingredients": [{"name": name, "quantity": "1"} for name in ingredients]}
+    return client.post("/recipes/", json=payload).json()["recipe_id"]
+
+
+def test_match_expression_quotes_words_and_prefixes_last():
+    assert fts_match_expression('garlic "chick') == '"garlic" "chick"*'
+    assert fts_match_expression("  -- ") == ""
+
+
+def test_search_ranks_title_matches_first_with_snippets(session_factory):
+    client = TestClient(app)
+    create(client, "Pancakes", "Serve with garlic butter", "Mix and fry")
+    create(client, "Garlic Chicken", "Simple weeknight chicken", "Saute garlic")
+    body = client.get("/recipes/search", params={"q": "garlic"}).json()
+    assert [r["title"] for r in body] == ["Garlic Chicken", "Pancakes"]
+    assert body[0]["score"] > body[1]["score"]
+    assert "<mark>" in body[1]["snippet"]
+    assert body[0]["ingredients"] == [{"name": "Salt", "quantity": "1"}]
+
+
+def test_search_paginates_and_filters(session_factory):
+    client = TestClient(app)
+    for i in range(5):
+        create(client, f"Rice Bowl {i}", "rice", ingredients=("Rice",) if i % 2 else ("Beans",))
+    assert len(client.get("/recipes/search", params={"q": "rice", "limit": 2, "offset": 4}).json()) == 1
+    with_pantry = client.get("/recipes/search", params={"q": "bowl", "ingredients": "rice"}).json()
+    assert [r["title"] for r in with_pantry] == ["Rice Bowl 1", "Rice Bowl 3"]
+    assert client.get("/recipes/search").status_code == 400
+
+
+def test_triggers_follow_updates_and_deletes(session_factory):
+    client = TestClient(app)
+    recipe_id = create(client, "Tomato Soup", "warming")
+    with session_factory() as db:
+        recipe = db.get(Recipe, recipe_id)
+        recipe.title = "Pumpkin Soup"
+        db.commit()
+    assert client.get("/recipes/search", params={"q": "tomato"}).json() == []
+    assert len(client.get("/recipes/search", params={"q": "pumpkin"}).json()) == 1
+    with session_factory() as db:
+        db.delete(db.get(Recipe, recipe_id))
+        db.commit()
+    assert client.get("/recipes/search", params={"q": "pumpkin"}).json() == []
+
+
+def test_existing_rows_are_indexed_when_index_is_added(session_factory):
+    with session_factory() as db:
+        db.add(Recipe(user_id=1, title="Legacy Lasagna", ingredients="[]"))
+        db.commit()
+        connection = db.connection()
+        connection.exec_driver_sql("DROP TABLE recipes_fts")
+        ensure_recipe_search_index(connection)
+        db.commit()
+    assert [r["title"] for r in TestClient(app).get("/recipes/search", params={"q": "lasagna"}).json()] == ["Legacy Lasagna"]
+
+
+def test_insert_trigger_from_before_bulk_imports_is_replaced(session_factory):
+    with session_factory() as db:
+        connection = db.connection()
+        connection.exec_driver_sql("DROP TRIGGER recipes_fts_ai")
+        connection.exec_driver_sql("""CREATE TRIGGER recipes_fts_ai AFTER INSERT ON recipes BEGIN
+            INSERT INTO recipes_fts(rowid, title, description, instructions)
+            VALUES (new.recipe_id, new.title, new.description, new.instructions);
+        END""")
+        ensure_recipe_search_index(connection)
+        trigger = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'recipes_fts_ai'").scalar()
+        db.commit()
+    assert "recipes_fts_paused" in trigger
+    create(TestClient(app), "Miso Soup", "savory")
+    assert [r["title"] for r in TestClient(app).get("/recipes/search", params={"q": "miso"}).json()] == ["Miso Soup"]
+
+
+def test_loosely_typed_rag_ingredients_are_dropped_not_fatal(session_factory):
+    with session_factory() as db:
+        store_rag_results(db, [
+            {"title": "Rice Pilaf", "ingredients": ["rice", "water"]},
+            {"title": "Chicken Rice", "ingredients": [{"name": "Chicken", "quantity": 2}, {"name": "Rice", "quantity": "1 cup"}]},
+        ])
+    client = TestClient(app)
+    for q in ("chicken", "rice"):
+        assert client.get("/recipes/search", params={"q": q}).status_code == 200
+    ingredients = {r["title"]: r["ingredients"] for r in client.get("/recipes/search", params={"q": "rice"}).json()}
+    assert ingredients == {"Rice Pilaf": [], "Chicken Rice": [{"name": "Rice", "quantity": "1 cup"}]}
+
+
+def test_bootstrap_schema_matches_the_app_search_index(tmp_path):
+    import os
+    import re
+    import sqlite3
+
+    from sqlalchemy.orm import sessionmaker
+    from app.database import create_app_engine
+    from app.main import ensure_rag_import_user, import_recipe_batch
+
+    def triggers(path):
+        with sqlite3.connect(path) as connection:
+            rows = connection.execute("SELECT name, sql FROM sqlite_master WHERE name LIKE 'recipes_fts%'").fetchall()
+        return {name: re.sub(r"\s+", " ", (sql or "").replace("IF NOT EXISTS ", "")) for name, sql in rows}
+
+    schema_path = os.path.join(os.path.dirname(__file__), "..", "artifacts", "schema.sql")
+    bootstrapped, created = str(tmp_path / "schema.db"), str(tmp_path / "app.db")
+    with sqlite3.connect(bootstrapped) as connection:
+        connection.executescript(open(schema_path).read())
+    app_engine = create_app_engine(f"sqlite:///{created}")
+    Recipe.metadata.create_all(bind=app_engine)
+    app_engine.dispose()
+    assert "recipes_fts_paused" in triggers(bootstrapped)
+    assert triggers(bootstrapped) == triggers(created)
+
+    engine = create_app_engine(f"sqlite:///{bootstrapped}")
+    with sessionmaker(bind=engine)() as db:
+        ensure_rag_import_user(db)
+        import_recipe_batch(db, [(0, {"title": "Miso Soup", "ingredients": []}), (1, {"title": "Miso Ramen", "ingredients": []})], 0)
+        indexed = db.connection().exec_driver_sql("SELECT COUNT(*) FROM recipes_fts WHERE recipes_fts MATCH 'miso'").scalar()
+    engine.dispose()
+    assert indexed == 2
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.main import app, User, Recipe, UserFavorite, etag_matches
+
+
+@pytest.fixture
+def engine(engine, session_factory):
+    with session_factory() as db:
+        db.add(User(user_id=1, username="chef", email="chef@example.com", password_hash="hash"))
+        for i in (1, 2):
+            db.add(Recipe(recipe_id=i, user_id=1, title=f"Recipe {i}", ingredients='[{"name": "Rice", "quantity": "1"}]'))
+        db.add(UserFavorite(user_id=1, recipe_id=1))
+        db.commit()
+    return engine
+
+
+def statements_during(engine, fn):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return statements
+
+
+@pytest.mark.parametrize("path", ["/recipes/1", "/recipes/", "/recipes/?fields=title", "/users/1/favorites/", "/users/1"])
+def test_matching_etag_returns_304_without_loading_rows(engine, path):
+    client = TestClient(app)
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"]
+
+    responses = []
+    statements = statements_during(engine, lambda: responses.append(client.get(path, headers={"If-None-Match": etag})))
+    assert responses[0].status_code == 304
+    assert responses[0].content == b""
+    assert responses[0].headers["ETag"] == etag
+    assert len(statements) == 1 and "table_versions" in statements[0]
+
+
+def test_writes_change_the_etag(engine):
+    client = TestClient(app)
+    recipe_etag = client.get("/recipes/2").headers["ETag"]
+    favorites_etag = client.get("/users/1/favorites/").headers["ETag"]
+    assert client.get("/recipes/1").headers["ETag"] != recipe_etag  # the URL is part of the tag
+
+    client.post("/users/1/favorites/2")
+    assert client.get("/recipes/2", headers={"If-None-Match": recipe_etag}).status_code == 304
+    refreshed = client.get("/users/1/favorites/", headers={"If-None-Match": favorites_etag})
+    assert refreshed.status_code == 200
+    assert [r["recipe_id"] for r in refreshed.json()] == [1, 2]
+
+    with sessionmaker(bind=engine)() as db:
+        db.execute(main.text("UPDATE recipes SET title = 'Changed elsewhere' WHERE recipe_id = 2"))
+        db.commit()
+    assert client.get("/recipes/2", headers={"If-None-Match": recipe_etag}).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/recipes/2", "/recipes/", "/users/1/favorites/"])
+def test_body_is_rendered_at_the_version_its_etag_names(engine, path):
+    client = TestClient(app)
+    client.post("/users/1/favorites/2")
+    stale_etag = client.get(path).headers["ETag"]  # also caches the JSON in this worker
+    # Another worker updates the recipe; this worker's cache is not told
+    with sessionmaker(bind=engine)() as db:
+        db.execute(main.text("UPDATE recipes SET title = 'Changed elsewhere' WHERE recipe_id = 2"))
+        db.commit()
+    response = client.get(path, headers={"If-None-Match": stale_etag})
+    assert response.status_code == 200 and response.headers["ETag"] != stale_etag
+    assert b"Changed elsewhere" in response.content
+    assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_non_sqlite_backends_get_no_validator(engine, monkeypatch):
+    monkeypatch.setattr(main, "read_table_versions", lambda db: None)
+    response = TestClient(app).get("/recipes/1")
+    assert response.status_code == 200 and "ETag" not in response.headers
+    assert response.json()["recipe_id"] == 1
+
+
+def test_cache_control_policies(engine, monkeypatch):
+    monkeypatch.setitem(main.HTTP_CACHE_POLICIES, "recipe", "public, max-age=600")
+    client = TestClient(app)
+    assert client.get("/recipes/1").headers["Cache-Control"] == "public, max-age=600"
+    assert client.get("/users/1/favorites/").headers["Cache-Control"].startswith("private")
+
+
+def test_etag_matching_rules():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
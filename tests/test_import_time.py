@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+# Generous enough for a cold CI runner; importing the agent stack eagerly took about 3 s
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+AGENT_ONLY_MODULES = ("langchain", "langchain_core", "langchain_community", "langchain_openai", "langgraph",
+                      "faiss", "openai", "torch", "PIL", "IPython")
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def import_times(module: str) -> dict:
+    """Runs `python -X importtime -c "import <module>"` in a fresh interpreter; returns cumulative ms per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def test_app_main_imports_within_budget_and_without_the_agent_stack():
+    times = import_times("app.main")
+    assert times["app.main"] < IMPORT_TIME_BUDGET_MS, f"import app.main took {times['app.main']:.0f} ms"
+    loaded = sorted(name for name in times if name.split(".")[0] in AGENT_ONLY_MODULES)
+    assert loaded == [], f"agent-only modules imported by app.main: {loaded[:10]}"
@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.main import app, Recipe, RecipeIngredient, backfill_recipe_ingredients, store_rag_results
+
+
+def create(client, title, *names):
+    payload = {"title": title, "ingredients": [{"name": name, "quantity": "1"} for name in names]}
+    assert client.post("/recipes/", json=payload).status_code == 201
+
+
+def test_create_recipe_maintains_canonical_rows(session_factory):
+    create(TestClient(app), "Garlic Chicken", "Chicken", "Garlic Cloves", "garlic cloves")
+    with session_factory() as db:
+        names = sorted(row.canonical_name for row in db.query(RecipeIngredient))
+    assert names == ["chicken", "garlic clove"]
+
+
+def test_search_ranks_by_pantry_coverage(session_factory):
+    client = TestClient(app)
+    create(client, "Garlic Chicken", "Chicken", "Garlic")
+    create(client, "Chicken Curry", "Chicken", "Curry Paste", "Coconut Milk", "Rice")
+    create(client, "Pancakes", "Flour", "Eggs", "Milk")
+
+    body = client.get("/recipes/search", params={"ingredients": "garlic, CHICKENS, rice"}).json()
+    assert [r["title"] for r in body] == ["Garlic Chicken", "Chicken Curry"]
+    assert (body[0]["coverage"], body[0]["matched"], body[0]["total"]) == (1.0, 2, 2)
+    assert body[1]["coverage"] == 0.5
+
+    full = client.get("/recipes/search", params={"ingredients": "garlic, chicken", "min_coverage": 1}).json()
+    assert [r["title"] for r in full] == ["Garlic Chicken"]
+    assert client.get("/recipes/search", params={"ingredients": " , "}).status_code == 400
+
+
+def test_rag_import_path_indexes_ingredients(session_factory):
+    with session_factory() as db:
+        store_rag_results(db, [{"title": "Fried Rice", "ingredients": [{"name": "Rice", "quantity": "2 cups"}, "Eggs"]}])
+        assert sorted(row.canonical_name for row in db.query(RecipeIngredient)) == ["egg", "rice"]
+
+
+def test_backfill_indexes_existing_rows_once(session_factory):
+    with session_factory() as db:
+        db.add(Recipe(user_id=1, title="Old", ingredients='[{"name": "Salt", "quantity": "1"}]'))
+        db.add(Recipe(user_id=1, title="Legacy", ingredients="rice, beans"))
+        db.commit()
+        assert backfill_recipe_ingredients(db, batch_size=1) == 2
+        assert backfill_recipe_ingredients(db) == 0
+        assert sorted(row.canonical_name for row in db.query(RecipeIngredient)) == ["bean", "rice", "salt"]
+
+
+def test_backfill_skips_recipes_without_ingredients(session_factory):
+    from sqlalchemy import event
+
+    with session_factory() as db:
+        for ingredients in ("", "[]"):
+            db.add(Recipe(user_id=1, title="Empty", ingredients=ingredients))
+        db.commit()
+        db.expunge_all()
+        loaded = []
+        event.listen(db, "loaded_as_persistent", lambda session, instance: loaded.append(instance))
+        assert backfill_recipe_ingredients(db) == 0
+        assert loaded == []
+
+
+def test_local_rag_recipes_need_full_coverage(session_factory):
+    with session_factory() as db:
+        store_rag_results(db, [
+            {"title": "Fried Rice", "description": "d", "instructions": "i", "ingredients": [{"name": "Rice", "quantity": "1"}]},
+            {"title": "Rice Pudding", "description": "d", "instructions": "i",
+             "ingredients": [{"name": "Rice", "quantity": "1"}, {"name": "Milk", "quantity": "1"}]},
+        ])
+    assert [r["title"] for r in main.local_rag_recipes(("rice",), 1)] == ["Fried Rice"]
+    assert main.local_rag_recipes(("rice",), 2) is None
+    assert len(main.local_rag_recipes(("milk", "rice"), 2)) == 2
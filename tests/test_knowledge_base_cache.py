@@ -0,0 +1,140 @@
+import os
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.agent import knowledge_base
+from app.agent.knowledge_base import create_knowledge_base, create_knowledge_bases, embed_texts
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+
+def write_artifacts(tmp_path):
+    schema = tmp_path / "schema.sql"
+    seed = tmp_path / "seed.sql"
+    schema.write_text("CREATE TABLE recipes (recipe_id INTEGER PRIMARY KEY, title TEXT);")
+    seed.write_text("INSERT INTO recipes (title) VALUES ('Garlic Chicken');")
+    return schema, seed
+
+
+def test_unchanged_artifacts_are_not_re_embedded(tmp_path):
+    schema, seed = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    paths = [str(schema), str(seed)]
+
+    first = CountingEmbedding(size=16)
+    create_knowledge_base(paths, embedding=first, cache_dir=cache_dir)
+    assert first.calls == 2
+
+    second = CountingEmbedding(size=16)
+    retriever = create_knowledge_base(paths, embedding=second, cache_dir=cache_dir)
+    assert second.calls == 0
+    sources = {doc.metadata["source"] for doc in retriever.vectorstore.docstore._dict.values()}
+    assert sources == set(paths)
+
+
+def test_only_changed_artifact_is_re_embedded(tmp_path):
+    schema, seed = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    paths = [str(schema), str(seed)]
+    create_knowledge_base(paths, embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+
+    seed.write_text("INSERT INTO recipes (title) VALUES ('Classic Pancakes');")
+    hits_before = knowledge_base.kb_cache_stats["hits"]
+    embedding = CountingEmbedding(size=16)
+    create_knowledge_base(paths, embedding=embedding, cache_dir=cache_dir)
+    assert embedding.calls == 1
+    assert knowledge_base.kb_cache_stats["hits"] == hits_before + 1
+
+
+def cache_entries(cache_dir):
+    return sorted(os.path.relpath(root, cache_dir) for root, _, files in os.walk(cache_dir) if files)
+
+
+def test_edited_artifact_replaces_its_cache_entry(tmp_path):
+    schema, seed = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    paths = [str(schema), str(seed)]
+    create_knowledge_base(paths, embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+    before = cache_entries(cache_dir)
+
+    seed.write_text("INSERT INTO recipes (title) VALUES ('Classic Pancakes');")
+    create_knowledge_base(paths, embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+    after = cache_entries(cache_dir)
+    assert len(before) == len(after) == 2
+    assert len(set(before) & set(after)) == 1
+    assert all(sorted(os.listdir(os.path.join(cache_dir, entry))) == ["index.faiss", "index.pkl"] for entry in after)
+
+
+def test_half_written_entry_is_rebuilt(tmp_path):
+    schema, _ = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    create_knowledge_base([str(schema)], embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+    [entry] = cache_entries(cache_dir)
+    os.remove(os.path.join(cache_dir, entry, "index.pkl"))
+
+    misses_before = knowledge_base.kb_cache_stats["misses"]
+    embedding = CountingEmbedding(size=16)
+    retriever = create_knowledge_base([str(schema)], embedding=embedding, cache_dir=cache_dir)
+    assert embedding.calls == 1
+    assert knowledge_base.kb_cache_stats["misses"] == misses_before + 1
+    assert retriever.invoke(schema.read_text())[0].page_content == schema.read_text()
+    assert cache_entries(cache_dir) == [entry]
+
+
+def test_embedding_settings_are_part_of_the_key(tmp_path):
+    schema, _ = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    create_knowledge_base([str(schema)], embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+
+    other = CountingEmbedding(size=32)
+    create_knowledge_base([str(schema)], embedding=other, cache_dir=cache_dir)
+    assert other.calls == 1
+
+
+class BatchRecordingEmbedding(DeterministicFakeEmbedding):
+    batches: list = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def test_shared_artifacts_are_embedded_once_across_keys(tmp_path):
+    schema, seed = write_artifacts(tmp_path)
+    duplicate = tmp_path / "schema_copy.sql"
+    duplicate.write_text(schema.read_text())
+    embedding = BatchRecordingEmbedding(size=16, batches=[])
+
+    retrievers = create_knowledge_bases([("prd", [str(seed), str(schema)]), ("tech", [str(schema), str(duplicate)])],
+                                        embedding=embedding, cache_dir=None)
+    assert sorted(text for batch in embedding.batches for text in batch) == sorted({schema.read_text(), seed.read_text()})
+    assert {doc.metadata["source"] for doc in retrievers["tech"].vectorstore.docstore._dict.values()} == {str(schema), str(duplicate)}
+    assert retrievers["prd"].invoke(seed.read_text())[0].metadata["source"] == str(seed)
+
+
+def test_cached_vectors_are_reused_for_every_key(tmp_path):
+    schema, seed = write_artifacts(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    create_knowledge_base([str(schema), str(seed)], embedding=CountingEmbedding(size=16), cache_dir=cache_dir)
+
+    embedding = CountingEmbedding(size=16)
+    retrievers = create_knowledge_bases([("a", [str(schema)]), ("b", [str(seed), str(schema)]), ("empty", [])],
+                                        embedding=embedding, cache_dir=cache_dir)
+    assert embedding.calls == 0
+    assert retrievers["a"].invoke(schema.read_text())[0].page_content == schema.read_text()
+    assert retrievers["b"].invoke(seed.read_text())[0].metadata["source"] == str(seed)
+    assert retrievers["empty"] is None
+
+
+def test_unique_chunks_are_embedded_in_concurrent_batches():
+    texts = [f"chunk {i % 10}" for i in range(25)]
+    embedding = BatchRecordingEmbedding(size=8, batches=[])
+    vectors = embed_texts(texts, embedding, batch_size=4, max_workers=3)
+    assert sorted(len(batch) for batch in embedding.batches) == [2, 4, 4]
+    assert vectors == [embedding.embed_query(text) for text in texts]
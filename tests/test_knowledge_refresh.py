@@ -0,0 +1,114 @@
+import os
+import threading
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.agent.knowledge_watcher import KnowledgeWatcher
+from app.agent.rag_agent import AgentInfo
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    texts: list = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    # The knowledge base cache lives under ./artifacts, so keep it inside tmp_path
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / "artifacts"
+    directory.mkdir()
+    files = {name: directory / name for name in ("prd.md", "schema.sql", "adr.md")}
+    files["prd.md"].write_text("Users can save favorite recipes.")
+    files["schema.sql"].write_text("CREATE TABLE recipes (recipe_id INTEGER PRIMARY KEY);")
+    files["adr.md"].write_text("We chose SQLite for the database.")
+    return {name: str(path) for name, path in files.items()}
+
+
+@pytest.fixture
+def agent_info(artifacts):
+    info = AgentInfo(None, None, None, embedding=CountingEmbedding(size=16, texts=[]))
+    info.add_knowledge_bases([("prd", [artifacts["prd.md"], artifacts["schema.sql"]]), ("tech", [artifacts["schema.sql"]])])
+    info.embedding.texts.clear()
+    return info
+
+
+def contents(info, key):
+    store = info.get_knowledge(key).vectorstore
+    return sorted(store.docstore.search(doc_id).page_content for doc_id in store.index_to_docstore_id.values())
+
+
+def test_update_re_embeds_only_the_changed_file(agent_info, artifacts):
+    open(artifacts["schema.sql"], "w").write("CREATE TABLE users (user_id INTEGER PRIMARY KEY);")
+    before = agent_info.get_knowledge("tech")
+    agent_info.update_knowledge_source(artifacts["schema.sql"])
+
+    assert agent_info.embedding.texts == ["CREATE TABLE users (user_id INTEGER PRIMARY KEY);"]
+    assert contents(agent_info, "tech") == ["CREATE TABLE users (user_id INTEGER PRIMARY KEY);"]
+    assert contents(agent_info, "prd") == ["CREATE TABLE users (user_id INTEGER PRIMARY KEY);", "Users can save favorite recipes."]
+    # The retriever handed out before the refresh still answers from its own snapshot
+    assert before.invoke("recipes")[0].page_content.startswith("CREATE TABLE recipes")
+
+
+def test_add_and_remove_sources(agent_info, artifacts):
+    agent_info.add_knowledge_source("tech", artifacts["adr.md"])
+    assert "We chose SQLite for the database." in contents(agent_info, "tech")
+    assert agent_info.knowledge_sources["tech"] == [artifacts["schema.sql"], artifacts["adr.md"]]
+
+    agent_info.remove_knowledge_source(artifacts["schema.sql"], keys=["prd"])
+    assert contents(agent_info, "prd") == ["Users can save favorite recipes."]
+    assert len(contents(agent_info, "tech")) == 2
+
+    os.remove(artifacts["adr.md"])
+    agent_info.update_knowledge_source(artifacts["adr.md"])
+    assert contents(agent_info, "tech") == ["CREATE TABLE recipes (recipe_id INTEGER PRIMARY KEY);"]
+
+    agent_info.add_knowledge_source("new", artifacts["prd.md"])
+    assert agent_info.get_knowledge("new").invoke("favorites")[0].page_content == "Users can save favorite recipes."
+
+
+def test_queries_stay_available_during_refresh(agent_info, artifacts):
+    errors, stop = [], threading.Event()
+
+    def query():
+        while not stop.is_set():
+            try:
+                assert len(agent_info.get_knowledge("prd").invoke("recipes")) == 2
+            except Exception as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=query)
+    reader.start()
+    for i in range(20):
+        open(artifacts["prd.md"], "w").write(f"Revision {i} of the product requirements.")
+        agent_info.update_knowledge_source(artifacts["prd.md"])
+    stop.set()
+    reader.join()
+    assert errors == []
+    assert "Revision 19 of the product requirements." in contents(agent_info, "prd")
+
+
+def test_watcher_applies_changed_files(agent_info, artifacts):
+    watcher = KnowledgeWatcher(agent_info, "artifacts", interval=0.01)
+    assert watcher.poll() == []
+
+    open(artifacts["schema.sql"], "w").write("CREATE TABLE favorites (user_id INTEGER, recipe_id INTEGER);")
+    os.utime(artifacts["schema.sql"], ns=(1, 1))
+    assert watcher.poll() == [artifacts["schema.sql"]]
+    assert contents(agent_info, "tech") == ["CREATE TABLE favorites (user_id INTEGER, recipe_id INTEGER);"]
+
+    os.remove(artifacts["prd.md"])
+    watcher.start()
+    try:
+        for _ in range(200):
+            if watcher.stats()["refreshes"] == 2:
+                break
+            threading.Event().wait(0.01)
+    finally:
+        watcher.stop()
+    assert contents(agent_info, "prd") == ["CREATE TABLE favorites (user_id INTEGER, recipe_id INTEGER);"]
+    assert watcher.stats()["running"] is False
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app, User, Recipe, ensure_rag_import_user
+
+
+@pytest.fixture
+def client(session_factory):
+    with session_factory() as db:
+        ensure_rag_import_user(db)
+        for user_id in (1, 2):
+            db.add(User(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                        password_hash="hash", created_at=datetime(2025, 1, user_id)))
+        for i in range(1, 8):
+            db.add(Recipe(recipe_id=i, user_id=1 if i <= 4 else 2, title=f"Recipe {i}", description="desc",
+                          instructions="long instructions", created_at=datetime(2025, 2, i),
+                          ingredients='[{"name": "Rice", "quantity": "1 cup"}]'))
+        db.commit()
+    return TestClient(app)
+
+
+def test_recipes_are_paged_with_a_cursor_header(client):
+    first = client.get("/recipes/", params={"limit": 3})
+    assert [r["recipe_id"] for r in first.json()] == [1, 2, 3]
+    assert first.json()[0]["ingredients"] == [{"name": "Rice", "quantity": "1 cup"}]
+    cursor = first.headers["X-Next-After-Id"]
+
+    second = client.get("/recipes/", params={"limit": 3, "after_id": cursor})
+    assert [r["recipe_id"] for r in second.json()] == [4, 5, 6]
+
+    last = client.get("/recipes/", params={"limit": 3, "after_id": 6})
+    assert [r["recipe_id"] for r in last.json()] == [7]
+    assert "X-Next-After-Id" not in last.headers
+
+
+def test_recipes_filter_by_owner_and_created_range(client):
+    body = client.get("/recipes/", params={
+        "user_id": 1,
+        "created_after": "2025-02-02T00:00:00",
+        "created_before": "2025-02-04T00:00:00",
+    }).json()
+    assert [r["recipe_id"] for r in body] == [2, 3]
+
+
+def test_recipes_column_projection_skips_instructions(client):
+    body = client.get("/recipes/", params={"fields": "title,description", "limit": 1}).json()
+    assert body == [{"recipe_id": 1, "title": "Recipe 1", "description": "desc"}]
+    assert client.get("/recipes/", params={"fields": "password"}).status_code == 400
+
+
+def test_recipes_stream_as_ndjson(client):
+    response = client.get("/recipes/", params={"stream": True, "user_id": 2, "fields": "title"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["recipe_id"] for row in rows] == [5, 6, 7]
+    assert set(rows[0]) == {"recipe_id", "title"}
+
+
+def test_projected_and_streamed_rows_follow_the_response_contract(client, session_factory):
+    with session_factory() as db:
+        db.add(Recipe(recipe_id=8, user_id=2, title="Loose", created_at=datetime(2025, 2, 8),
+                      ingredients='["rice", {"name": "Water", "quantity": 2}, {"name": "Salt", "quantity": "1 tsp"}]'))
+        db.commit()
+    expected = [{"name": "Salt", "quantity": "1 tsp"}]
+    projected = client.get("/recipes/", params={"fields": "title,ingredients", "after_id": 7})
+    assert projected.status_code == 200
+    assert projected.json() == [{"recipe_id": 8, "title": "Loose", "ingredients": expected}]
+    assert client.get("/recipes/", params={"after_id": 7}).json()[0]["ingredients"] == expected
+    streamed = client.get("/recipes/", params={"stream": True, "after_id": 7})
+    assert [json.loads(line)["ingredients"] for line in streamed.text.splitlines()] == [expected]
+
+
+def test_users_are_paged_filtered_and_streamed(client):
+    page = client.get("/users/", params={"limit": 1})
+    assert [u["user_id"] for u in page.json()] == [1]
+    assert page.headers["X-Next-After-Id"] == "1"
+    assert [u["user_id"] for u in client.get("/users/", params={"created_after": "2025-01-02T00:00:00"}).json()] == [2]
+
+    rows = [json.loads(line) for line in client.get("/users/", params={"stream": True}).text.splitlines()]
+    assert [row["user_id"] for row in rows] == [1, 2]
+    assert "password_hash" not in rows[0]
+    assert rows[0]["created_at"] == "2025-01-01T00:00:00"
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+import utils
+from utils import invalidate_llm_clients, llm_client_registry_stats, setup_llm_client
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """An empty registry whose clients are cheap sentinels instead of SDK objects."""
+    built = []
+
+    def fake_create(model_name, config, api_provider):
+        client = object()
+        built.append((model_name, client))
+        return client
+
+    monkeypatch.setattr(utils, "_llm_clients", {})
+    monkeypatch.setattr(utils, "_async_clients", {})
+    monkeypatch.setattr(utils, "_llm_client_stats", {"hits": 0, "misses": 0, "invalidations": 0})
+    monkeypatch.setattr(utils, "_create_llm_client", fake_create)
+    monkeypatch.setattr(utils, "_environment_loaded", True)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-one")
+    return built
+
+
+def test_same_model_and_key_share_one_client(registry):
+    first = setup_llm_client("gpt-4.1")
+    assert setup_llm_client("gpt-4.1") == first
+    assert setup_llm_client("gpt-4o")[0] is not first[0]
+    assert len(registry) == 2
+    stats = llm_client_registry_stats()
+    assert (stats["hits"], stats["misses"], stats["clients"]) == (1, 2, 2)
+
+
+def test_rotated_key_gets_a_new_client(registry, monkeypatch):
+    first = setup_llm_client("gpt-4.1")[0]
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-two")
+    assert setup_llm_client("gpt-4.1")[0] is not first
+    assert all("sk-" not in str(part) for key in utils._llm_clients for part in key)
+
+
+def test_invalidation_by_provider_and_model(registry, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant")
+    openai_client = setup_llm_client("gpt-4.1")[0]
+    setup_llm_client("gpt-4o")
+    setup_llm_client("claude-sonnet-4-20250514")
+    assert invalidate_llm_clients("openai", "gpt-4o") == 1
+    assert setup_llm_client("gpt-4.1")[0] is openai_client
+    assert invalidate_llm_clients("openai") == 1
+    assert setup_llm_client("gpt-4.1")[0] is not openai_client
+    assert invalidate_llm_clients() == 2
+
+
+def test_concurrent_setup_builds_one_client(registry):
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(setup_llm_client("gpt-4.1")[0])) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(registry) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_environment_is_loaded_once(monkeypatch, tmp_path):
+    loads = []
+    monkeypatch.setattr(utils, "load_dotenv", lambda **kwargs: loads.append(kwargs))
+    monkeypatch.setattr(utils, "_environment_loaded", False)
+    (tmp_path / ".env").write_text("OPENAI_API_KEY=sk-test\n")
+    monkeypatch.chdir(tmp_path)
+    utils.load_environment()
+    utils.load_environment()
+    assert len(loads) == 1
+    utils.load_environment(force=True)
+    assert loads[-1]["override"] is True
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.agent import recipe_agent, utils
+from app.agent.utils import (LLMRateLimitError, LLMRequestError, LLMScheduler, LLMUnavailableError,
+                             SlidingWindowRateLimiter, classify_llm_error, get_completion, rate_limits_for)
+
+
+class APIStatusError(Exception):
+    """Shaped like the SDKs' HTTP errors: a status code and the response headers."""
+
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code,
+                                        headers={"retry-after": str(retry_after)} if retry_after else {})
+
+
+class FakeProvider:
+    """A local OpenAI-shaped provider that plays a script of errors before answering."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.script.pop(0) if self.script else "done"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=outcome))])
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Installs a scheduler on a fake clock that records its sleeps instead of waiting."""
+    recorded, now = [], [0.0]
+
+    def sleep(seconds):
+        recorded.append(seconds)
+        now[0] += seconds
+
+    scheduler = LLMScheduler(max_retries=3, base_delay=0.5, max_delay=4, sleep=sleep, clock=lambda: now[0])
+    monkeypatch.setattr(utils, "llm_scheduler", scheduler)
+    return recorded
+
+
+def test_retryable_errors_are_retried_with_backoff(sleeps):
+    provider = FakeProvider(APIStatusError(429, retry_after=2), APIStatusError(503), "answer")
+    assert get_completion("p", provider, "gpt-4o", "openai", raise_errors=True) == "answer"
+    assert provider.calls == 3
+    assert sleeps[0] >= 2  # the 429 pauses the model for at least Retry-After
+    assert 0 <= sleeps[1] <= 1.0  # the 503 backs off with jitter, up to base_delay * 2
+    assert utils.llm_scheduler_stats()["retries"] == 2
+
+
+def test_exhausted_retries_raise_a_typed_error(sleeps):
+    provider = FakeProvider(*[APIStatusError(429)] * 4)
+    with pytest.raises(LLMRateLimitError) as raised:
+        get_completion("p", provider, "gpt-4o", "openai", raise_errors=True)
+    assert raised.value.attempts == 4
+    assert (raised.value.provider, raised.value.model_name) == ("openai", "gpt-4o")
+    assert len(sleeps) == 3
+
+    text = get_completion("p", FakeProvider(*[APIStatusError(500)] * 4), "gpt-4o", "openai")
+    assert text == "An API error occurred: Error code: 500"
+
+
+def test_client_errors_are_not_retried(sleeps):
+    provider = FakeProvider(APIStatusError(400))
+    with pytest.raises(LLMRequestError):
+        get_completion("p", provider, "gpt-4o", "openai", raise_errors=True)
+    assert provider.calls == 1 and sleeps == []
+    with pytest.raises(LLMRequestError):
+        get_completion("p", None, "gpt-4o", "openai", raise_errors=True)
+
+
+def test_error_classification():
+    assert isinstance(classify_llm_error(type("RateLimitError", (Exception,), {})("slow down")), LLMRateLimitError)
+    assert isinstance(classify_llm_error(TimeoutError("read timed out")), LLMUnavailableError)
+    assert isinstance(classify_llm_error(type("APIConnectionError", (Exception,), {})()), LLMUnavailableError)
+    assert isinstance(classify_llm_error(ValueError("bad prompt")), LLMRequestError)
+
+
+def test_limiter_waits_for_the_window_instead_of_failing():
+    now = [100.0]
+    limiter = SlidingWindowRateLimiter(rpm=2, tpm=1000, clock=lambda: now[0])
+    assert limiter.reserve(100) == 0 and limiter.reserve(100) == 0
+    assert limiter.reserve(100) == pytest.approx(60)
+    now[0] += 30
+    assert limiter.reserve(100) == pytest.approx(30)
+    now[0] += 30
+    assert limiter.reserve(900) == 0
+    assert limiter.reserve(200) == pytest.approx(60)  # over the token budget until the 900 expire
+    assert limiter.stats()["tokens_in_window"] == 900
+
+
+def test_requests_queue_behind_the_rate_limit(monkeypatch):
+    monkeypatch.setattr(utils, "llm_scheduler", LLMScheduler(limits=lambda model, provider: {"rpm": 2, "tpm": None}))
+    utils.llm_scheduler.limiter("openai", "gpt-4o").window = 0.2
+    provider = FakeProvider()
+    started = time.monotonic()
+    answers = [get_completion(f"p{i}", provider, "gpt-4o", "openai") for i in range(4)]
+    assert answers == ["done"] * 4
+    assert time.monotonic() - started >= 0.2
+
+    with pytest.raises(LLMRateLimitError):
+        utils.llm_scheduler.limiter("openai", "gpt-4o").acquire(timeout=0)
+
+
+def test_async_calls_are_retried(monkeypatch):
+    monkeypatch.setattr(utils, "llm_scheduler", LLMScheduler(base_delay=0.001))
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise APIStatusError(502)
+        return "ok"
+
+    assert asyncio.run(utils.llm_scheduler.acall(flaky, "anthropic", "claude-sonnet-4-20250514", "p")) == "ok"
+    assert len(attempts) == 3
+
+
+def test_rate_limits_come_from_the_model_table(monkeypatch):
+    assert rate_limits_for("claude-sonnet-4-20250514", "anthropic") == {"rpm": 50, "tpm": 30_000}
+    assert rate_limits_for("gpt-4o-mini", "openai") == {"rpm": 500, "tpm": 200_000}
+    assert rate_limits_for("meta-llama/Llama-3.3-70B-Instruct", "huggingface") == utils.PROVIDER_RATE_LIMITS["huggingface"]
+    assert all("rpm" in config and "tpm" in config for config in utils.RECOMMENDED_MODELS.values()
+               if config["text_generation"] and config["provider"] in ("openai", "anthropic"))
+    monkeypatch.setitem(utils.RECOMMENDED_MODELS, "gpt-4o", {**utils.RECOMMENDED_MODELS["gpt-4o"], "rpm": 10})
+    monkeypatch.setenv("LLM_TPM_OPENAI", "5000")
+    assert rate_limits_for("gpt-4o", "openai") == {"rpm": 10, "tpm": 5000}
+
+
+def test_extraction_surfaces_provider_outages(sleeps):
+    agent_info = SimpleNamespace(client=FakeProvider(*[APIStatusError(503)] * 4), model_name="gpt-4.1", api_provider="openai")
+    with pytest.raises(LLMUnavailableError):
+        recipe_agent.extract_recipes_node({"answer": "no json here", "num_recipes": 2, "coding_agent": agent_info})
+
+
+class FakeStreamingProvider(FakeProvider):
+    """FakeProvider whose answers arrive as OpenAI stream chunks."""
+
+    def create(self, **kwargs):
+        text = super().create(**kwargs)
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text.choices[0].message.content))])])
+
+
+def test_streams_are_retried_until_the_first_delta(sleeps):
+    provider = FakeStreamingProvider(APIStatusError(429, retry_after=1), APIStatusError(503), "answer")
+    assert list(utils.stream_completion("p", provider, "gpt-4o", "openai", raise_errors=True)) == ["answer"]
+    assert provider.calls == 3
+
+    with pytest.raises(LLMRateLimitError):
+        list(utils.stream_completion("p", FakeStreamingProvider(*[APIStatusError(429)] * 4), "gpt-4o", "openai",
+                                     raise_errors=True))
+    deltas = list(utils.stream_completion("p", FakeStreamingProvider(*[APIStatusError(429)] * 4), "gpt-4o", "openai"))
+    assert deltas == ["An API error occurred: Error code: 429"]
+
+
+def test_streamed_rag_search_reports_rate_limits_as_503(sleeps, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.main as main
+    from app.agent import knowledge_base
+    from app.agent.agent_pool import RecipeAgentPool
+    from app.agent.recipe_cache import RecipeSearchCache
+
+    class StreamingCookAgent:
+        """Runs the real prefetch path with the on_token callback run_rag_job always passes."""
+
+        def __init__(self):
+            self.cook = knowledge_base.ExtendedKnowledgeAgent(
+                role="You are a chef.", model="gpt-4.1", search_mode="prefetch",
+                search_tool=SimpleNamespace(invoke=lambda query: []))
+            self.cook.client = FakeStreamingProvider(*[APIStatusError(429)] * 4)
+
+        async def asearch(self, ingredients, num_recipes=3, on_recipe=None, on_token=None):
+            self.cook.query("Find recipes", ingredients=ingredients, on_token=on_token)
+            pytest.fail("the rate limit was swallowed")
+
+    tokens = []
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(main, "agent_pool", RecipeAgentPool(size=1, factory=StreamingCookAgent))
+    monkeypatch.setattr(main, "rag_cache", RecipeSearchCache())
+    publish = main.RagJob.publish
+    monkeypatch.setattr(main.RagJob, "publish", lambda job, event, data: tokens.append((event, data)) or publish(job, event, data))
+    response = TestClient(main.app).post("/recipes/rag_search/", json={"ingredients": "rice", "num_recipes": 1})
+    assert response.status_code == 503
+    assert not [data for event, data in tokens if event == "token"]
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.agent import dependencies
+from app.agent.dependencies import AgentDependencyError
+from app.agent.embeddings import CachedEmbeddings, LocalEmbeddings, create_embedding, embedding_fingerprint
+from app.agent.knowledge_base import create_knowledge_bases
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class FakeSentenceModel:
+    """Stands in for a SentenceTransformer: deterministic unit vectors, records each encode call."""
+
+    def __init__(self, dims=8):
+        self.dims = dims
+        self.calls = []
+
+    def encode(self, texts, batch_size, convert_to_numpy, normalize_embeddings, show_progress_bar):
+        self.calls.append((len(texts), batch_size))
+        vectors = np.array([np.random.default_rng(int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)).normal(size=self.dims)
+                            for text in texts])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_local_embeddings_encode_in_batches_without_importing_torch():
+    model = FakeSentenceModel()
+    embedding = LocalEmbeddings(model=model, batch_size=16, precision="int8")
+    vectors = embedding.embed_documents(["chicken", "rice", "broccoli"])
+    assert model.calls == [(3, 16)]
+    assert len(vectors) == 3 and all(isinstance(value, float) for value in vectors[0])
+    assert np.linalg.norm(vectors[0]) == pytest.approx(1, abs=1e-6)
+    assert embedding.embed_query("rice") == pytest.approx(vectors[1])
+
+
+def test_local_backend_imports_torch_only_when_the_model_loads():
+    code = ("import sys; from app.agent.embeddings import LocalEmbeddings, create_embedding; "
+            "LocalEmbeddings(); create_embedding('local', cache=False); "
+            "print(sorted(name for name in ('torch', 'sentence_transformers') if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120)
+    assert result.stdout.strip() == "[]", result.stderr[-2000:]
+
+
+def test_local_backend_reports_missing_libraries(monkeypatch):
+    monkeypatch.setattr(dependencies, "_probe", {**dependencies.probe_agent_dependencies(), "sentence_transformers": False})
+    with pytest.raises(AgentDependencyError, match="pip install sentence-transformers"):
+        LocalEmbeddings().embed_documents(["rice"])
+    with pytest.raises(ValueError):
+        LocalEmbeddings(precision="int4")
+
+
+def test_embedding_cache_is_keyed_by_model_and_chunk(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    first_model = FakeSentenceModel()
+    first = CachedEmbeddings(LocalEmbeddings(model=first_model), path)
+    vectors = first.embed_documents(["chicken", "rice", "chicken"])
+    assert first_model.calls == [(2, 64)]
+
+    second_model = FakeSentenceModel()
+    second = CachedEmbeddings(LocalEmbeddings(model=second_model), path)
+    beans = LocalEmbeddings(model=FakeSentenceModel()).embed_query("beans")
+    assert second.embed_documents(["rice", "chicken", "beans"]) == [vectors[1], vectors[0], beans]
+    assert second_model.calls == [(1, 64)]
+    assert second.stats() == {"hits": 2, "misses": 1}
+
+    quantized_model = FakeSentenceModel()
+    CachedEmbeddings(LocalEmbeddings(model=quantized_model, precision="int8"), path).embed_documents(["rice"])
+    assert quantized_model.calls == [(1, 64)]
+    assert embedding_fingerprint(second) == embedding_fingerprint(second.underlying)
+
+
+def test_embedding_cache_stats_are_exact_under_concurrency(tmp_path):
+    cached = CachedEmbeddings(LocalEmbeddings(model=FakeSentenceModel()), str(tmp_path / "embeddings.sqlite3"))
+    cached.embed_documents(["rice"])
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: cached.embed_documents(["rice"] * 50), range(40)))
+    assert cached.stats() == {"hits": 2000, "misses": 1}
+
+
+def test_backend_is_selectable_per_knowledge_key(tmp_path):
+    schema = tmp_path / "schema.sql"
+    schema.write_text("CREATE TABLE recipes (recipe_id INTEGER PRIMARY KEY, title TEXT);")
+    local = LocalEmbeddings(model=FakeSentenceModel(dims=8))
+    default = DeterministicFakeEmbedding(size=16)
+
+    retrievers = create_knowledge_bases([("prd", [str(schema)]), ("tech", [str(schema)], local)],
+                                        embedding=default, cache_dir=str(tmp_path / "cache"))
+    assert retrievers["prd"].vectorstore.embeddings is default
+    assert retrievers["tech"].vectorstore.embeddings is local
+    assert (retrievers["prd"].vectorstore.index.d, retrievers["tech"].vectorstore.index.d) == (16, 8)
+    assert retrievers["tech"].invoke("recipes")[0].metadata["source"] == str(schema)
+
+
+def test_create_embedding_selects_the_backend():
+    assert isinstance(create_embedding("local", cache=False), LocalEmbeddings)
+    with pytest.raises(ValueError):
+        create_embedding("word2vec")
@@ -5,7 +5,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
-from app.main import app, Base, get_db
+from app.main import app, Base, get_db, get_read_db
 
 @pytest.fixture(autouse=True, scope="function")
 def reset_database():
@@ -31,6 +31,7 @@ def override_get_db():
         db.close()
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 client = TestClient(app)
 
 
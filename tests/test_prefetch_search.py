@@ -0,0 +1,97 @@
+import threading
+import time
+
+import app.agent.knowledge_base as knowledge_base
+from app.agent.knowledge_base import ExtendedKnowledgeAgent, build_search_queries, normalize_url
+
+
+class StubSearchTool:
+    """Stands in for TavilySearchResults: every query returns a shared page plus one of its own."""
+
+    def __init__(self, delay=0.1, slow_query=None):
+        self.delay = delay
+        self.slow_query = slow_query
+        self.queries = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, query):
+        with self._lock:
+            self.queries.append(query)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(1.0 if query == self.slow_query else self.delay)
+            if query.startswith("fail"):
+                raise RuntimeError("quota exceeded")
+            return [
+                {"url": "https://Example.com/fried-rice/", "content": "Fried rice with chicken"},
+                {"url": f"https://example.com/{len(query)}", "content": f"Result for {query}"},
+            ]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def make_agent(tool, monkeypatch, **kwargs):
+    prompts = []
+    monkeypatch.setattr(knowledge_base, "get_completion", lambda prompt, *args, **kw: prompts.append(prompt) or "[]")
+    agent = ExtendedKnowledgeAgent(role="You are a chef.", model="gpt-4.1", search_mode="prefetch",
+                                   search_tool=tool, **kwargs)
+    return agent, prompts
+
+
+def test_build_search_queries_is_deterministic():
+    queries = build_search_queries("chicken, rice, broccoli, garlic", 4)
+    assert queries == [
+        "best recipes with chicken, rice, broccoli, garlic",
+        "chicken rice broccoli recipe",
+        "recipe with chicken, rice, broccoli",
+        "recipe with chicken, rice, garlic",
+    ]
+    assert build_search_queries(" , ", 3) == []
+    assert len(build_search_queries("eggs", 5)) == 2
+
+
+def test_prefetch_runs_queries_concurrently_and_dedupes(monkeypatch):
+    tool = StubSearchTool(delay=0.2)
+    agent, prompts = make_agent(tool, monkeypatch, num_queries=3)
+
+    started = time.time()
+    answer = agent.query("Find 3 recipes as JSON", ingredients="chicken, rice, broccoli")
+    assert time.time() - started < 0.5
+    assert answer == "[]"
+    assert tool.max_active == 3
+    assert len(prompts) == 1
+    assert prompts[0].count("Fried rice with chicken") == 1
+    assert "Find 3 recipes as JSON" in prompts[0]
+    assert agent.last_search["results"] == 6
+    assert agent.last_search["unique_results"] == 4
+
+
+def test_prefetch_drops_slow_and_failing_searches(monkeypatch):
+    queries = build_search_queries("chicken, rice, broccoli", 3)
+    tool = StubSearchTool(delay=0.01, slow_query=queries[1])
+    agent, prompts = make_agent(tool, monkeypatch, num_queries=3, search_timeout=0.3)
+
+    started = time.time()
+    results = agent.prefetch_search(queries + ["fail please"])
+    assert time.time() - started < 0.9
+    assert agent.last_search["timed_out"] == 1
+    assert [hit["content"] for hit in results] == [
+        "Fried rice with chicken", f"Result for {queries[0]}", f"Result for {queries[2]}",
+    ]
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.com/a/#top") == normalize_url("https://example.com/a")
+
+
+def test_prefetch_streams_answer_tokens(monkeypatch):
+    agent, prompts = make_agent(StubSearchTool(delay=0), monkeypatch)
+    monkeypatch.setattr(knowledge_base, "stream_completion", lambda prompt, *args, **kwargs: iter(["[", "{}", "]"]))
+    tokens = []
+    assert agent.query("Find recipes", ingredients="rice", on_token=tokens.append) == "[{}]"
+    assert tokens == ["[", "{}", "]"]
+    assert prompts == []
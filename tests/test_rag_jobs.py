@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.main as main
+from app.main import app, Base, Recipe
+from app.agent.agent_pool import RecipeAgentPool
+from app.agent.job_queue import RagJobQueue, QueueFullError
+from app.agent.recipe_cache import RecipeSearchCache
+
+RECIPES = [
+    {"title": "Garlic Chicken", "description": "d", "instructions": "i", "ingredients": [{"name": "Chicken", "quantity": "1"}]},
+    {"title": "Fried Rice", "description": "d", "instructions": "i", "ingredients": [{"name": "Rice", "quantity": "2 cups"}]},
+]
+
+
+class FakeRecipeAgent:
+    async def asearch(self, ingredients, num_recipes=3, on_recipe=None, on_token=None):
+        if on_token:
+            for token in ("[", '{"title": ', '"Garlic Chicken"}', "]"):
+                on_token(token)
+        for recipe in RECIPES[:num_recipes]:
+            on_recipe(recipe)
+        return {"recipe_list": RECIPES[:num_recipes], "extraction_path": "local"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(main, "agent_pool", RecipeAgentPool(size=1, factory=FakeRecipeAgent))
+    monkeypatch.setattr(main, "SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr(main, "rag_cache", RecipeSearchCache())
+    yield TestClient(app), TestingSessionLocal
+
+
+def wait_for(job_client, job_id):
+    for _ in range(200):
+        body = job_client.get(f"/recipes/rag_search/jobs/{job_id}").json()
+        if body["status"] in ("completed", "failed"):
+            return body
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_queue_rejects_jobs_beyond_depth_limit():
+    release = threading.Event()
+    jobs = RagJobQueue(lambda job, **params: release.wait(), max_workers=1, max_queue=1)
+    jobs.submit()
+    jobs.submit()
+    with pytest.raises(QueueFullError):
+        jobs.submit()
+    assert jobs.stats()["rejected"] == 1
+    release.set()
+    jobs.shutdown(wait=True)
+
+
+def test_failed_job_records_error():
+    def runner(job, **params):
+        raise RuntimeError("tavily down")
+
+    jobs = RagJobQueue(runner, max_workers=1, max_queue=1)
+    job = jobs.submit()
+    job.future.result()
+    assert job.status == "failed"
+    assert job.error == "tavily down"
+    assert job.events[-1] == ("failed", "tavily down")
+
+
+def test_submit_returns_job_id_and_poll_returns_results(client):
+    test_client, TestingSessionLocal = client
+    response = test_client.post("/recipes/rag_search/jobs", json={"ingredients": "chicken, rice", "num_recipes": 2})
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    body = wait_for(test_client, job_id)
+    assert body["status"] == "completed"
+    assert [r["title"] for r in body["results"]] == ["Garlic Chicken", "Fried Rice"]
+    assert body["extraction_path"] == "local"
+    with TestingSessionLocal() as db:
+        assert db.query(Recipe).filter_by(user_id=0).count() == 2
+
+
+def test_events_stream_each_recipe(client):
+    test_client, _ = client
+    job_id = test_client.post("/recipes/rag_search/jobs", json={"ingredients": "rice", "num_recipes": 2}).json()["job_id"]
+
+    response = test_client.get(f"/recipes/rag_search/jobs/{job_id}/events", params={"poll_interval": 0.01})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line.split(": ", 1)[1] for line in response.text.splitlines() if line.startswith("event: ")]
+    assert events.count("recipe") == 2
+    assert events[-1] == "completed"
+    data = [json.loads(line[6:]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert data[-1]["status"] == "completed"
+
+
+def test_stream_endpoint_forwards_tokens_before_recipes(client):
+    test_client, _ = client
+    response = test_client.post("/recipes/rag_search/stream", json={"ingredients": "rice", "num_recipes": 1})
+    assert response.status_code == 200
+    assert response.headers["X-Job-Id"]
+    lines = response.text.splitlines()
+    events = [line.split(": ", 1)[1] for line in lines if line.startswith("event: ")]
+    data = [json.loads(line[6:]) for line in lines if line.startswith("data: ")]
+    tokens = [d for e, d in zip(events, data) if e == "token"]
+    assert "".join(tokens) == '[{"title": "Garlic Chicken"}]'
+    assert events.index("token") < events.index("recipe") < events.index("completed")
+
+
+def test_unknown_job_returns_404(client):
+    test_client, _ = client
+    assert test_client.get("/recipes/rag_search/jobs/missing").status_code == 404
+
+
+def test_sync_search_waits_for_job(client):
+    test_client, _ = client
+    response = test_client.post("/recipes/rag_search/", json={"ingredients": "rice", "num_recipes": 1})
+    assert response.status_code == 200
+    assert response.json()["results"][0]["title"] == "Garlic Chicken"
+    assert test_client.get("/metrics/rag").json()["jobs"]["completed"] >= 1
+
+
+def test_repeated_ingredient_set_is_served_from_cache(client):
+    test_client, _ = client
+    first = test_client.post("/recipes/rag_search/", json={"ingredients": "chicken, rice", "num_recipes": 1})
+    second = test_client.post("/recipes/rag_search/", json={"ingredients": " Rice,CHICKEN ", "num_recipes": 1})
+    assert first.json()["extraction_path"] == "local"
+    assert second.json()["extraction_path"] == "cache"
+    assert second.json()["results"] == first.json()["results"]
+    cache = test_client.get("/metrics/rag").json()["cache"]
+    assert cache["hits"] == 1 and cache["misses"] == 1
@@ -0,0 +1,107 @@
+from langchain_core.embeddings import Embeddings
+
+from app.agent.recipe_cache import RecipeSearchCache, canonical_ingredient_name, canonicalize_ingredients
+
+RECIPES = [{"title": "Garlic Chicken", "ingredients": [{"name": "Chicken", "quantity": "1"}]}]
+
+
+class KeywordEmbedding(Embeddings):
+    """Embeds text as counts over a tiny vocabulary so similarity is predictable."""
+    vocabulary = ["chicken", "rice", "broccoli", "garlic", "beef"]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(word in text) for word in self.vocabulary]
+
+
+def test_canonicalization_ignores_order_spacing_case_and_plurals():
+    assert canonicalize_ingredients("chicken, rice, broccoli") == canonicalize_ingredients("  Broccoli;RICE,chicken ")
+    assert canonicalize_ingredients("Tomatoes, eggs, cherries, eggs") == ("cherry", "egg", "tomato")
+    assert canonical_ingredient_name("Hummus") == "hummus"
+
+
+def test_exact_hit_and_miss_counters():
+    cache = RecipeSearchCache()
+    assert cache.get("chicken, rice", 3) is None
+    cache.put("chicken, rice", 3, RECIPES)
+    assert cache.get("Rice, Chicken", 3) == RECIPES
+    assert cache.get("Rice, Chicken", 2) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_ttl_expiry_and_lru_eviction():
+    cache = RecipeSearchCache(max_entries=2, ttl_seconds=-1)
+    cache.put("rice", 1, RECIPES)
+    assert cache.get("rice", 1) is None
+
+    cache = RecipeSearchCache(max_entries=2)
+    cache.put("rice", 1, RECIPES)
+    cache.put("beef", 1, RECIPES)
+    cache.get("rice", 1)
+    cache.put("garlic", 1, RECIPES)
+    assert cache.get("beef", 1) is None
+    assert cache.get("rice", 1) == RECIPES
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_results_are_copies():
+    cache = RecipeSearchCache()
+    cache.put("rice", 1, RECIPES)
+    cache.get("rice", 1)[0]["title"] = "changed"
+    assert cache.get("rice", 1)[0]["title"] == "Garlic Chicken"
+
+
+def test_semantic_tier_serves_near_identical_sets():
+    cache = RecipeSearchCache(embedding=KeywordEmbedding(), similarity_threshold=0.8)
+    cache.put("chicken, rice, broccoli, garlic", 3, RECIPES)
+    assert cache.get("chicken, rice, broccoli, garlic, salt", 3) == RECIPES
+    assert cache.get("beef", 3) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+class FlakyEmbedding(KeywordEmbedding):
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("embeddings API unavailable")
+        return super().embed_query(text)
+
+
+def test_embedding_errors_are_misses_not_failures():
+    embedding = FlakyEmbedding(failures=2)
+    cache = RecipeSearchCache(embedding=embedding, similarity_threshold=0.8)
+    assert cache.get("chicken, rice", 3) is None
+    cache.put("chicken, rice", 3, RECIPES)
+    assert cache.get("chicken, rice", 3) == RECIPES
+    assert cache.stats()["embedding_errors"] == 2
+
+
+def test_put_reuses_the_vector_of_the_missed_lookup():
+    embedding = FlakyEmbedding()
+    cache = RecipeSearchCache(embedding=embedding, similarity_threshold=0.8)
+    assert cache.get("chicken, rice, garlic", 3) is None
+    cache.put("garlic, rice, chicken", 3, RECIPES)
+    assert embedding.calls == ["chicken, garlic, rice"]
+    assert cache.get("chicken, rice, garlic, salt", 3) == RECIPES
+
+
+def test_backing_store_fills_misses():
+    calls = []
+
+    def backing_store(key, num_recipes):
+        calls.append(key)
+        return RECIPES if "rice" in key else None
+
+    cache = RecipeSearchCache(backing_store=backing_store)
+    assert cache.get("rice", 1) == RECIPES
+    assert cache.get("rice", 1) == RECIPES
+    assert calls == [("rice",)]
+    assert cache.stats()["store_hits"] == 1
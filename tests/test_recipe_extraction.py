@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from app.agent import recipe_agent
+from app.agent.recipe_agent import extract_recipes_node, parse_recipe_array, repair_json
+
+RECIPES = [
+    {"title": "Garlic Chicken", "description": "d", "instructions": "i", "ingredients": [{"name": "Chicken", "quantity": "1"}]},
+    {"title": "Fried Rice", "description": "d", "instructions": "i", "ingredients": [{"name": "Rice", "quantity": "2 cups"}]},
+]
+
+
+class FakeAgentInfo:
+    client = object()
+    model_name = "gpt-4.1"
+    api_provider = "openai"
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    """Records prompts sent to the LLM and replies from a scripted list."""
+    calls = {"prompts": [], "replies": []}
+
+    def fake_get_completion(prompt, client, model_name, api_provider, temperature=0.7, **kwargs):
+        calls["prompts"].append(prompt)
+        return calls["replies"].pop(0) if calls["replies"] else "not json"
+
+    monkeypatch.setattr(recipe_agent, "get_completion", fake_get_completion)
+    return calls
+
+
+def test_repair_json_strips_fences_prose_and_trailing_commas():
+    raw = 'Here you go:\n```json\n[{"title": "A",},]\n```'
+    assert json.loads(repair_json(raw)) == [{"title": "A"}]
+
+
+def test_parse_recipe_array_recovers_truncated_array():
+    raw = json.dumps(RECIPES)[:-40]
+    assert parse_recipe_array(raw) == RECIPES[:1]
+
+
+def test_parse_recipe_array_accepts_wrapped_object():
+    assert parse_recipe_array(json.dumps({"recipes": RECIPES})) == RECIPES
+
+
+def test_local_parse_makes_no_llm_calls(completions):
+    state = {"answer": json.dumps(RECIPES), "num_recipes": 2, "coding_agent": FakeAgentInfo()}
+    result = extract_recipes_node(state)
+    assert result["recipe_list"] == RECIPES
+    assert result["extraction_path"] == "local"
+    assert completions["prompts"] == []
+
+
+def test_batched_fallback_uses_a_single_call(completions):
+    completions["replies"] = [json.dumps(RECIPES)]
+    state = {"answer": "Recipes: Garlic Chicken and Fried Rice", "num_recipes": 2, "coding_agent": FakeAgentInfo()}
+    result = extract_recipes_node(state)
+    assert result["recipe_list"] == RECIPES
+    assert result["extraction_path"] == "batched"
+    assert len(completions["prompts"]) == 1
+
+
+def test_per_index_fallback_is_last_resort(completions):
+    completions["replies"] = ["no", json.dumps(RECIPES[0]), json.dumps(RECIPES[0])]
+    state = {"answer": "Recipes: Garlic Chicken", "num_recipes": 2, "coding_agent": FakeAgentInfo()}
+    result = extract_recipes_node(state)
+    assert result["extraction_path"] == "per_index"
+    assert result["recipe_list"] == [RECIPES[0], RECIPES[0]]
+    assert len(completions["prompts"]) == 3
+
+
+def test_per_index_workers_are_capped(monkeypatch):
+    import threading
+    import time
+
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_get_completion(prompt, *args, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        return "not json"
+
+    monkeypatch.setattr(recipe_agent, "get_completion", fake_get_completion)
+    monkeypatch.setattr(recipe_agent, "EXTRACT_MAX_WORKERS", 3)
+    state = {"answer": "no recipes here", "num_recipes": 12, "coding_agent": FakeAgentInfo()}
+    assert extract_recipes_node(state)["recipe_list"] == []
+    assert peak[0] <= 3
+    assert extract_recipes_node({**state, "num_recipes": None})["recipe_list"] == []  # falls back to 3
+
+
+def test_per_index_recipes_are_published_as_they_parse(monkeypatch):
+    import threading
+
+    second_published = threading.Event()
+
+    def fake_extract_single_recipe(agentInfo, answer, index):
+        # The first recipe only finishes once the second has already reached on_recipe
+        if index == 0:
+            assert second_published.wait(timeout=5)
+        return RECIPES[index]
+
+    def on_recipe(recipe):
+        published.append(recipe)
+        if recipe == RECIPES[1]:
+            second_published.set()
+
+    published = []
+    monkeypatch.setattr(recipe_agent, "extract_all_recipes", lambda *args: [])
+    monkeypatch.setattr(recipe_agent, "extract_single_recipe", fake_extract_single_recipe)
+    state = {"answer": "no recipes here", "num_recipes": 2, "coding_agent": FakeAgentInfo(), "on_recipe": on_recipe}
+    result = extract_recipes_node(state)
+    assert published == [RECIPES[1], RECIPES[0]]
+    assert result["recipe_list"] == RECIPES
+
+
+def test_async_per_index_recipes_are_published_as_they_parse(monkeypatch):
+    import asyncio
+
+    async def fake_aextract_single_recipe(agentInfo, answer, index):
+        await asyncio.sleep(0.05 if index == 0 else 0)
+        return RECIPES[index]
+
+    published = []
+    monkeypatch.setattr(recipe_agent, "aextract_single_recipe", fake_aextract_single_recipe)
+    async def fake_aextract_all_recipes(*args):
+        return []
+
+    monkeypatch.setattr(recipe_agent, "aextract_all_recipes", fake_aextract_all_recipes)
+    state = {"answer": "no recipes here", "num_recipes": 2, "coding_agent": FakeAgentInfo(), "on_recipe": published.append}
+    result = asyncio.run(recipe_agent.aextract_recipes_node(state))
+    assert published == [RECIPES[1], RECIPES[0]]
+    assert result["recipe_list"] == RECIPES
+
+
+@pytest.mark.parametrize("num_recipes", [0, 21, 5000, None])
+def test_rag_search_rejects_out_of_range_recipe_counts(num_recipes):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    response = TestClient(app).post("/recipes/rag_search/", json={"ingredients": "rice", "num_recipes": num_recipes})
+    assert response.status_code == 422
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app, User, Recipe, RECIPE_LIST_FIELDS, recipe_json_cache
+from app.serialization import RecipeJSONCache
+
+
+@pytest.fixture
+def engine(engine, session_factory):
+    with session_factory() as db:
+        db.add(User(user_id=1, username="chef", email="chef@example.com", password_hash="hash"))
+        for i in range(1, 6):
+            db.add(Recipe(recipe_id=i, user_id=1, title=f"Recipe {i}", description="desc", instructions="steps",
+                          ingredients='[{"name": "Rice", "quantity": "1 cup"}]'))
+        db.commit()
+    return engine
+
+
+def count_queries(engine, fn):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+def test_cached_recipe_is_served_without_loading_rows(engine):
+    client = TestClient(app)
+    first = client.get("/recipes/1")
+    assert first.json()["ingredients"] == [{"name": "Rice", "quantity": "1 cup"}]
+    responses = []
+    # Only the ETag's table_versions lookup reaches the database
+    assert count_queries(engine, lambda: responses.append(client.get("/recipes/1"))) == 1
+    assert responses[0].content == first.content
+    assert client.get("/recipes/99").status_code == 404
+
+
+def test_cached_list_matches_model_serialization(engine):
+    client = TestClient(app)
+    projected = client.get("/recipes/", params={"fields": ",".join(RECIPE_LIST_FIELDS), "limit": 3})
+    cold = client.get("/recipes/", params={"limit": 3})
+    warm = client.get("/recipes/", params={"limit": 3})
+    assert cold.json() == projected.json() == warm.json()
+    assert warm.headers["X-Next-After-Id"] == "3"
+    # A warm page only reads the table versions and the ids
+    assert count_queries(engine, lambda: client.get("/recipes/", params={"limit": 3})) == 2
+
+
+def test_writes_invalidate_cached_json(engine):
+    client = TestClient(app)
+    client.get("/recipes/1")
+    client.get("/recipes/2")
+    with sessionmaker(bind=engine)() as db:
+        db.get(Recipe, 1).title = "Renamed"
+        db.commit()
+        db.query(Recipe).filter(Recipe.recipe_id == 2).update({"title": "Bulk renamed"})
+        db.commit()
+    assert client.get("/recipes/1").json()["title"] == "Renamed"
+    assert client.get("/recipes/2").json()["title"] == "Bulk renamed"
+
+    with sessionmaker(bind=engine)() as db:
+        db.delete(db.get(Recipe, 1))
+        db.commit()
+    assert client.get("/recipes/1").status_code == 404
+    assert recipe_json_cache.stats()["invalidations"] >= 2
+
+
+def test_recipe_json_cache_ttl_and_lru():
+    cache = RecipeJSONCache(max_entries=2, ttl_seconds=60)
+    cache.put(1, b"1")
+    cache.put(2, b"2")
+    cache.get(1)
+    cache.put(3, b"3")
+    assert cache.get_many([1, 2, 3]) == {1: b"1", 3: b"3"}
+    assert cache.stats()["evictions"] == 1
+
+    expiring = RecipeJSONCache(ttl_seconds=0.01)
+    expiring.put(1, b"1")
+    time.sleep(0.02)
+    assert expiring.get(1) is None
+    assert RecipeJSONCache(max_entries=0).put(1, b"1") is None
+
+
+def test_invalidation_waits_for_commit(engine):
+    client = TestClient(app)
+    client.get("/recipes/1")
+    with sessionmaker(bind=engine)() as db:
+        db.delete(db.get(Recipe, 1))
+        db.flush()
+        # A concurrent reader still sees the committed row and caches it between flush and commit
+        recipe_json_cache.put(1, b'{"recipe_id": 1}')
+        db.commit()
+    assert recipe_json_cache.get(1) is None
+    assert client.get("/recipes/1").status_code == 404
+
+    client.get("/recipes/2")
+    with sessionmaker(bind=engine)() as db:
+        db.get(Recipe, 2).title = "Never saved"
+        db.flush()
+        db.rollback()
+        assert "stale_recipe_ids" not in db.info
+    assert client.get("/recipes/2").json()["title"] == "Recipe 2"
+
+
+def test_deleted_recipe_ids_are_not_reused(engine):
+    with sessionmaker(bind=engine)() as db:
+        db.delete(db.get(Recipe, 5))
+        db.commit()
+        recipe = Recipe(user_id=1, title="Recipe 6", ingredients="[]")
+        db.add(recipe)
+        db.commit()
+        assert recipe.recipe_id == 6
+
+
+def test_entries_are_only_served_at_their_table_version(engine):
+    cache = RecipeJSONCache()
+    cache.put(1, b"1", version=3)
+    assert cache.get(1, version=4) is None
+    assert cache.get(1, version=3) is None  # the mismatch dropped it
+    assert cache.stats()["stale"] == 1
+
+    client = TestClient(app)
+    before = client.get("/recipes/1").content
+    # Another worker writes: nothing in this process invalidates the entry...
+    with sessionmaker(bind=engine)() as db:
+        version = db.execute(text("SELECT version FROM table_versions WHERE table_name = 'recipes'")).scalar()
+        db.execute(text("UPDATE recipes SET title = 'Renamed elsewhere' WHERE recipe_id = 1"))
+        db.commit()
+    # ...and a reader that loaded the row before that commit puts the old bytes back
+    recipe_json_cache.put(1, before, version)
+    assert client.get("/recipes/1").json()["title"] == "Renamed elsewhere"
+    assert [r["title"] for r in client.get("/recipes/").json()][0] == "Renamed elsewhere"
@@ -0,0 +1,69 @@
+import time
+
+import app.agent.knowledge_base as knowledge_base
+from app.agent.knowledge_base import ExtendedKnowledgeAgent
+from app.agent.search_cache import CachedSearchTool, SearchResultCache
+
+
+class CountingSearchTool:
+    def __init__(self):
+        self.calls = []
+
+    def invoke(self, query):
+        self.calls.append(query)
+        if query == "broken":
+            return "HTTPError('429 Too Many Requests')"
+        return [{"url": f"https://example.com/{len(self.calls)}", "content": query}]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "search.sqlite3")
+    cache = SearchResultCache(path, ttl_seconds=60)
+    cache.put("Chicken   Rice recipe", 5, [{"url": "u", "content": "c"}])
+    reopened = SearchResultCache(path, ttl_seconds=60)
+    assert reopened.get("chicken rice RECIPE", 5) == [{"url": "u", "content": "c"}]
+    assert reopened.get("chicken rice recipe", 3) is None
+    assert reopened.stats()["hit_rate"] == 0.5
+
+
+def test_cache_expires_and_evicts_least_recently_read():
+    cache = SearchResultCache(":memory:", ttl_seconds=60, max_entries=2)
+    cache.put("a", 5, [1])
+    time.sleep(0.01)
+    cache.put("b", 5, [2])
+    time.sleep(0.01)
+    cache.get("a", 5)
+    cache.put("c", 5, [3])
+    assert cache.get("b", 5) is None
+    assert cache.get("a", 5) == [1]
+    assert cache.stats()["evictions"] == 1
+
+    expiring = SearchResultCache(":memory:", ttl_seconds=0.01)
+    expiring.put("a", 5, [1])
+    time.sleep(0.02)
+    assert expiring.get("a", 5) is None
+    assert expiring.stats()["expired"] == 1
+
+
+def test_cached_tool_skips_repeated_searches_and_errors():
+    inner = CountingSearchTool()
+    tool = CachedSearchTool.wrap(inner, SearchResultCache(":memory:"), max_results=5)
+    first = tool.invoke("chicken rice")
+    assert tool.invoke("Chicken  Rice") == first
+    assert inner.calls == ["chicken rice"]
+    tool.invoke("broken")
+    tool.invoke("broken")
+    assert inner.calls.count("broken") == 2
+
+
+def test_agent_wraps_search_tool_with_cache(monkeypatch):
+    monkeypatch.setattr(knowledge_base, "get_completion", lambda *args, **kwargs: "[]")
+    inner = CountingSearchTool()
+    cache = SearchResultCache(":memory:")
+    agent = ExtendedKnowledgeAgent(role="You are a chef.", model="gpt-4.1", search_mode="prefetch",
+                                   search_tool=inner, search_cache=cache, num_queries=2)
+    assert isinstance(agent.search_tool, CachedSearchTool)
+    agent.query("Find recipes", ingredients="chicken, rice")
+    agent.query("Find recipes", ingredients="chicken, rice")
+    assert len(inner.calls) == 2
+    assert cache.stats()["hits"] == 2
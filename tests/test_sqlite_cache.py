@@ -0,0 +1,38 @@
+import sqlite3
+import time
+
+from app.agent.sqlite_cache import SQLiteCache
+
+
+def test_batch_reads_and_unbounded_store(tmp_path):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite3"), "vectors")
+    store.put_many({"a": b"\x01", "b": b"\x02"})
+    assert store.get_many(["a", "b", "c", "a"]) == {"a": b"\x01", "b": b"\x02"}
+    assert store.get("c") is None
+    assert store.stats() == {"hits": 2, "misses": 2, "expired": 0, "evictions": 0, "entries": 2}
+
+
+def test_expired_entries_are_removed_and_lru_evicted():
+    store = SQLiteCache(":memory:", "entries", ttl_seconds=60, max_entries=2)
+    store.put("a", "1")
+    time.sleep(0.01)
+    store.put("b", "2")
+    time.sleep(0.01)
+    store.get("a")
+    store.put("c", "3")
+    assert store.get_many(["a", "b", "c"]) == {"a": "1", "c": "3"}
+
+    store.ttl_seconds = 0
+    assert store.get("a") is None
+    assert store.stats()["expired"] == 1 and store.stats()["entries"] == 1
+
+
+def test_table_from_an_older_layout_is_replaced(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE embedding_cache (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        conn.execute("INSERT INTO embedding_cache VALUES ('a', x'00')")
+    store = SQLiteCache(path, "embedding_cache")
+    assert store.get("a") is None
+    store.put("a", b"\x01")
+    assert store.get("a") == b"\x01"
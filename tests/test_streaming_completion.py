@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+from utils import stream_completion, astream_completion
+
+
+def openai_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+class FakeOpenAIClient:
+    def __init__(self, deltas, reject_temperature=False, fail_after=None):
+        self.deltas = deltas
+        self.reject_temperature = reject_temperature
+        self.fail_after = fail_after
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.reject_temperature and "temperature" in kwargs:
+            raise ValueError("Unsupported value: 'temperature' does not support 0.7")
+        assert kwargs["stream"] is True
+
+        def chunks():
+            for i, delta in enumerate(self.deltas):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise ConnectionError("connection reset")
+                yield openai_chunk(delta)
+            yield SimpleNamespace(choices=[])  # usage-only chunk
+        return chunks()
+
+
+class FakeAnthropicClient:
+    def __init__(self, deltas):
+        class Stream:
+            text_stream = iter(deltas)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        self.messages = SimpleNamespace(stream=lambda **kwargs: Stream())
+
+
+def test_openai_deltas_are_yielded_in_order():
+    client = FakeOpenAIClient(["Fried", " rice", None, "!"])
+    assert list(stream_completion("p", client, "gpt-4o", "openai")) == ["Fried", " rice", "!"]
+
+
+def test_openai_retries_without_temperature():
+    client = FakeOpenAIClient(["ok"], reject_temperature=True)
+    assert list(stream_completion("p", client, "o3", "openai")) == ["ok"]
+    assert "temperature" not in client.calls[-1]
+
+
+def test_anthropic_text_stream():
+    assert "".join(stream_completion("p", FakeAnthropicClient(["a", "b"]), "claude", "anthropic")) == "ab"
+
+
+def test_errors_are_reported_as_the_last_delta():
+    client = FakeOpenAIClient(["partial", "lost"], fail_after=1)
+    deltas = list(stream_completion("p", client, "gpt-4o", "openai"))
+    assert deltas[0] == "partial"
+    assert deltas[-1].startswith("An API error occurred")
+    assert list(stream_completion("p", None, "gpt-4o", "openai")) == ["API client not initialized."]
+
+
+def test_async_stream_matches_sync_stream():
+    async def collect():
+        return [delta async for delta in astream_completion("p", FakeOpenAIClient(["a", "b", "c"]), "gpt-4o", "openai")]
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+
+
+class AsyncFakeOpenAI:
+    """Mimics AsyncOpenAI: chat.completions.create(stream=True) awaits to an async iterator of chunks."""
+
+    def __init__(self, deltas, fail_after=None):
+        self.deltas = deltas
+        self.fail_after = fail_after
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+
+        async def chunks():
+            for i, delta in enumerate(self.deltas):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise ConnectionError("connection reset")
+                await asyncio.sleep(0)
+                yield openai_chunk(delta)
+        return chunks()
+
+
+class AsyncFakeAnthropic:
+    def __init__(self, deltas):
+        class Stream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            @property
+            async def text_stream(self):
+                for delta in deltas:
+                    yield delta
+
+        self.messages = SimpleNamespace(stream=lambda **kwargs: Stream())
+
+
+def test_async_clients_stream_natively_on_the_event_loop(monkeypatch):
+    import threading
+
+    threads = []
+    original = AsyncFakeOpenAI.create
+
+    async def create(self, **kwargs):
+        threads.append(threading.current_thread())
+        return await original(self, **kwargs)
+
+    monkeypatch.setattr(AsyncFakeOpenAI, "create", create)
+
+    async def collect(client, model, provider):
+        return [delta async for delta in astream_completion("p", client, model, provider)]
+
+    assert asyncio.run(collect(AsyncFakeOpenAI(["a", None, "b"]), "gpt-4o", "openai")) == ["a", "b"]
+    assert threads == [threading.main_thread()]
+    assert asyncio.run(collect(AsyncFakeAnthropic(["x", "y"]), "claude", "anthropic")) == ["x", "y"]
+    deltas = asyncio.run(collect(AsyncFakeOpenAI(["partial", "lost"], fail_after=1), "gpt-4o", "openai"))
+    assert deltas[0] == "partial" and deltas[-1].startswith("An API error occurred")